@@ -1,9 +1,9 @@
-import os
-import glob
 import pandas as pd
 import tkinter as tk
 from tkinter import filedialog
 
+from .core.data import find_recordings
+
 def findFilesInFolder(directory : str, pattern : str, verbose : bool = True) -> list[str]:
     '''
     Attempts to find all files matching the specified pattern in the target directory.
@@ -18,8 +18,7 @@ def findFilesInFolder(directory : str, pattern : str, verbose : bool = True) ->
     :rtype: list[str]
     '''
 
-    filter = os.path.join(directory, pattern)   # Anfügen des Patterns an den Ordner-Pfad
-    files = sorted(glob.glob(filter))           # Suchen nach passenden Dateien
+    files = find_recordings(directory, pattern)  # Gemeinsame Dateisuche mit dem Backend (core/data.py)
 
     if verbose and len(files) == 0:
         print("Keine Dateien gefunden!")
@@ -1,6 +1,9 @@
 import tkinter as tk
 from PIL import Image, ImageTk
 from .GenericButton import GenericButton
+from DriveIdent.lib.core.plots import render_figure, load_payload
+
+RESIZE_DELAY_MS = 150   # Re-render only once resizing has paused
 
 
 class ImageGallery(tk.Frame):
@@ -8,6 +11,8 @@ class ImageGallery(tk.Frame):
     This Component class creates a ImageGallery.
     It takes a List of File-Paths to load images.
     Has Buttons to cycle between these images.
+    Besides PNG files, plot data payloads (*.json from plots/data/) are supported: these are
+    drawn only when displayed, at the current size of the widget.
     '''
 
     def __init__(self, parent, styleConfig, images: list[str]):
@@ -17,7 +22,7 @@ class ImageGallery(tk.Frame):
         Args:
             parent: Tkinter Parent Object where this Object is placed into (ie. a Frame)
             styleConfig: A dictionary containing stylization information
-            images: A List of strings containing file paths of images
+            images: A List of strings containing file paths of images or plot data payloads (*.json)
         '''
         super().__init__(parent)
 
@@ -25,7 +30,11 @@ class ImageGallery(tk.Frame):
         self.index = 0
 
         self.original_img = None
+        self.payload = None
         self.tk_img = None
+        self.decoded = {}       # path -> decoded PIL image or loaded payload (each file is read only once)
+        self.shownKey = None    # (path, width, height) of the currently displayed image
+        self.resizeJob = None
 
         # Displays the images
         self.imageLabel = tk.Label(self, bd=0)
@@ -57,8 +66,22 @@ class ImageGallery(tk.Frame):
 
     def loadImage(self):
         """Loads a image and displays it. Automatically resizes the Container"""
-        path = self.images[self.index]
-        self.original_img = Image.open(path)
+        if not self.images:
+            self.prevButton.config(state="disabled")
+            self.nextButton.config(state="disabled")
+            return
+        path = str(self.images[self.index])
+        if path not in self.decoded:
+            if path.endswith(".json"):
+                self.decoded[path] = load_payload(path)
+            else:
+                img = Image.open(path)
+                img.load()
+                self.decoded[path] = img
+        if path.endswith(".json"):
+            self.original_img, self.payload = None, self.decoded[path]
+        else:
+            self.original_img, self.payload = self.decoded[path], None
         self.resizeAndShow()
         self.prevButton.config(state="normal" if self.index > 0 else "disabled")
         self.nextButton.config(state="normal" if self.index < len(self.images)-1 else "disabled")
@@ -66,7 +89,8 @@ class ImageGallery(tk.Frame):
     def resizeAndShow(self):
         """Resizes the Image and displays it"""
 
-        if self.original_img is None:
+        self.resizeJob = None
+        if self.original_img is None and self.payload is None:
             return
 
         w = self.imageLabel.winfo_width()
@@ -75,16 +99,30 @@ class ImageGallery(tk.Frame):
         if w < 10 or h < 10:
             return
 
-        # Retain aspect ratio, to avoid stretching / compression
-        img = self.original_img.copy()
-        img.thumbnail((w, h))
+        key = (str(self.images[self.index]), w, h)
+        if key == self.shownKey:
+            return
+        self.shownKey = key
+
+        if self.payload is not None:
+            # Draw the chart directly at the widget size instead of scaling a raster image
+            dpi = 100
+            fig = render_figure(self.payload, figsize=(w / dpi, h / dpi), dpi=dpi)
+            fig.canvas.draw()
+            img = Image.frombuffer("RGBA", fig.canvas.get_width_height(), fig.canvas.buffer_rgba(), "raw", "RGBA", 0, 1)
+        else:
+            # Retain aspect ratio, to avoid stretching / compression
+            img = self.original_img.copy()
+            img.thumbnail((w, h))
 
         self.tk_img = ImageTk.PhotoImage(img)
         self.imageLabel.config(image=self.tk_img)
 
     def onResize(self, event):
-        """Resizes the displayed image upon resizing of the window"""
-        self.resizeAndShow()
+        """Resizes the displayed image upon resizing of the window (once resizing has paused)"""
+        if self.resizeJob is not None:
+            self.after_cancel(self.resizeJob)
+        self.resizeJob = self.after(RESIZE_DELAY_MS, self.resizeAndShow)
 
     def nextImage(self):
         """Displays the next image in the List"""
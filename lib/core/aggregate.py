@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: aggregate
+================
+Recording-Level-Aggregation der Fenster-Wahrscheinlichkeiten. Ein Recording wird
+klassifiziert, indem die Wahrscheinlichkeiten aller seiner Fenster gemittelt werden
+und die Klasse mit dem höchsten Mittelwert gewinnt (argmax). Gemeinsam genutzt von
+train (CV-Bewertung), optimize (Scoring der Hyperparameter-Suche) und predict.
+
+Die Reduktion arbeitet auf ganzzahligen Gruppen-Codes (pd.factorize) mit np.bincount
+statt pro Recording über DataFrames zu iterieren, und verarbeitet tausende Recordings
+in einem Aufruf.
+
+Hauptfunktionen:
+    group_codes()          - Recording-IDs -> Codes (Reihenfolge des ersten Auftretens)
+    align_proba()          - Spalten von predict_proba auf eine feste Klassenliste abbilden
+    aggregate_recordings() - Mittelwerte, argmax-Labels und Margins pro Recording
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class RecordingVotes(NamedTuple):
+    """Ergebnis der Aggregation, eine Zeile pro Recording (Reihenfolge des ersten Auftretens)."""
+    recordings: np.ndarray   # Recording-IDs
+    proba: np.ndarray        # (n_recordings, n_classes) gemittelte Wahrscheinlichkeiten
+    labels: np.ndarray       # Vorhergesagte Klasse (argmax)
+    margin: np.ndarray       # Abstand bester zu zweitbester Klasse
+    n_windows: np.ndarray    # Anzahl Fenster pro Recording
+    first_idx: np.ndarray    # Zeilenindex des ersten Fensters pro Recording (z.B. für Soll-Labels)
+
+
+def group_codes(groups) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Wandelt Recording-IDs in Codes 0..n-1 um (Reihenfolge des ersten Auftretens,
+    wie groupby(sort=False)).
+
+    Returns:
+        (codes, uniques)
+    """
+    codes, uniques = pd.factorize(np.asarray(groups), sort=False)
+    return codes, np.asarray(uniques)
+
+
+def align_proba(proba: np.ndarray, model_classes, classes) -> np.ndarray:
+    """
+    Bildet die Spalten von predict_proba (Reihenfolge model_classes) auf classes ab.
+    Klassen, die das Modell nicht kennt, erhalten Wahrscheinlichkeit 0.
+    """
+    pos = {str(c): j for j, c in enumerate(classes)}
+    src = [j for j, c in enumerate(model_classes) if str(c) in pos]
+    out = np.zeros((proba.shape[0], len(classes)))
+    out[:, [pos[str(model_classes[j])] for j in src]] = proba[:, src]
+    return out
+
+
+def aggregate_recordings(proba: np.ndarray, groups, classes) -> RecordingVotes:
+    """
+    Mittelt Fenster-Wahrscheinlichkeiten pro Recording und bestimmt argmax und Margin.
+
+    Args:
+        proba: (n_windows, n_classes) Wahrscheinlichkeiten, Spalten in Reihenfolge classes
+        groups: Recording-ID pro Fenster (parallel zu proba)
+        classes: Klassenliste (Spalten von proba)
+
+    Returns:
+        RecordingVotes
+    """
+    proba = np.asarray(proba, dtype=float)
+    codes, uniques = group_codes(groups)
+    n_rec, n_cls = len(uniques), proba.shape[1]
+    counts = np.bincount(codes, minlength=n_rec)
+    sums = np.empty((n_rec, n_cls))
+    for j in range(n_cls):
+        sums[:, j] = np.bincount(codes, weights=proba[:, j], minlength=n_rec)
+    mean = sums / np.maximum(counts, 1)[:, None]
+    best = np.argmax(mean, axis=1) if n_cls else np.zeros(n_rec, dtype=int)
+    if n_cls > 1:
+        top2 = np.partition(mean, n_cls - 2, axis=1)[:, -2:]
+        margin = top2[:, 1] - top2[:, 0]
+    else:
+        margin = mean[:, 0] if n_cls else np.zeros(n_rec)
+    first_idx = np.unique(codes, return_index=True)[1]
+    labels = np.asarray(classes, dtype=object)[best] if n_cls else np.empty(n_rec, dtype=object)
+    return RecordingVotes(uniques, mean, labels, margin, counts, first_idx)
@@ -6,8 +6,12 @@ Schnittstelle für Tkinter- und andere GUI-Frontends. Kapselt train() und predic
 mit Fehlerbehandlung. Gibt bei Fehlern (False, msg) bzw. (False, msg, {}) zurück
 statt Exceptions zu werfen – damit das Frontend Fehler anzeigen kann ohne zu crashen.
 
-- train(): Trainiert Modelle, apply_overrides für Pfade, write_progress für Status
+- train(): Trainiert Modelle, Pfade über eine RunConfig (globale Konfiguration bleibt
+  unverändert), write_progress für Status
 - predict(): Führt Vorhersage aus, liefert ergebnisse als dict pro Modell
+- Beide nehmen ein CancelToken (cancel.py): Nach cancel() endet der Lauf, die im
+  Staging-Ordner gesammelten Ausgaben werden verworfen (staging.py, vorhandene Modelle
+  bleiben unverändert) und (False, "Abgebrochen") zurückgegeben
 - get_config() / set_config(): Konfiguration für GUI-Voreinstellungen
 - validate_csv(): Prüft, ob eine CSV-Datei lesbar ist
 """
@@ -22,13 +26,19 @@ from .progress import write_progress
 from .train import train as _train
 from .data import load_csv
 from .predict import predict as _predict
+from .cancel import Cancelled, CancelToken
 
 # Projekt-Root in sys.path, damit Importe auch bei Aufruf von außerhalb (z.B. GUI) funktionieren
 _proj = Path(__file__).resolve().parent
 if str(_proj) not in sys.path:
     sys.path.insert(0, str(_proj))
 
-def train(data_dir : str | Path, labels : pd.DataFrame, artifacts_dir, progress_callback : Callable | None = None, use_grid_search : bool = False):
+def _abort(out_dir : Path, progress_callback : Callable | None) -> None:
+    """Nach Abbruch: Status melden. Grafiken und Dateien des Laufs hat train()/predict() bereits verworfen."""
+    write_progress(out_dir, phase="cancelled", message="Abgebrochen", callback=progress_callback)
+
+
+def train(data_dir : str | Path, labels : pd.DataFrame, artifacts_dir, progress_callback : Callable | None = None, use_grid_search : bool = False, cancel_token : CancelToken | None = None, cfg : config.RunConfig | None = None):
     """
     Trainiert Modelle. print()-Ausgaben von run.train() werden abgefangen und
     an log_callback weitergeleitet.
@@ -39,17 +49,22 @@ def train(data_dir : str | Path, labels : pd.DataFrame, artifacts_dir, progress_
         artifacts_dir: Ausgabe-Ordner für Modelle
         progress_callback: Optionaler Callback für Fortschritt
         use_grid_search: Bei True: GridSearch für Hyperparameter vor Training
+        cancel_token: Optionales CancelToken zum Abbrechen (z.B. Abbrechen-Button)
+        cfg: Optionale RunConfig (sonst aktuelle globale Konfiguration)
 
     Returns:
         (erfolg, ausgabe) – True/False und Log-Text
     """
+    out_dir = Path(artifacts_dir)
     try:
-        config.apply_overrides(data_dir=str(data_dir), artifacts_dir=str(artifacts_dir))
+        cfg = config.resolve(cfg).replace(data_dir=data_dir, artifacts_dir=artifacts_dir)
         # Sofort Fortschritt zurücksetzen, damit Frontend nicht alte "done"-Datei sieht
-        out_dir = Path(artifacts_dir)
         write_progress(out_dir, phase="starting", message="Starte Training...", callback=progress_callback)
-        _train(labels=labels, progress_callback=progress_callback, use_grid_search=use_grid_search)
+        _train(labels=labels, progress_callback=progress_callback, use_grid_search=use_grid_search, cancel_token=cancel_token, cfg=cfg)
         return True, None
+    except Cancelled:
+        _abort(out_dir, progress_callback)
+        return False, "Abgebrochen"
     except SystemExit as e:
         # train() wirft SystemExit bei Fehlern (z.B. keine Labels gefunden)
         return False, str(e) if e.code else "Unbekannter Fehler"
@@ -57,7 +72,7 @@ def train(data_dir : str | Path, labels : pd.DataFrame, artifacts_dir, progress_
         return False, str(e)
 
 
-def predict(data_dir : str | Path, test_labels_file : pd.DataFrame, artifacts_dir, progress_callback : Callable | None = None):
+def predict(data_dir : str | Path, test_labels_file : pd.DataFrame, artifacts_dir, progress_callback : Callable | None = None, cancel_token : CancelToken | None = None, cfg : config.RunConfig | None = None):
     """
     Führt Vorhersage aus.
 
@@ -66,6 +81,8 @@ def predict(data_dir : str | Path, test_labels_file : pd.DataFrame, artifacts_di
         test_labels_file: Pfad zur Test-Label-Datei
         artifacts_dir: Ordner mit trainierten Modellen
         log_callback: Optionaler Callback für Log-Ausgaben
+        cancel_token: Optionales CancelToken zum Abbrechen (z.B. Abbrechen-Button)
+        cfg: Optionale RunConfig (sonst aktuelle globale Konfiguration)
 
     Returns:
         (erfolg, ausgabe, ergebnisse) – ergebnisse: dict mit Modellnamen als Keys,
@@ -75,23 +92,23 @@ def predict(data_dir : str | Path, test_labels_file : pd.DataFrame, artifacts_di
     if not "Label" in test_labels_file:
         test_labels_file["Label"] = ""  # Label-Spalte optional für Vorhersage
 
+    out_dir = Path(artifacts_dir)
     try:
-        config.apply_overrides(
-            data_dir=str(data_dir),
-            artifacts_dir=str(artifacts_dir),
-        )
+        cfg = config.resolve(cfg).replace(data_dir=data_dir, artifacts_dir=artifacts_dir)
         # Sofort Fortschritt zurücksetzen, damit Frontend nicht alte "done"-Datei sieht
-        out_dir = Path(artifacts_dir)
         write_progress(out_dir, phase="starting", message="Starte Vorhersage...", callback=progress_callback)
-        _predict(test_labels_file=test_labels_file, progress_callback=progress_callback)
+        _predict(test_labels_file=test_labels_file, progress_callback=progress_callback, cancel_token=cancel_token, cfg=cfg)
         # predict.py schreibt test_ergebnis_*.csv – einlesen und als dict für GUI zurückgeben
         ergebnisse = {}
-        for mdl in config.MODELS:
+        for mdl in cfg.models:
             csv_path = Path(artifacts_dir) / f"test_ergebnis_{mdl}.csv"
             if csv_path.exists():
                 df = pd.read_csv(csv_path)
                 ergebnisse[mdl] = df.to_dict("records")
         return True, None, ergebnisse
+    except Cancelled:
+        _abort(out_dir, progress_callback)
+        return False, "Abgebrochen", {}
     except SystemExit as e:
         return False, str(e) if e.code else "Unbekannter Fehler", {}
     except Exception as e:
@@ -109,8 +126,17 @@ def get_config() -> dict:
         "labels_file":{ "value": config.LABELS_FILE, "desc": "Label-Datei" },
         "test_labels_file":{ "value": config.TEST_LABELS_FILE, "desc": "Label-Datei zum Predicten" },
         "artifacts_dir":{ "value": config.ARTIFACTS_DIR, "desc": "Ausgabe-Ordner für Modelle" },
+        "cache_dir":{ "value": config.CACHE_DIR, "desc": "Ordner für persistente Caches" },
         "models":{ "value": config.MODELS, "desc": "Zu trainierende Modelltypen", "options": ["randomforest", "logreg", "gradientboosting"] },
         "use_grid_search":{ "value": config.USE_GRID_SEARCH, "desc": "GridSearch für Hyperparameter vor Training" },
+        "search_strategy":{ "value": config.SEARCH_STRATEGY, "desc": "Suchstrategie der Hyperparameter-Optimierung", "options": ["grid", "random", "halving"] },
+        "search_n_iter":{ "value": config.SEARCH_N_ITER, "desc": "Anzahl Kombinationen bei Zufallssuche" },
+        "n_jobs":{ "value": config.N_JOBS, "desc": "Anzahl paralleler Worker (-1 = alle CPUs)" },
+        "early_exit":{ "value": config.EARLY_EXIT, "desc": "Vorhersage abbrechen, sobald sie sicher ist" },
+        "early_exit_margin":{ "value": config.EARLY_EXIT_MARGIN, "desc": "Mindestabstand beste/zweitbeste Klasse für Abbruch" },
+        "early_exit_min_windows":{ "value": config.EARLY_EXIT_MIN_WINDOWS, "desc": "Min. Fenster vor Abbruch" },
+        "plots":{ "value": config.PLOTS, "desc": "Grafiken erzeugen", "options": ["deferred", "sync", "data", "off"] },
+        "profile":{ "value": config.PROFILE, "desc": "Laufzeit-/Speicherprofil (profile.json)", "options": ["off", "file", "print"] },
         "feature_set":{ "value": config.FEATURE_SET, "desc": "Zu verwendende Datensets", "options": ["featuretools", "tsfresh", "both"] },
         "window_sec":{ "value": config.WINDOW_SEC, "desc": "Fensterlänge (in Sekunden)" },
         "step_sec":{ "value": config.STEP_SEC, "desc": "Schrittweite (in Sekunden)" },
@@ -132,6 +158,7 @@ def set_config(settings : dict):
     if "labels_file" in settings: config.LABELS_FILE = Path(settings["labels_file"])
     if "test_labels_file" in settings: config.TEST_LABELS_FILE = Path(settings["test_labels_file"])
     if "artifacts_dir" in settings: config.ARTIFACTS_DIR = Path(settings["artifacts_dir"])
+    if "cache_dir" in settings: config.CACHE_DIR = Path(settings["cache_dir"])
     if "models" in settings: config.MODELS = list(settings["models"])
     if "feature_set" in settings: config.FEATURE_SET = settings["feature_set"]
     if "window_sec" in settings: config.WINDOW_SEC = int(settings["window_sec"])
@@ -141,6 +168,14 @@ def set_config(settings : dict):
     if "cv_splits" in settings: config.CV_SPLITS = int(settings["cv_splits"])
     if "random_state" in settings: config.RANDOM_STATE = int(settings["random_state"])
     if "use_grid_search" in settings: config.USE_GRID_SEARCH = bool(settings["use_grid_search"])
+    if "search_strategy" in settings: config.SEARCH_STRATEGY = settings["search_strategy"]
+    if "search_n_iter" in settings: config.SEARCH_N_ITER = int(settings["search_n_iter"])
+    if "n_jobs" in settings: config.N_JOBS = int(settings["n_jobs"])
+    if "early_exit" in settings: config.EARLY_EXIT = bool(settings["early_exit"])
+    if "early_exit_margin" in settings: config.EARLY_EXIT_MARGIN = float(settings["early_exit_margin"])
+    if "early_exit_min_windows" in settings: config.EARLY_EXIT_MIN_WINDOWS = int(settings["early_exit_min_windows"])
+    if "plots" in settings: config.PLOTS = settings["plots"]
+    if "profile" in settings: config.PROFILE = settings["profile"]
 
     print("Applied config")
     print(settings)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: batch
+============
+Vorhersage für beliebig viele Recordings ohne Label-Datei. Eingabe ist ein Ordner
+(mit Dateimuster, wie FileImporter.findFilesInFolder) oder ein Glob-Ausdruck.
+
+Die Recordings werden in kleinen Blöcken (CHUNK_SIZE) auf einen Worker-Pool verteilt;
+jeder Worker lädt die Modelle einmal beim Start (NumPy-Export per mmap, sonst die
+sklearn-Pipeline). Es sind nur wenige Blöcke gleichzeitig unterwegs, und jedes fertige
+Ergebnis wird sofort an die Ausgabedatei angehängt (CSV oder JSONL, eine Zeile pro
+Recording und Modell) – der Speicherbedarf hängt damit nicht von der Anzahl der
+Recordings ab.
+
+Spalten: recording, path, model, ist, margin, n_windows, p_<klasse>..., error
+
+CLI: python -m DriveIdent.lib.core.batch SOURCE [--pattern "*.csv"] [--out FILE] [--artifacts DIR] [--config PATH] [--n-jobs N]
+"""
+import argparse
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .aggregate import aggregate_recordings
+from .cancel import check_cancelled, shutdown_now
+from .data import find_recordings, find_windows, load_recording
+from .features import extract_features
+from .registry import get_estimator, get_metadata
+
+CHUNK_SIZE = 8          # Recordings pro Auftrag (eine Feature-Extraktion pro Block)
+IN_FLIGHT_PER_WORKER = 2  # Max. gleichzeitig offene Aufträge pro Worker
+CANCEL_POLL_SEC = 0.2   # Max. Wartezeit auf Ergebnisse zwischen zwei Abbruch-Prüfungen
+
+_worker_state = {}
+
+
+def _init_worker(artifacts_dir, cfg):
+    """Lädt Metadaten und Modelle einmal pro Prozess."""
+    models = cfg.models
+    meta = get_metadata(artifacts_dir, models[0])
+    estimators = {mdl: get_estimator(artifacts_dir, mdl) for mdl in models}
+    _worker_state.update(cfg=cfg, models=list(models), feat_cols=meta["feat_cols"], feature_set=meta["feature_set"], estimators=estimators)
+
+
+def _predict_chunk(paths) -> list[dict]:
+    """Vorhersage für einen Block von Recordings. Fehler betreffen nur das jeweilige Recording."""
+    rows, recs = [], []
+    for p in paths:
+        try:
+            name, d = load_recording(p)
+        except Exception as e:
+            rows.append({"recording": Path(p).name, "path": str(p), "error": str(e)})
+            continue
+        if not find_windows(d["t"], cfg=_worker_state["cfg"]):
+            rows.append({"recording": name, "path": str(p), "error": "Keine gültigen Fenster"})
+            continue
+        recs.append((str(p), d))  # Pfad als eindeutiger Recording-Schlüssel
+    if not recs:
+        return rows
+    if len(recs) > 1:
+        try:
+            return rows + _predict_recordings(recs)
+        except Exception:
+            pass  # Ein fehlerhaftes Recording soll nicht den ganzen Block verwerfen: einzeln wiederholen
+    for p, d in recs:
+        try:
+            rows.extend(_predict_recordings([(p, d)]))
+        except Exception as e:
+            rows.append({"recording": Path(p).name, "path": p, "error": str(e) or type(e).__name__})
+    return rows
+
+
+def _predict_recordings(recs) -> list[dict]:
+    """Feature-Extraktion und Vorhersage aller Modelle für [(Pfad, Zeitreihen-Dict)]."""
+    st = _worker_state
+    feat = extract_features(recs, [""] * len(recs), st["feature_set"], cfg=st["cfg"])
+    X = feat.reindex(columns=st["feat_cols"])
+    groups = feat["recording"].values
+    rows = []
+    for mdl in st["models"]:
+        est, classes, compiled = st["estimators"][mdl]
+        proba = est.predict_proba(X.to_numpy(dtype=float) if compiled else X)
+        votes = aggregate_recordings(proba, groups, classes)
+        for j, p in enumerate(votes.recordings):
+            row = {"recording": Path(p).name, "path": p, "model": mdl, "ist": str(votes.labels[j]),
+                   "margin": float(votes.margin[j]), "n_windows": int(votes.n_windows[j])}
+            row.update({f"p_{c}": float(v) for c, v in zip(classes, votes.proba[j])})
+            rows.append(row)
+    return rows
+
+
+class _ResultWriter:
+    """Hängt Zeilen an eine CSV- oder JSONL-Datei an und leert den Puffer nach jedem Block."""
+
+    def __init__(self, path: Path, columns: list[str]):
+        self.path, self.columns = Path(path), columns
+        self.jsonl = self.path.suffix.lower() in (".jsonl", ".json")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "w", encoding="utf-8", newline="")
+        if not self.jsonl:
+            self._csv = csv.DictWriter(self._f, fieldnames=columns, restval="", extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, rows: list[dict]) -> None:
+        for r in rows:
+            if self.jsonl:
+                self._f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            else:
+                self._csv.writerow(r)
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def predict_batch(source, out, pattern="*.csv", artifacts_dir=None, n_jobs=None, chunk_size=CHUNK_SIZE, progress=print, cancel_token=None, cfg=None) -> dict:
+    """
+    Sagt alle Recordings aus source vorher und schreibt die Ergebnisse fortlaufend nach out.
+
+    Args:
+        source: Ordner oder Glob-Ausdruck
+        out: Ausgabedatei (.csv oder .jsonl)
+        pattern: Dateimuster, falls source ein Ordner ist
+        artifacts_dir: Ordner mit Modellen (optional, sonst cfg.artifacts_dir)
+        n_jobs: Worker-Prozesse (optional, sonst cfg.n_jobs; <= 0 = alle CPUs)
+        chunk_size: Recordings pro Auftrag
+        progress: Callback für Statusmeldungen (None = still)
+        cancel_token: Optionales CancelToken; beendet die Worker sofort, bisherige Zeilen bleiben in out
+        cfg: RunConfig für Modelle, Fenster- und Feature-Parameter (optional, sonst aktuelle globale Konfiguration)
+
+    Returns:
+        {"n_recordings", "n_errors", "out"}
+    """
+    cfg = config.resolve(cfg)
+    artifacts_dir = Path(artifacts_dir or cfg.artifacts_dir)
+    cfg = cfg.replace(artifacts_dir=artifacts_dir)
+    models = list(cfg.models)
+    files = find_recordings(source, pattern)
+    if not files:
+        raise SystemExit(f"Keine Recordings gefunden: {source}")
+    classes = sorted({c for m in models for c in get_metadata(artifacts_dir, m)["classes"]})
+    columns = ["recording", "path", "model", "ist", "margin", "n_windows"] + [f"p_{c}" for c in classes] + ["error"]
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    n_jobs = n_jobs if n_jobs is not None else cfg.n_jobs
+    n_workers = max(1, min(n_jobs if n_jobs > 0 else (os.cpu_count() or 1), len(chunks)))
+
+    writer = _ResultWriter(out, columns)
+    done, n_errors = 0, 0
+    stop = None
+
+    def _emit(rows):
+        nonlocal done, n_errors
+        writer.write(rows)
+        done += len({r["path"] for r in rows})
+        n_errors += sum(1 for r in rows if r.get("error"))
+        if progress:
+            progress(f"{done}/{len(files)} Recordings")
+
+    try:
+        if n_workers == 1:
+            _init_worker(artifacts_dir, cfg)
+            for chunk in chunks:
+                check_cancelled(cancel_token)
+                _emit(_predict_chunk(chunk))
+        else:
+            with ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(artifacts_dir, cfg)) as ex:
+                if cancel_token is not None:
+                    stop = cancel_token.on_cancel(lambda: shutdown_now(ex))
+                pending, it = set(), iter(chunks)
+                for chunk in it:
+                    pending.add(ex.submit(_predict_chunk, chunk))
+                    if len(pending) >= n_workers * IN_FLIGHT_PER_WORKER:
+                        break
+                while pending:
+                    check_cancelled(cancel_token)
+                    finished, pending = wait(pending, timeout=CANCEL_POLL_SEC, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        check_cancelled(cancel_token)  # Beendete Worker liefern BrokenProcessPool
+                        _emit(fut.result())
+                        nxt = next(it, None)
+                        if nxt is not None:
+                            pending.add(ex.submit(_predict_chunk, nxt))
+    finally:
+        if stop is not None:
+            cancel_token.remove(stop)
+        writer.close()
+    return {"n_recordings": len(files), "n_errors": n_errors, "out": str(out)}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Vorhersage für einen Ordner oder Glob ohne Label-Datei.")
+    p.add_argument("source", type=str, help="Ordner mit Recordings oder Glob-Ausdruck (z.B. 'data/rec_*.csv')")
+    p.add_argument("--pattern", type=str, default="*.csv", help="Dateimuster, falls SOURCE ein Ordner ist")
+    p.add_argument("--out", type=str, default="batch_ergebnis.csv", help="Ausgabedatei (.csv oder .jsonl)")
+    p.add_argument("--artifacts", type=str, help="Ordner mit Modellen")
+    p.add_argument("--config", type=str, help="Pfad zu config.json")
+    p.add_argument("--n-jobs", type=int, help="Worker-Prozesse (-1 = alle CPUs)")
+    args = p.parse_args()
+    if args.config:
+        config._load_from_file(args.config)
+    cfg = config.current().replace(artifacts_dir=args.artifacts)
+    res = predict_batch(args.source, args.out, args.pattern, n_jobs=args.n_jobs, cfg=cfg)
+    print(f"Fertig: {res['n_recordings']} Recordings ({res['n_errors']} Fehler) -> {res['out']}")
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: cache
+============
+Persistente Caches der Pipeline. Ergebnisse werden über Fingerprints (SHA-256 über
+Daten und Parameter) adressiert, sodass unveränderte Eingaben nicht neu berechnet
+werden müssen. Liegt im Ordner config.CACHE_DIR (nicht im artifacts-Ordner, der
+vom GUI beim Start geleert wird).
+
+- fingerprint(): Stabiler Hash über DataFrames, Arrays, Listen, Dicts und Skalare
+- load_json() / save_json(): JSON lesen bzw. atomar schreiben (Temp-Datei + Rename)
+- SearchCache: Fold-Scores der Hyperparameter-Suche pro
+  (Modell, Parameterkombination, Fold-Zuordnung, Feature-Matrix)
+- PredictionCache: Recording-Ergebnisse der Vorhersage pro
+  (Modell-Artefakt, Inhalt der Recording-Datei)
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .registry import model_path
+
+
+def _update(h, obj):
+    """Schreibt obj typabhängig in den Hash h (rekursiv für Listen/Dicts)."""
+    if isinstance(obj, pd.DataFrame):
+        _update(h, [str(c) for c in obj.columns])
+        _update(h, obj.to_numpy())
+    elif isinstance(obj, pd.Series):
+        _update(h, obj.to_numpy())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"{obj.dtype.str}{obj.shape}".encode())
+        if obj.dtype == object:
+            h.update("\x1f".join(map(str, obj.ravel())).encode())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(b"[")
+        for o in obj:
+            _update(h, o)
+        h.update(b"]")
+    elif isinstance(obj, dict):
+        _update(h, sorted(((str(k), v) for k, v in obj.items()), key=lambda kv: kv[0]))
+    else:
+        h.update(repr(obj).encode())
+        h.update(b"\x1e")
+
+
+def fingerprint(*parts) -> str:
+    """
+    Berechnet einen stabilen Fingerprint über alle übergebenen Objekte.
+
+    Returns:
+        str: Hex-Digest (16 Zeichen)
+    """
+    h = hashlib.sha256()
+    for p in parts:
+        _update(h, p)
+    return h.hexdigest()[:16]
+
+
+def load_json(path: Path, default=None):
+    """Lädt JSON aus path; bei fehlender oder defekter Datei wird default geliefert."""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return default
+
+
+def save_json(path: Path, data) -> None:
+    """
+    Schreibt data atomar als JSON nach path (eindeutige Temp-Datei + os.replace, sicher
+    auch bei gleichzeitigen Schreibern in Threads und Prozessen). Schreibfehler werden
+    gemeldet, brechen den Lauf aber nicht ab – Cache und Zwischenergebnisse sind optional.
+    """
+    path = Path(path)
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=path.parent, prefix=f"{path.name}.",
+                                         suffix=".tmp", delete=False) as f:
+            tmp = Path(f.name)
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"Warnung: {path} konnte nicht geschrieben werden: {e}")
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+
+
+class SearchCache:
+    """
+    Fold-Scores der Hyperparameter-Suche. Eine Datei pro (Modell, Feature-Matrix,
+    Fold-Zuordnung); darin pro Parameterkombination {fold_index: accuracy}.
+    Wird das Grid erweitert, sind nur die neuen Kombinationen unbekannt.
+    put() sammelt im Speicher, flush() schreibt die Datei (gebündelt durch den Aufrufer).
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str, data_fp: str, folds_fp: str):
+        self.path = Path(cache_dir) / "search" / f"{model_name}_{data_fp}_{folds_fp}.json"
+        self.entries = load_json(self.path, {})
+        self._dirty = False
+
+    @staticmethod
+    def key(params: dict, base_params: dict) -> str:
+        """Schlüssel einer Parameterkombination inkl. fester Basisparameter."""
+        return json.dumps({**params, **base_params}, sort_keys=True, default=str)
+
+    def get(self, key: str, fold: int):
+        """Gecachter Score für (Kombination, Fold) oder None."""
+        return self.entries.get(key, {}).get(str(fold))
+
+    def put(self, key: str, fold: int, score: float) -> None:
+        """Speichert einen Score im Speicher; geschrieben wird erst mit flush()."""
+        self.entries.setdefault(key, {})[str(fold)] = float(score)
+        self._dirty = True
+
+    def flush(self) -> None:
+        """Schreibt die Cache-Datei, falls seit dem letzten flush() Scores hinzugekommen sind."""
+        if self._dirty:
+            save_json(self.path, self.entries)
+            self._dirty = False
+
+
+def search_cache_for(model_name, X, y, groups, folds_fp, cache_dir=None, cfg=None) -> SearchCache:
+    """
+    Öffnet den SearchCache für ein Modell. Der Schlüssel umfasst die Feature-Matrix
+    (Spalten, Werte, Labels, Recordings) und die Fold-Zuordnung (FoldPlan.fingerprint).
+    cache_dir: optional, sonst cfg.cache_dir.
+    """
+    cache_dir = Path(cache_dir or config.resolve(cfg).cache_dir)
+    data_fp = fingerprint(X, np.asarray(y, dtype=str), np.asarray(groups, dtype=str))
+    return SearchCache(cache_dir, model_name, data_fp, folds_fp)
+
+
+def file_fingerprint(path) -> str:
+    """SHA-256 über den Dateiinhalt (16 Zeichen) – unabhängig von Name und Änderungszeit."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+class PredictionCache:
+    """
+    Vorhersage-Ergebnisse pro Recording. Eine Datei pro (Modell, Artefakt-Fingerprint);
+    darin pro Recording-Inhalt {proba, classes, ist, margin, n_windows}. Ein neu
+    trainiertes Modell erhält einen neuen Fingerprint und damit einen leeren Cache.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str, model_fp: str):
+        self.path = Path(cache_dir) / "predictions" / f"{model_name}_{model_fp}.json"
+        self.entries = load_json(self.path, {})
+        self._dirty = False
+
+    def get(self, rec_fp: str):
+        """Gecachtes Ergebnis für ein Recording oder None."""
+        return self.entries.get(rec_fp)
+
+    def put(self, rec_fp: str, entry: dict) -> None:
+        self.entries[rec_fp] = entry
+        self._dirty = True
+
+    def save(self) -> None:
+        """Schreibt die Cache-Datei (nur bei Änderungen)."""
+        if self._dirty:
+            save_json(self.path, self.entries)
+            self._dirty = False
+
+
+def prediction_cache_for(artifacts_dir, model_name, cache_dir=None, cfg=None) -> PredictionCache:
+    """
+    Öffnet den PredictionCache für ein Modell. Der Schlüssel umfasst den Inhalt von
+    model_*.joblib und die Fensterparameter (aus cfg), die die Features der Recordings bestimmen.
+    """
+    cfg = config.resolve(cfg)
+    cache_dir = Path(cache_dir or cfg.cache_dir)
+    model_fp = fingerprint(file_fingerprint(model_path(artifacts_dir, model_name)),
+                           [cfg.window_sec, cfg.step_sec, cfg.min_points, cfg.max_points])
+    return PredictionCache(cache_dir, model_name, model_fp)
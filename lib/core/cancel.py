@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: cancel
+=============
+Kooperativer Abbruch von Training und Vorhersage. Ein CancelToken wird vom Aufrufer
+(z.B. GUI, Abbrechen-Button) erzeugt und durch train()/predict() bis in die Schleifen
+gereicht (Laden und Extraktion pro Recording, TSFresh-Blöcke, CV-Folds, Kombinationen der
+Hyperparameter-Suche). Diese prüfen das Token mit check_cancelled() und werfen Cancelled.
+
+Worker-Pools registrieren sich mit on_cancel(): Beim Abbruch werden ausstehende Aufgaben
+verworfen und laufende Worker-Prozesse beendet, damit die CPUs sofort frei werden.
+
+- CancelToken: cancel(), cancelled, check(), on_cancel()
+- check_cancelled(token): wie token.check(), token darf None sein
+- shutdown_now(executor): ProcessPoolExecutor ohne Warten beenden
+
+Die Ausgaben eines abgebrochenen Laufs verwirft staging.py.
+"""
+import threading
+from typing import Callable
+
+
+class Cancelled(Exception):
+    """Lauf wurde über ein CancelToken abgebrochen."""
+
+
+class CancelToken:
+    """Thread-sicheres Abbruch-Signal. cancel() darf aus jedem Thread aufgerufen werden."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Setzt das Signal und ruft die registrierten Callbacks einmalig auf."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                print(f"Abbruch-Callback fehlgeschlagen: {repr(e)}")
+
+    def check(self) -> None:
+        """Wirft Cancelled, falls abgebrochen wurde."""
+        if self._event.is_set():
+            raise Cancelled("Abgebrochen")
+
+    def on_cancel(self, fn: Callable[[], None]) -> Callable[[], None]:
+        """Registriert fn für den Abbruch (sofortiger Aufruf, falls schon abgebrochen)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(fn)
+                return fn
+        fn()
+        return fn
+
+    def remove(self, fn: Callable[[], None]) -> None:
+        """Entfernt einen mit on_cancel() registrierten Callback."""
+        with self._lock:
+            if fn in self._callbacks:
+                self._callbacks.remove(fn)
+
+
+def check_cancelled(token: CancelToken | None) -> None:
+    """Wirft Cancelled, falls token abgebrochen wurde (None = kein Abbruch möglich)."""
+    if token is not None:
+        token.check()
+
+
+def shutdown_now(executor) -> None:
+    """
+    Beendet einen ProcessPoolExecutor ohne auf laufende Aufgaben zu warten: ausstehende
+    Aufgaben werden verworfen, die Worker-Prozesse beendet.
+    """
+    executor.shutdown(wait=False, cancel_futures=True)
+    # ProcessPoolExecutor bietet (vor Python 3.14) kein öffentliches terminate
+    for proc in list((getattr(executor, "_processes", None) or {}).values()):
+        try:
+            proc.terminate()
+        except Exception:
+            pass
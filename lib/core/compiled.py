@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: compiled
+===============
+Export trainierter Pipelines in flache NumPy-Arrays und reiner NumPy-Evaluator.
+Eine Pipeline (SimpleImputer -> StandardScaler -> Klassifikator) wird zu:
+    - Imputer: Indizes der gültigen Spalten, Mediane
+    - Scaler: mean_, scale_
+    - RandomForest / GradientBoosting: eine flache Knotentabelle aller Bäume (links,
+      rechts, Feature, Schwelle, Werte; jeder Baum auf gemeinsame Knotenzahl aufgefüllt)
+    - LogisticRegression: Koeffizienten und Intercept
+
+Der Evaluator traversiert alle Bäume gleichzeitig (eine Schleife über die Baumtiefe
+statt über Bäume und Samples) und bildet die Rechenschritte von sklearn in derselben
+Reihenfolge und mit denselben Datentypen nach (float32-Eingabe für Bäume, Summation
+Baum für Baum, Softmax/Expit wie sklearn). Die Wahrscheinlichkeiten sind damit
+bitgleich zu Pipeline.predict_proba; save_compiled prüft das auf Wunsch direkt.
+
+Gespeichert wird ein Ordner model_<name>_arrays/ mit einer unkomprimierten .npy-Datei
+pro Array. load_compiled blendet die Dateien per mmap ein: es wird weder sklearn noch
+joblib importiert, und parallele Worker-Prozesse teilen sich eine physische Kopie.
+
+Hauptfunktionen:
+    compile_pipeline() - Pipeline -> Dict flacher Arrays
+    CompiledModel      - predict_proba() auf den Arrays
+    compiled_path()    - Pfad des Exports im artifacts-Ordner (model_*_arrays/)
+    save_compiled()    - Export (optional mit Prüfung gegen die Pipeline)
+    load_compiled()    - Export laden (mmap)
+
+CLI: python -m DriveIdent.lib.core.compiled [--artifacts DIR] [--config PATH]
+"""
+import argparse
+import errno
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+from scipy.special import expit
+
+_LEAF = -1  # Kennzeichen für Blätter in children_left (wie sklearn)
+
+
+def _tree_arrays(trees) -> dict:
+    """
+    Knoten-Arrays mehrerer sklearn-Bäume als eine flache Knotentabelle: jeder Baum
+    belegt n_nodes Einträge (aufgefüllt auf die größte Knotenzahl), Kind-Verweise sind
+    globale Indizes. Die Arrays werden so ohne Umrechnung direkt per mmap genutzt.
+    """
+    n_nodes = max(t.node_count for t in trees)
+    n = len(trees)
+    left = np.full((n, n_nodes), _LEAF, dtype=np.intp)
+    right = np.full((n, n_nodes), _LEAF, dtype=np.intp)
+    feature = np.zeros((n, n_nodes), dtype=np.intp)
+    threshold = np.zeros((n, n_nodes), dtype=np.float64)
+    missing_left = np.zeros((n, n_nodes), dtype=bool)
+    value = np.zeros((n, n_nodes) + trees[0].value.shape[2:], dtype=np.float64)
+    for i, t in enumerate(trees):
+        k, base = t.node_count, i * n_nodes
+        left[i, :k] = np.where(t.children_left == _LEAF, _LEAF, t.children_left + base)
+        right[i, :k] = np.where(t.children_right == _LEAF, _LEAF, t.children_right + base)
+        feature[i, :k] = np.maximum(t.feature, 0)  # Blätter haben feature -2
+        threshold[i, :k] = t.threshold
+        if hasattr(t, "missing_go_to_left"):
+            missing_left[i, :k] = t.missing_go_to_left
+        value[i, :k] = t.value[:, 0]
+    depth = max(t.max_depth for t in trees)
+    return {"left": left.ravel(), "right": right.ravel(), "feature": feature.ravel(), "threshold": threshold.ravel(),
+            "missing_left": missing_left.ravel(), "value": value.reshape((n * n_nodes,) + value.shape[2:]),
+            "n_trees": np.array(n), "n_nodes": np.array(n_nodes), "depth": np.array(depth)}
+
+
+def compile_pipeline(pipe) -> dict:
+    """
+    Wandelt eine trainierte Pipeline (imputer, scaler, clf) in ein Dict flacher Arrays um.
+
+    Raises:
+        ValueError: Klassifikator wird nicht unterstützt
+    """
+    imp, sc, clf = pipe.named_steps["imputer"], pipe.named_steps["scaler"], pipe.named_steps["clf"]
+    classes = np.asarray(clf.classes_)
+    if classes.dtype == object:
+        classes = classes.astype(str)  # .npy ohne Pickle – Objekt-Arrays nicht ladbar
+    stats = np.asarray(imp.statistics_, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(stats))
+    out = {
+        "classes": classes,
+        "n_features_in": np.array(len(stats)),
+        "imputer_valid": valid,
+        "imputer_stats": stats[valid],
+        "scaler_mean": np.asarray(sc.mean_ if sc.mean_ is not None else np.zeros(len(valid)), dtype=np.float64),
+        "scaler_scale": np.asarray(sc.scale_ if sc.scale_ is not None else np.ones(len(valid)), dtype=np.float64),
+    }
+    name = type(clf).__name__
+    if name == "RandomForestClassifier":
+        out["kind"] = np.array("forest")
+        out.update({f"tree_{k}": v for k, v in _tree_arrays([e.tree_ for e in clf.estimators_]).items()})
+        out["tree_value"] = np.ascontiguousarray(out["tree_value"][:, :len(clf.classes_)])
+    elif name == "GradientBoostingClassifier":
+        out["kind"] = np.array("boosting")
+        n_stages, K = clf.estimators_.shape
+        out.update({f"tree_{k}": v for k, v in _tree_arrays([e.tree_ for e in clf.estimators_.ravel()]).items()})
+        out["tree_value"] = np.ascontiguousarray(out["tree_value"][:, 0])
+        out["n_stages"], out["n_outputs"] = np.array(n_stages), np.array(K)
+        out["learning_rate"] = np.array(float(clf.learning_rate))
+        # Startwert (Prior des init-Schätzers) ist für alle Samples gleich – einmal berechnen
+        out["init_raw"] = clf._raw_predict_init(np.zeros((1, clf.n_features_in_), dtype=np.float32))[0]
+    elif name == "LogisticRegression":
+        out["kind"] = np.array("linear")
+        # Speicherlayout beibehalten (.npy speichert Fortran-Order) – BLAS rundet sonst anders
+        out["coef"] = np.asarray(clf.coef_, dtype=np.float64)
+        out["intercept"] = np.asarray(clf.intercept_, dtype=np.float64)
+    else:
+        raise ValueError(f"Klassifikator nicht unterstützt: {name}")
+    return out
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    """Softmax wie sklearn.utils.extmath.softmax (in-place auf x)."""
+    x -= np.max(x, axis=1).reshape((-1, 1))
+    np.exp(x, out=x)
+    x /= np.sum(x, axis=1).reshape((-1, 1))
+    return x
+
+
+class CompiledModel:
+    """
+    Reiner NumPy-Evaluator eines exportierten Modells.
+
+    Args:
+        arrays: Dict von Arrays aus compile_pipeline (auch per mmap geladen)
+    """
+
+    def __init__(self, arrays):
+        a = {k: np.asarray(arrays[k]) for k in arrays}  # memmap -> ndarray-Sicht (ohne Kopie, ohne Subklassen-Overhead)
+        self.kind = str(a["kind"])
+        self.classes_ = a["classes"]
+        self.n_features_in = int(a["n_features_in"])
+        self.feat_cols = [str(c) for c in a["feat_cols"]] if "feat_cols" in a else None
+        self.feature_set = str(a["feature_set"]) if "feature_set" in a else None
+        self._a = a
+
+    def _preprocess(self, X) -> np.ndarray:
+        a = self._a
+        X = np.asarray(X, dtype=np.float64)
+        if len(a["imputer_valid"]) != X.shape[1]:
+            X = X[:, a["imputer_valid"]]  # Spalten ohne Trainingswerte verwirft auch SimpleImputer
+        X = np.where(np.isnan(X), a["imputer_stats"], X)
+        X -= a["scaler_mean"]
+        X /= a["scaler_scale"]
+        return X
+
+    def _leaf_values(self, X32: np.ndarray) -> np.ndarray:
+        """Blattwerte pro (Baum, Sample) – alle Bäume gleichzeitig, eine Iteration pro Ebene."""
+        a = self._a
+        n, n_feat = X32.shape
+        xflat = X32.ravel()
+        offs = (np.arange(n) * n_feat)[None, :]
+        node = np.repeat((np.arange(int(a["tree_n_trees"])) * int(a["tree_n_nodes"]))[:, None], n, axis=1)
+        for _ in range(int(a["tree_depth"])):
+            lc = a["tree_left"].take(node)
+            x = xflat.take(offs + a["tree_feature"].take(node))
+            go_left = x <= a["tree_threshold"].take(node)
+            nan = np.isnan(x)
+            if nan.any():
+                go_left = np.where(nan, a["tree_missing_left"].take(node), go_left)
+            node = np.where(lc == _LEAF, node, np.where(go_left, lc, a["tree_right"].take(node)))
+        return a["tree_value"].take(node, axis=0)
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Wahrscheinlichkeiten (n_samples, n_classes), Spalten in Reihenfolge classes_."""
+        a = self._a
+        X = self._preprocess(X)
+        if self.kind == "linear":
+            scores = X @ a["coef"].T + a["intercept"]
+            if len(self.classes_) <= 2:
+                prob = expit(scores.reshape((-1,)))
+                return np.stack([1 - prob, prob], axis=1)
+            return _softmax(scores)
+        X32 = np.ascontiguousarray(X, dtype=np.float32)
+        vals = self._leaf_values(X32)
+        if self.kind == "forest":
+            proba = np.zeros((X32.shape[0], len(self.classes_)))
+            for v in vals:  # Summation Baum für Baum wie RandomForestClassifier
+                proba += v
+            proba /= len(vals)
+            return proba
+        K, lr = int(a["n_outputs"]), float(a["learning_rate"])
+        raw = np.tile(a["init_raw"], (X32.shape[0], 1))
+        vals = vals.reshape(int(a["n_stages"]), K, -1)
+        for v in vals:  # Stufe für Stufe wie predict_stages
+            raw += (lr * v).T
+        if K == 1:
+            proba = np.empty((X32.shape[0], 2))
+            proba[:, 1] = expit(raw.ravel())
+            proba[:, 0] = 1 - proba[:, 1]
+            return proba
+        return _softmax(raw)
+
+
+def compiled_path(artifacts_dir, model_name: str) -> Path:
+    """Ordner des exportierten Modells im artifacts-Ordner (eine .npy-Datei pro Array)."""
+    return Path(artifacts_dir) / f"model_{model_name}_arrays"
+
+
+def save_compiled(path, pipe, feat_cols, feature_set, X_check=None) -> bool:
+    """
+    Exportiert eine Pipeline als Ordner unkomprimierter .npy-Dateien (per mmap ladbar).
+    Der Ordner wird vollständig neu geschrieben und erst danach an seinen Platz gesetzt.
+    Mit X_check wird geprüft, ob die Vorhersagen bitgleich zu pipe.predict_proba sind.
+
+    Returns:
+        True, wenn bitgleich (oder keine Prüfung angefordert)
+    """
+    path = Path(path)
+    arrays = compile_pipeline(pipe)
+    arrays["feat_cols"] = np.asarray(list(feat_cols), dtype=str)
+    arrays["feature_set"] = np.array(feature_set)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Eindeutiger Temp-Ordner: gleichzeitige Läufe im selben Prozess überschreiben sich nicht
+    tmp = Path(tempfile.mkdtemp(prefix=f"{path.name}.", suffix=".tmp", dir=path.parent))
+    try:
+        os.chmod(tmp, 0o755)  # mkdtemp legt 0o700 an; der Export bleibt für andere Prozesse lesbar
+        for k, v in arrays.items():
+            np.save(tmp / f"{k}.npy", v, allow_pickle=False)
+        while True:
+            shutil.rmtree(path, ignore_errors=True)
+            try:
+                os.replace(tmp, path)
+                break
+            except OSError as e:
+                # Ein gleichzeitiger Export hat path inzwischen neu angelegt – erneut ersetzen
+                if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                    raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    if X_check is None:
+        return True
+    return bool(np.array_equal(CompiledModel(arrays).predict_proba(np.asarray(X_check, dtype=np.float64)),
+                               pipe.predict_proba(X_check)))
+
+
+def load_compiled(path, mmap_mode="r") -> CompiledModel:
+    """
+    Lädt ein mit save_compiled exportiertes Modell. Mit mmap_mode="r" (Standard) werden
+    die Arrays nur eingeblendet – mehrere Prozesse teilen sich dieselben Seiten im
+    Page-Cache des Betriebssystems.
+    """
+    path = Path(path)
+    return CompiledModel({f.stem: np.load(f, mmap_mode=mmap_mode, allow_pickle=False) for f in sorted(path.glob("*.npy"))})
+
+
+if __name__ == "__main__":
+    from . import config
+    from .registry import get_model
+
+    p = argparse.ArgumentParser(description="Exportiert trainierte Modelle als NumPy-Arrays (model_*_arrays/).")
+    p.add_argument("--artifacts", type=str, help="Ordner mit Modellen")
+    p.add_argument("--config", type=str, help="Pfad zu config.json")
+    args = p.parse_args()
+    if args.config:
+        config._load_from_file(args.config)
+    artifacts_dir = Path(args.artifacts or config.ARTIFACTS_DIR)
+    for mdl in config.MODELS:
+        art = get_model(artifacts_dir, mdl)
+        out = compiled_path(artifacts_dir, mdl)
+        save_compiled(out, art.pipe, art.feat_cols, art.feature_set)
+        print(f"Exportiert: {out}")
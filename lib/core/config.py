@@ -9,14 +9,20 @@ Feature-Set, Cross-Validation, GridSearch).
 - Lädt Einstellungen aus config.json beim Import (falls vorhanden)
 - apply_overrides() überschreibt Werte zur Laufzeit (CLI, GUI)
 - Standardwerte gelten, wenn keine config.json existiert
+- RunConfig: unveränderliche Konfiguration eines Laufs. train(), predict(),
+  extract_features(), find_windows() und run_grid_search() nehmen sie als cfg;
+  die globalen Werte sind nur noch die Voreinstellung (current()). Mehrere Läufe im
+  selben Prozess (Threads) beeinflussen sich damit nicht.
 
 Verwendung:
     from . import config
     config.apply_overrides(data_dir="data", cv_splits=5)
+    cfg = config.current().replace(artifacts_dir="artifacts_b", plots="off")
 """
 import json
 import sys
 from pathlib import Path
+from typing import NamedTuple
 
 # Projekt-Root für relativen Pfad zu config.json (PyInstaller vs. normaler Lauf)
 if getattr(sys, "frozen", False):
@@ -29,8 +35,17 @@ DATA_DIR = Path("data")                    # Ordner mit CSV-Recordings
 LABELS_FILE = Path("labels.lbl")           # Trainings-Label-Datei
 TEST_LABELS_FILE = Path("test_labels.lbl")  # Test-Label-Datei
 ARTIFACTS_DIR = Path("artifacts")          # Ausgabe-Ordner für Modelle und Ergebnisse
+CACHE_DIR = Path("cache")                  # Persistente Caches (z.B. Ergebnisse der Hyperparameter-Suche)
 MODELS = ["randomforest", "logreg", "gradientboosting"]  # Zu trainierende Modelltypen
 USE_GRID_SEARCH = False                    # Bei True: GridSearch vor Training
+SEARCH_STRATEGY = "grid"                   # "grid" | "random" | "halving" (Hyperparameter-Suche)
+SEARCH_N_ITER = 10                         # Budget an Kombinationen bei search_strategy "random"
+N_JOBS = -1                                # Worker-Prozesse für parallele Auswertung (-1 = alle CPUs)
+EARLY_EXIT = False                         # Bei True: Vorhersage bricht pro Recording ab, sobald sie sicher ist
+EARLY_EXIT_MARGIN = 0.5                    # Abstand beste/zweitbeste Klasse, ab dem abgebrochen wird
+EARLY_EXIT_MIN_WINDOWS = 3                 # Mindestanzahl Fenster vor einem Abbruch
+PLOTS = "deferred"                         # "deferred" (Hintergrund-Thread) | "sync" | "data" (nur plots/data/*.json) | "off"
+PROFILE = "off"                            # "off" | "file" (artifacts_dir/profile.json) | "print" (zusätzlich Tabelle); Umgebungsvariable DRIVEIDENT_PROFILE hat Vorrang
 FEATURE_SET = "both"                       # "featuretools" | "tsfresh" | "both"
 WINDOW_SEC, STEP_SEC, MIN_POINTS, MAX_POINTS = 25, 12, 300, 500  # Fenster, Schritt, Min/Max-Punkte
 CV_SPLITS = 5                              # Anzahl Folds für Cross-Validation
@@ -45,9 +60,10 @@ def _load_from_file(path=None):
     Args:
         path: Pfad zu config.json (optional, sonst _PROJ/config.json)
     """
-    global DATA_DIR, LABELS_FILE, TEST_LABELS_FILE, ARTIFACTS_DIR
+    global DATA_DIR, LABELS_FILE, TEST_LABELS_FILE, ARTIFACTS_DIR, CACHE_DIR
     global MODELS, FEATURE_SET, WINDOW_SEC, STEP_SEC, MIN_POINTS, MAX_POINTS
-    global CV_SPLITS, RANDOM_STATE, USE_GRID_SEARCH
+    global CV_SPLITS, RANDOM_STATE, USE_GRID_SEARCH, SEARCH_STRATEGY, SEARCH_N_ITER, N_JOBS
+    global EARLY_EXIT, EARLY_EXIT_MARGIN, EARLY_EXIT_MIN_WINDOWS, PLOTS, PROFILE
     cfg_path = path or (_PROJ / "config.json")
     if not cfg_path.exists():
         print("Config file not found")
@@ -59,6 +75,7 @@ def _load_from_file(path=None):
     if "labels_file" in d: LABELS_FILE = Path(d["labels_file"])
     if "test_labels_file" in d: TEST_LABELS_FILE = Path(d["test_labels_file"])
     if "artifacts_dir" in d: ARTIFACTS_DIR = Path(d["artifacts_dir"])
+    if "cache_dir" in d: CACHE_DIR = Path(d["cache_dir"])
     if "models" in d: MODELS = list(d["models"])
     if "feature_set" in d: FEATURE_SET = d["feature_set"]
     if "window_sec" in d: WINDOW_SEC = int(d["window_sec"])
@@ -68,6 +85,14 @@ def _load_from_file(path=None):
     if "cv_splits" in d: CV_SPLITS = int(d["cv_splits"])
     if "random_state" in d: RANDOM_STATE = int(d["random_state"])
     if "use_grid_search" in d: USE_GRID_SEARCH = bool(d["use_grid_search"])
+    if "search_strategy" in d: SEARCH_STRATEGY = d["search_strategy"]
+    if "search_n_iter" in d: SEARCH_N_ITER = int(d["search_n_iter"])
+    if "n_jobs" in d: N_JOBS = int(d["n_jobs"])
+    if "early_exit" in d: EARLY_EXIT = bool(d["early_exit"])
+    if "early_exit_margin" in d: EARLY_EXIT_MARGIN = float(d["early_exit_margin"])
+    if "early_exit_min_windows" in d: EARLY_EXIT_MIN_WINDOWS = int(d["early_exit_min_windows"])
+    if "plots" in d: PLOTS = d["plots"]
+    if "profile" in d: PROFILE = d["profile"]
 
 
 def apply_overrides(**kwargs):
@@ -75,17 +100,20 @@ def apply_overrides(**kwargs):
     Überschreibt Konfiguration mit übergebenen Werten (z.B. aus CLI oder backend_api).
 
     Args:
-        **kwargs: data_dir, labels_file, test_labels_file, artifacts_dir, models,
+        **kwargs: data_dir, labels_file, test_labels_file, artifacts_dir, cache_dir, models,
                   feature_set, window_sec, step_sec, min_points, max_points,
-                  cv_splits, random_state
+                  cv_splits, random_state, use_grid_search, search_strategy, search_n_iter, n_jobs,
+                  early_exit, early_exit_margin, early_exit_min_windows, plots, profile
     """
-    global DATA_DIR, LABELS_FILE, TEST_LABELS_FILE, ARTIFACTS_DIR
+    global DATA_DIR, LABELS_FILE, TEST_LABELS_FILE, ARTIFACTS_DIR, CACHE_DIR
     global MODELS, FEATURE_SET, WINDOW_SEC, STEP_SEC, MIN_POINTS, MAX_POINTS
-    global CV_SPLITS, RANDOM_STATE, USE_GRID_SEARCH
+    global CV_SPLITS, RANDOM_STATE, USE_GRID_SEARCH, SEARCH_STRATEGY, SEARCH_N_ITER, N_JOBS
+    global EARLY_EXIT, EARLY_EXIT_MARGIN, EARLY_EXIT_MIN_WINDOWS, PLOTS, PROFILE
     if "data_dir" in kwargs: DATA_DIR = Path(kwargs["data_dir"])
     if "labels_file" in kwargs: LABELS_FILE = Path(kwargs["labels_file"])
     if "test_labels_file" in kwargs: TEST_LABELS_FILE = Path(kwargs["test_labels_file"])
     if "artifacts_dir" in kwargs: ARTIFACTS_DIR = Path(kwargs["artifacts_dir"])
+    if "cache_dir" in kwargs: CACHE_DIR = Path(kwargs["cache_dir"])
     if "models" in kwargs: MODELS = list(kwargs["models"])
     if "feature_set" in kwargs: FEATURE_SET = kwargs["feature_set"]
     if "window_sec" in kwargs: WINDOW_SEC = int(kwargs["window_sec"])
@@ -95,6 +123,72 @@ def apply_overrides(**kwargs):
     if "cv_splits" in kwargs: CV_SPLITS = int(kwargs["cv_splits"])
     if "random_state" in kwargs: RANDOM_STATE = int(kwargs["random_state"])
     if "use_grid_search" in kwargs: USE_GRID_SEARCH = bool(kwargs["use_grid_search"])
+    if "search_strategy" in kwargs: SEARCH_STRATEGY = kwargs["search_strategy"]
+    if "search_n_iter" in kwargs: SEARCH_N_ITER = int(kwargs["search_n_iter"])
+    if "n_jobs" in kwargs: N_JOBS = int(kwargs["n_jobs"])
+    if "early_exit" in kwargs: EARLY_EXIT = bool(kwargs["early_exit"])
+    if "early_exit_margin" in kwargs: EARLY_EXIT_MARGIN = float(kwargs["early_exit_margin"])
+    if "early_exit_min_windows" in kwargs: EARLY_EXIT_MIN_WINDOWS = int(kwargs["early_exit_min_windows"])
+    if "plots" in kwargs: PLOTS = kwargs["plots"]
+    if "profile" in kwargs: PROFILE = kwargs["profile"]
+
+
+class RunConfig(NamedTuple):
+    """Unveränderliche Konfiguration eines Laufs (Felder wie die Schlüssel von apply_overrides)."""
+    data_dir: Path
+    labels_file: Path
+    test_labels_file: Path
+    artifacts_dir: Path
+    cache_dir: Path
+    models: tuple
+    feature_set: str
+    window_sec: int
+    step_sec: int
+    min_points: int
+    max_points: int
+    cv_splits: int
+    random_state: int
+    use_grid_search: bool
+    search_strategy: str
+    search_n_iter: int
+    n_jobs: int
+    early_exit: bool
+    early_exit_margin: float
+    early_exit_min_windows: int
+    plots: str
+    profile: str
+
+    def replace(self, **kwargs) -> "RunConfig":
+        """Kopie mit geänderten Werten (gleiche Umwandlungen wie apply_overrides, None = unverändert)."""
+        unknown = set(kwargs) - set(self._fields)
+        if unknown:
+            raise TypeError(f"Unbekannte Konfigurationswerte: {', '.join(sorted(unknown))}")
+        return self._replace(**{k: _CONVERT[k](v) for k, v in kwargs.items() if v is not None})
+
+
+# Umwandlung der Werte pro Feld (wie in apply_overrides)
+_CONVERT = {
+    "data_dir": Path, "labels_file": Path, "test_labels_file": Path, "artifacts_dir": Path, "cache_dir": Path,
+    "models": tuple, "feature_set": str, "window_sec": int, "step_sec": int, "min_points": int, "max_points": int,
+    "cv_splits": int, "random_state": int, "use_grid_search": bool, "search_strategy": str, "search_n_iter": int,
+    "n_jobs": int, "early_exit": bool, "early_exit_margin": float, "early_exit_min_windows": int,
+    "plots": str, "profile": str,
+}
+
+
+def current() -> RunConfig:
+    """Momentaufnahme der globalen Werte (config.json, apply_overrides, set_config) als RunConfig."""
+    return RunConfig(
+        Path(DATA_DIR), Path(LABELS_FILE), Path(TEST_LABELS_FILE), Path(ARTIFACTS_DIR), Path(CACHE_DIR),
+        tuple(MODELS), FEATURE_SET, WINDOW_SEC, STEP_SEC, MIN_POINTS, MAX_POINTS,
+        CV_SPLITS, RANDOM_STATE, USE_GRID_SEARCH, SEARCH_STRATEGY, SEARCH_N_ITER,
+        N_JOBS, EARLY_EXIT, EARLY_EXIT_MARGIN, EARLY_EXIT_MIN_WINDOWS, PLOTS, PROFILE,
+    )
+
+
+def resolve(cfg: RunConfig | None) -> RunConfig:
+    """cfg oder – ohne cfg – die aktuellen globalen Werte."""
+    return cfg if cfg is not None else current()
 
 
 # Beim Import automatisch config.json laden (falls vorhanden)
@@ -12,17 +12,24 @@ keine Datenleckage entsteht (ganze Fahrten bleiben zusammen).
 
 Hauptfunktionen:
     load_csv()        - Lädt eine Recording-CSV, parst rot_vel (x,y,z), sortiert Timestamps
+    load_recording()  - Pfad oder bereits geladene Arrays -> (Name, Zeitreihen-Dict)
+    find_recordings() - Ordner (mit Dateimuster) oder Glob-Ausdruck -> sortierte Dateipfade
     find_windows()    - Findet überlappende Fenster mit Mindestanzahl Punkten
     load_labels()     - Lädt Label-Datei (File,Label), unterstützt relative/absolute Pfade
     build_window_data - Baut Fenster- und Beobachtungs-Daten, resampelt auf MAX_POINTS
 """
+import glob
+import os
 import numpy as np
 import pandas as pd
 from pathlib import Path
 
 from . import config
+from .profiler import profiled
+from .cancel import check_cancelled
 
 
+@profiled()
 def load_csv(p):
     """
     Lädt eine Recording-CSV und gibt ein Dict mit sortierten Zeitreihen zurück.
@@ -50,25 +57,59 @@ def load_csv(p):
             "speed": pd.to_numeric(df["car0_velocity_vehicle"], errors="coerce").to_numpy(float)[o][v], "yaw_rate": yaw[v]}
 
 
-def find_windows(t, ws=config.WINDOW_SEC, ss=config.STEP_SEC, mp=config.MIN_POINTS):
+def load_recording(p):
+    """
+    Liefert (Name, Zeitreihen-Dict) für ein Recording. Akzeptiert einen CSV-Pfad,
+    ein bereits geladenes (Name, Dict)-Tupel oder ein Dict mit "name" und den Arrays
+    t, steer, gas, brake, speed, yaw_rate (z.B. Live- oder Service-Daten).
+    """
+    if isinstance(p, tuple):
+        return p
+    if isinstance(p, dict):
+        d = {k: np.asarray(p[k], dtype=float) for k in ("t", "steer", "gas", "brake", "speed", "yaw_rate")}
+        o = np.argsort(d["t"], kind="stable")
+        v = np.isfinite(d["t"][o])
+        return str(p.get("name", "recording")), {k: a[o][v] for k, a in d.items()}
+    return Path(p).name, load_csv(p)
+
+
+def find_recordings(source, pattern="*.csv") -> list[str]:
+    """
+    Ordner (mit Dateimuster) oder Glob-Ausdruck -> sortierte Liste der Dateipfade.
+    Gemeinsame Dateisuche für batch.py und FileImporter.findFilesInFolder (GUI).
+    """
+    source = str(source)
+    files = glob.glob(os.path.join(source, pattern)) if os.path.isdir(source) else glob.glob(source)
+    return sorted(files)
+
+
+@profiled()
+def find_windows(t, ws=None, ss=None, mp=None, cfg=None):
     """
     Findet überlappende Zeitfenster in der Timestamp-Reihe t.
     Jedes Fenster hat Länge ws Sekunden, Schrittweite ss, mindestens mp Punkte.
 
     Args:
         t: Timestamp-Array
-        ws: Fensterlänge in Sekunden
-        ss: Schrittweite in Sekunden
-        mp: Mindestanzahl Punkte pro Fenster
+        ws: Fensterlänge in Sekunden (optional, sonst cfg.window_sec)
+        ss: Schrittweite in Sekunden (optional, sonst cfg.step_sec)
+        mp: Mindestanzahl Punkte pro Fenster (optional, sonst cfg.min_points)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
         Liste von (start_idx, end_idx, start_time, end_time)
     """
+    if ws is None or ss is None or mp is None:
+        cfg = config.resolve(cfg)
+        ws = cfg.window_sec if ws is None else ws
+        ss = cfg.step_sec if ss is None else ss
+        mp = cfg.min_points if mp is None else mp
     # Sliding Window: Start alle ss Sekunden, Fenster ws Sekunden, mindestens mp Punkte
     return [(int(np.searchsorted(t, s)), int(np.searchsorted(t, s + ws)), s, s + ws)
             for s in np.arange(float(t[0]), float(t[-1]) - ws + 1e-9, ss) if np.searchsorted(t, s + ws) - np.searchsorted(t, s) >= mp]
 
 
+@profiled()
 def load_labels(labels : str | Path | pd.DataFrame, training : bool = True, data_dir : str | Path = config.DATA_DIR):
     """
     Lädt Label-Datei (CSV mit File,Label). Unterstützt relative Pfade (relativ zu
@@ -97,26 +138,31 @@ def load_labels(labels : str | Path | pd.DataFrame, training : bool = True, data
     return paths, ids
 
 
-def build_window_data(paths, ids):
+@profiled()
+def build_window_data(paths, ids, cancel_token=None, cfg=None):
     """
     Baut Fenster- und Beobachtungs-Daten für Featuretools/TSFresh. Jedes Fenster
     wird auf MAX_POINTS Punkte resampelt (gleichmäßige Indizes).
 
     Args:
-        paths: Liste der CSV-Pfade
+        paths: Liste der CSV-Pfade oder bereits geladener Recordings (siehe load_recording)
         ids: Liste der Fahrer-IDs (parallel zu paths)
+        cancel_token: Optionales CancelToken, geprüft vor jedem Recording
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
         (window_rows, obs_rows) – DataFrame mit Fenstern, Liste von Dicts für EntitySet
     """
+    cfg = config.resolve(cfg)
     window_rows, obs_rows, wid = [], [], 0
     for i, p in enumerate(paths):
-        d = load_csv(p)
-        for i0, i1, ws, we in find_windows(d["t"]):
+        check_cancelled(cancel_token)
+        name, d = load_recording(p)
+        for i0, i1, ws, we in find_windows(d["t"], cfg=cfg):
             # Resampling: Fenster auf MAX_POINTS Punkte begrenzen (gleichmäßige Indizes)
-            idx = np.linspace(0, i1 - i0 - 1, min(i1 - i0, config.MAX_POINTS), dtype=int)
+            idx = np.linspace(0, i1 - i0 - 1, min(i1 - i0, cfg.max_points), dtype=int)
             rel_t = d["t"][i0:i1][idx] - d["t"][i0]
-            window_rows.append({"window_id": wid, "driver_id": ids[i], "recording": p.name})
+            window_rows.append({"window_id": wid, "driver_id": ids[i], "recording": name})
             for j in range(len(rel_t)):
                 obs_rows.append({"obs_id": f"{wid}_{j}", "window_id": wid, "time": float(rel_t[j]),
                     "steer": float(d["steer"][i0:i1][idx][j]), "gas": float(d["gas"][i0:i1][idx][j]),
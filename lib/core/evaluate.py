@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: evaluate
+===============
+Auswertung vieler Train/Test-Splits über denselben Recordings (z.B. test.py: 246 Splits
+über 24 Recordings). Statt pro Split train() und predict() aufzurufen – jedes Mal alle
+CSVs lesen, alle Features extrahieren, Modelle schreiben und wieder löschen – werden die
+Fenster-Features aller Recordings einmal extrahiert. Jeder Split wählt nur die Zeilen
+seiner Recordings aus der Feature-Matrix im Speicher aus.
+
+Pro Split entspricht die Auswertung train() + predict():
+- Trainingszeilen in der Reihenfolge der Train-Label-Datei (wie extract_features in train())
+- Imputer + Scaler auf den Trainingszeilen, einmal pro Split für alle Modelle
+- Klassifikatoren wie in train() (make_classifier, Standardwerte), finales Modell auf allen
+  Trainingszeilen; die CV-Folds von train() werden nicht berechnet
+- Recording-Level-Vorhersage wie in predict(): Fenster-Wahrscheinlichkeiten mitteln, argmax
+
+Unterschied: Die TSFresh-Imputation fehlender Kennwerte läuft über alle Recordings statt
+getrennt über Train- und Test-Recordings (MinimalFCParameters liefert praktisch keine NaN).
+Die Splits werden auf einen Prozess-Pool verteilt (n_jobs); Feature-Matrix, Labels und
+Recording-Gruppen liegen dabei einmal in Shared Memory (shared.SharedDataset), die Worker
+lesen sie ohne eigene Kopie.
+
+Split-Pläne für beliebige gelabelte Datensätze erzeugt plan_splits() im Speicher (ohne
+Label-Dateien): pro Fahrer gleich viele Trainings- und k Test-Recordings (balanciertes
+Leave-k-out), alle Kombinationen oder – oberhalb von max_splits – eine Zufallsstichprobe.
+
+Spalten: split, model, n_train_recordings, n_test_recordings, n_correct, n_test_samples, accuracy
+
+Hauptfunktionen:
+    find_splits()     - Split-Label-Dateien (split_<nr>_train.lbl / split_<nr>_test.lbl) eines Ordners
+    plan_splits()     - Balancierte Leave-k-out-Splits pro Fahrer aus einer Label-Datei
+    evaluate_splits() - Features einmal extrahieren, alle Splits auswerten
+    summarize()       - Accuracy-Verteilung pro Modell und Trainingsgröße
+
+CLI: python -m DriveIdent.lib.core.evaluate LABELS [--data-dir DIR] [--k K] [--train-sizes N ...] [--max-splits N] [--config PATH] [--n-jobs N] [--out FILE] [--summary FILE]
+"""
+import argparse
+import glob
+import itertools
+import math
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .aggregate import aggregate_recordings, group_codes
+from .cancel import check_cancelled, shutdown_now
+from .data import load_labels
+from .features import extract_features
+from .preprocess import fit_preprocessing
+from .shared import SharedDataset
+from .train import make_classifier
+
+CANCEL_POLL_SEC = 0.2  # Max. Wartezeit auf Pool-Ergebnisse zwischen zwei Abbruch-Prüfungen
+MAX_SPLITS = 200       # Standard-Obergrenze der Splits pro Trainingsgröße in plan_splits
+RESULT_COLUMNS = ["split", "model", "n_train_recordings", "n_test_recordings", "n_correct", "n_test_samples", "accuracy"]
+
+# Daten der laufenden Auswertung im Worker-Prozess (einmal pro Worker via _init_worker gesetzt)
+_worker_state = {}
+
+
+class Split(NamedTuple):
+    """Ein Train/Test-Split: Label-Dateien oder DataFrames mit den Spalten File, Label."""
+    split: int
+    train: str | Path | pd.DataFrame
+    test: str | Path | pd.DataFrame
+
+
+def find_splits(split_dir, pattern="split_*_train.lbl") -> list[Split]:
+    """
+    Sucht Split-Label-Dateien in split_dir: zu jeder split_<nr>_train.lbl gehört
+    split_<nr>_test.lbl.
+
+    Returns:
+        Liste von Split, nach Nummer sortiert
+    """
+    splits = []
+    for train_path in glob.glob(os.path.join(str(split_dir), pattern)):
+        m = re.search(r"split_(\d+)_train", Path(train_path).name)
+        if not m:
+            continue
+        test_path = Path(train_path).with_name(Path(train_path).name.replace("_train", "_test"))
+        if not test_path.exists():
+            raise FileNotFoundError(f"Test-Labels zu {train_path} fehlen: {test_path}")
+        splits.append(Split(int(m.group(1)), Path(train_path), test_path))
+    return sorted(splits)
+
+
+def _driver_options(m, n, k):
+    """Alle (Train-, Test-)Indexmengen eines Fahrers mit m Recordings: n Train, k Test, disjunkt."""
+    return [(tr, te) for tr in itertools.combinations(range(m), n)
+            for te in itertools.combinations([i for i in range(m) if i not in tr], k)]
+
+
+def plan_splits(labels, k=1, train_sizes=None, max_splits=MAX_SPLITS, random_state=None) -> list[Split]:
+    """
+    Erzeugt balancierte Leave-k-out-Splits: Jeder Fahrer gibt k Recordings in den Test und
+    n Recordings ins Training, für jede Trainingsgröße n aus train_sizes. Ein Split ist eine
+    Auswahl pro Fahrer; gibt es mehr Kombinationen als max_splits, wird eine Stichprobe
+    verschiedener Kombinationen gezogen, sonst werden alle verwendet.
+
+    Args:
+        labels: Label-Datei oder DataFrame (Spalten File, Label)
+        k: Test-Recordings pro Fahrer
+        train_sizes: Trainings-Recordings pro Fahrer (optional, sonst alle übrigen des kleinsten Fahrers)
+        max_splits: Obergrenze der Splits pro Trainingsgröße (None = alle Kombinationen)
+        random_state: Seed der Stichprobe (optional, sonst config.RANDOM_STATE)
+
+    Returns:
+        Liste von Split mit DataFrames (File, Label), fortlaufend nummeriert
+    """
+    df = pd.read_csv(labels, sep=None, engine="python") if not isinstance(labels, pd.DataFrame) else labels
+    cols = {c.strip().lower(): c for c in df.columns}
+    by_driver = {}
+    for f, l in zip(df[cols["file"]], df[cols["label"]]):
+        if pd.notna(f) and str(f).strip() and pd.notna(l) and str(l).strip():
+            by_driver.setdefault(str(l).strip().lower(), []).append(str(f).strip())
+    if len(by_driver) < 2:
+        raise ValueError("Mindestens zwei Fahrer mit Labels erforderlich")
+    m_min = min(len(v) for v in by_driver.values())
+    train_sizes = list(train_sizes) if train_sizes else [m_min - k]
+    if k < 1 or any(n < 1 or n + k > m_min for n in train_sizes):
+        raise ValueError(f"Ungültige Aufteilung: k={k}, train_sizes={train_sizes} (kleinster Fahrer hat {m_min} Recordings)")
+    rng = np.random.default_rng(config.RANDOM_STATE if random_state is None else random_state)
+
+    splits = []
+    for n in train_sizes:
+        total = math.prod(math.comb(len(v), n) * math.comb(len(v) - n, k) for v in by_driver.values())
+        if max_splits is None or total <= max_splits:
+            plans = itertools.product(*(_driver_options(len(v), n, k) for v in by_driver.values()))
+        else:
+            seen = set()
+            while len(seen) < max_splits:
+                plan = []
+                for v in by_driver.values():
+                    perm = rng.permutation(len(v))
+                    plan.append((tuple(sorted(perm[:n].tolist())), tuple(sorted(perm[n:n + k].tolist()))))
+                seen.add(tuple(plan))
+            plans = sorted(seen)
+        for plan in plans:
+            train = [(v[i], d) for (d, v), (tr, _) in zip(by_driver.items(), plan) for i in tr]
+            test = [(v[i], d) for (d, v), (_, te) in zip(by_driver.items(), plan) for i in te]
+            splits.append(Split(len(splits) + 1, pd.DataFrame(train, columns=["File", "Label"]), pd.DataFrame(test, columns=["File", "Label"])))
+    return splits
+
+
+def summarize(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Accuracy-Verteilung pro Modell und Trainingsgröße (Anzahl Trainings-Recordings).
+
+    Returns:
+        DataFrame mit model, n_train_recordings, n_splits, mean, std, min, q25, median, q75, max
+    """
+    g = results.groupby(["model", "n_train_recordings"], sort=True)["accuracy"]
+    out = g.agg(n_splits="count", mean="mean", std="std", min="min",
+                q25=lambda a: a.quantile(0.25), median="median", q75=lambda a: a.quantile(0.75), max="max")
+    return out.reset_index()
+
+
+def _rows(codes, recordings) -> dict:
+    """Zeilenindizes pro Recording aus den Gruppen-Codes."""
+    return {str(r): np.flatnonzero(codes == k) for k, r in enumerate(recordings)}
+
+
+def _init_worker(handle, params):
+    """Initializer für Pool-Worker: hängt sich einmal pro Prozess an das SharedDataset an (ohne Kopie)."""
+    _worker_state.clear()
+    ds = SharedDataset.attach(handle)
+    _worker_state.update(params, dataset=ds, X=ds.X, y=ds.y, groups=ds.groups, rows=_rows(ds.group_codes, handle.recordings))
+
+
+def _evaluate_split(split, train_recs, test_recs, state=None) -> list[dict]:
+    """
+    Trainiert alle Modelle auf den Fenstern von train_recs und bewertet sie auf Recording-Ebene
+    mit den Fenstern von test_recs (Recordings ohne gültiges Fenster fehlen, wie in predict()).
+
+    Returns:
+        Eine Ergebniszeile pro Modell (Spalten RESULT_COLUMNS)
+    """
+    s = state if state is not None else _worker_state
+    rows = s["rows"]
+    tr = np.concatenate([rows[r] for r in train_recs if r in rows] or [np.empty(0, dtype=int)])
+    te = np.concatenate([rows[r] for r in test_recs if r in rows] or [np.empty(0, dtype=int)])
+    if not len(tr):
+        raise ValueError(f"Split {split}: keine Trainingsfenster")
+    X, y, groups = s["X"], s["y"], s["groups"]
+    pre, Xt = fit_preprocessing(X[tr])
+    Xte = pre.transform(X[te]) if len(te) else None
+    out = []
+    for mdl in s["models"]:
+        n_correct, n_test = 0, 0
+        if Xte is not None:
+            clf = make_classifier(mdl, s["random_state"])
+            clf.fit(Xt, y[tr])
+            votes = aggregate_recordings(clf.predict_proba(Xte), groups[te], list(clf.classes_))
+            soll = y[te][votes.first_idx]
+            n_correct = int(sum(str(i) == str(t) for i, t in zip(votes.labels, soll)))
+            n_test = len(votes.recordings)
+        out.append({"split": split, "model": mdl, "n_train_recordings": len(train_recs), "n_test_recordings": len(test_recs),
+                    "n_correct": n_correct, "n_test_samples": n_test, "accuracy": n_correct / n_test if n_test else np.nan})
+    return out
+
+
+def evaluate_splits(splits, data_dir=None, models=None, n_jobs=None, on_progress=None, cancel_token=None, cfg=None) -> pd.DataFrame:
+    """
+    Wertet alle Splits aus; Features werden dabei nur einmal pro Recording extrahiert.
+
+    Args:
+        splits: Liste von Split (z.B. aus find_splits)
+        data_dir: Basis-Ordner für relative Pfade der Label-Dateien (optional, sonst cfg.data_dir)
+        models: Modelltypen (optional, sonst cfg.models)
+        n_jobs: Worker-Prozesse für die Splits, <= 0 = alle CPUs (optional, sonst cfg.n_jobs)
+        on_progress: Optionaler Callback on_progress(erledigt, gesamt, schritt) – während der
+                     Extraktion in Recordings, danach in Splits (schritt "Splits")
+        cancel_token: Optionales CancelToken; geprüft in der Extraktion und pro Split, beendet die Worker sofort
+        cfg: RunConfig für Fenster, Feature-Set und Random Seed (optional, sonst aktuelle globale Konfiguration)
+
+    Returns:
+        DataFrame mit einer Zeile pro Split und Modell (Spalten RESULT_COLUMNS), nach split sortiert
+    """
+    cfg = config.resolve(cfg)
+    data_dir = Path(data_dir or cfg.data_dir)
+    models = list(models or cfg.models)
+    n_jobs = n_jobs if n_jobs is not None else cfg.n_jobs
+
+    # Recordings aller Splits vereinigen (Schlüssel: Dateiname, wie die Spalte recording der Features)
+    labels, paths, tasks = {}, {}, []
+    for s in splits:
+        recs = []
+        for part in (s.train, s.test):
+            names = []
+            for p, l in zip(*load_labels(part, True, data_dir)):
+                name = Path(p).name
+                if paths.setdefault(name, str(p)) != str(p):
+                    raise ValueError(f"Dateiname {name} gehört zu mehreren Recordings: {paths[name]}, {p}")
+                if labels.setdefault(name, l) != l:
+                    raise ValueError(f"Widersprüchliche Labels für {name}: {labels[name]}, {l}")
+                names.append(name)
+            recs.append(names)
+        tasks.append((s.split, *recs))
+    if not tasks:
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    names = list(paths)
+    print(f"Extrahiere Features für {len(names)} Recordings ({len(tasks)} Splits)...")
+    result = extract_features([paths[n] for n in names], [labels[n] for n in names],
+                              on_progress=(lambda done, total, step: on_progress(done, total, f"Extraktion: {step}")) if on_progress else None,
+                              cancel_token=cancel_token, cfg=cfg)
+    feat_cols = [c for c in result.columns if c not in ("driver_id", "recording")]
+    X, y, groups = result[feat_cols].to_numpy(dtype=float), np.asarray(result["driver_id"].values), np.asarray(result["recording"].values)
+    del result
+    params = {"models": models, "random_state": cfg.random_state}
+
+    out, n_done = [], 0
+
+    def _on_result(rows):
+        nonlocal n_done
+        out.extend(rows)
+        n_done += 1
+        if on_progress is not None:
+            on_progress(n_done, len(tasks), "Splits")
+
+    n_workers = max(1, min(n_jobs if n_jobs > 0 else (os.cpu_count() or 1), len(tasks)))
+    stop = None
+    if n_workers == 1:
+        state = {**params, "X": X, "y": y, "groups": groups, "rows": _rows(*group_codes(groups))}
+        for task in tasks:
+            check_cancelled(cancel_token)
+            _on_result(_evaluate_split(*task, state=state))
+    else:
+        # Segmente werden nach dem Beenden des Pools freigegeben – auch bei abgestürzten Workern
+        with SharedDataset.create(X, y, groups) as shared, \
+                ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=(shared.handle, params)) as ex:
+            del X
+            try:
+                if cancel_token is not None:
+                    stop = cancel_token.on_cancel(lambda: shutdown_now(ex))
+                pending = {ex.submit(_evaluate_split, *task) for task in tasks}
+                while pending:
+                    check_cancelled(cancel_token)
+                    done, pending = wait(pending, timeout=CANCEL_POLL_SEC, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        check_cancelled(cancel_token)  # Beendete Worker liefern BrokenProcessPool
+                        _on_result(fut.result())
+            finally:
+                if stop is not None:
+                    cancel_token.remove(stop)
+    return pd.DataFrame(out, columns=RESULT_COLUMNS).sort_values(["split"], kind="stable").reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Leave-k-out-Auswertung für einen beliebigen gelabelten Datensatz.")
+    p.add_argument("labels", type=str, help="Label-Datei (File, Label) mit allen Recordings")
+    p.add_argument("--data-dir", type=str, help="Ordner mit CSV-Recordings")
+    p.add_argument("--k", type=int, default=1, help="Test-Recordings pro Fahrer")
+    p.add_argument("--train-sizes", type=int, nargs="+", help="Trainings-Recordings pro Fahrer (Standard: alle übrigen des kleinsten Fahrers)")
+    p.add_argument("--max-splits", type=int, default=MAX_SPLITS, help="Max. Splits pro Trainingsgröße (0 = alle Kombinationen)")
+    p.add_argument("--config", type=str, help="Pfad zu config.json")
+    p.add_argument("--n-jobs", type=int, help="Worker-Prozesse (-1 = alle CPUs)")
+    p.add_argument("--out", type=str, default="evaluation_results.csv", help="Ergebnisse pro Split und Modell")
+    p.add_argument("--summary", type=str, default="evaluation_summary.csv", help="Accuracy-Verteilung pro Modell und Trainingsgröße")
+    args = p.parse_args()
+    if args.config:
+        config._load_from_file(args.config)
+    cfg = config.current().replace(data_dir=args.data_dir, n_jobs=args.n_jobs, plots="off")
+    splits = plan_splits(args.labels, args.k, args.train_sizes, args.max_splits or None, cfg.random_state)
+    print(f"{len(splits)} Splits geplant")
+    results = evaluate_splits(splits, on_progress=lambda done, total, step: print(f"{step}: {done:.0f}/{total}".ljust(40), end="\r"), cfg=cfg)
+    results.to_csv(args.out, index=False)
+    summary = summarize(results)
+    summary.to_csv(args.summary, index=False)
+    print()
+    print(summary.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"Gespeichert: {args.out}, {args.summary}")
@@ -20,63 +20,99 @@ from tsfresh.feature_extraction import MinimalFCParameters
 from tsfresh.utilities.dataframe_functions import impute as tsfresh_impute
 
 from . import config
-from .data import load_csv, find_windows, build_window_data
+from .data import load_recording, find_windows, build_window_data
+from .profiler import stage
+from .cancel import check_cancelled
 
+TSFRESH_CHUNKS = 10  # Max. Anzahl TSFresh-Aufrufe (Blöcke von Recordings, für Fortschrittsmeldungen)
 
-def extract_features(paths, ids, feature_set=config.FEATURE_SET, on_extraction_start=None) -> pd.DataFrame:
+
+def extract_features(paths, ids, feature_set=None, on_extraction_start=None, on_progress=None, cancel_token=None, cfg=None) -> pd.DataFrame:
     """
     Extrahiert Features aus allen Recordings.
 
     Args:
-        paths: Liste der CSV-Pfade zu den Recordings
+        paths: Liste der CSV-Pfade zu den Recordings oder bereits geladener Recordings
+               (Dict mit "name" und Arrays t, steer, gas, brake, speed, yaw_rate – siehe data.load_recording)
         ids: Liste der Fahrer-IDs (parallel zu paths)
-        feature_set: "featuretools" | "tsfresh" | "both"
+        feature_set: "featuretools" | "tsfresh" | "both" (optional, sonst cfg.feature_set)
         on_extraction_start: Optionaler Callback, wird sofort beim Start aufgerufen (für pipeline_progress)
+        on_progress: Optionaler Callback on_progress(erledigt, gesamt, schritt) – erledigt in Recordings
+                     (Bruchteile möglich), über die Schritte Laden, Featuretools und TSFresh gleich gewichtet
+        cancel_token: Optionales CancelToken, geprüft pro Recording, in Featuretools und pro TSFresh-Block
+        cfg: RunConfig für Fensterparameter und Feature-Set (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
         DataFrame mit einer Zeile pro Fenster (Spalten: driver_id, recording, + Feature-Spalten)
     """
+    cfg = config.resolve(cfg)
+    feature_set = feature_set or cfg.feature_set
     if on_extraction_start:
         on_extraction_start()
-    win_df, obs_rows = build_window_data(paths, ids)
+    n = len(paths)
+    steps = ["Laden"] + [s for s, fs in (("Featuretools", ("featuretools", "both")), ("TSFresh", ("tsfresh", "both"))) if feature_set in fs]
+
+    def _report(step, k):
+        """k Recordings im Schritt step erledigt -> Gesamtfortschritt in Recordings."""
+        check_cancelled(cancel_token)  # Auch aus dem Fortschritts-Callback von ft.dfs
+        if on_progress:
+            on_progress((steps.index(step) * n + k) / len(steps), n, step)
+
+    # Jedes Recording nur einmal laden – Featuretools und TSFresh nutzen dieselben Arrays
+    recordings = []
+    for i, p in enumerate(paths):
+        recordings.append(load_recording(p))
+        _report("Laden", i + 1)
+    win_df, obs_rows = build_window_data(recordings, ids, cancel_token, cfg)
     result_ft, result_ts = None, None
 
     if feature_set in ("featuretools", "both"):
-        # EntitySet: Fenster (f) mit Beobachtungen (b) verknüpft über window_id
-        obs_df = pd.DataFrame(obs_rows)
-        # Aggregationen pro Fenster über steer, gas, brake, speed, yaw_rate
-        es = ft.EntitySet(id="f").add_dataframe(dataframe_name="f", dataframe=win_df, index="window_id").add_dataframe(dataframe_name="b", dataframe=obs_df, index="obs_id", time_index="time").add_relationship("f", "window_id", "b", "window_id")
-        # Aggregationen: mean, std, min, max, sum, skew, kurtosis pro Fenster
-        fm, _ = ft.dfs(entityset=es, target_dataframe_name="f", agg_primitives=["mean", "std", "min", "max", "sum", "skew", "kurtosis"], trans_primitives=[], max_depth=1, verbose=False)
-        # ft.dfs enthält typischerweise auch die Originalspalten aus win_df (driver_id/recording).
-        # Beim Merge entstehen sonst doppelte Spalten (driver_id_x/driver_id_y), die später
-        # fälschlich als Features in feat_cols landen und zu "Dimension mismatch" führen.
-        fm_reset = fm.reset_index()
-        for col in ("driver_id", "recording"):
-            if col in fm_reset.columns:
-                fm_reset = fm_reset.drop(columns=[col])
-        result_ft : pd.DataFrame = win_df.merge(fm_reset, on="window_id", how="left").drop(columns=["window_id"])
-        # Spaltennamen bereinigen (Sonderzeichen entfernen für sklearn-Kompatibilität)
-        result_ft.columns = ["".join(c if (c.isalnum() or c in "_-") else "_" for c in str(x)) for x in result_ft.columns]
-        for c in result_ft.columns:
-            if c not in ("driver_id", "recording"): result_ft[c] = pd.to_numeric(result_ft[c], errors="coerce")
-        result_ft["driver_id"], result_ft["recording"] = win_df["driver_id"].values, win_df["recording"].values
+        with stage("featuretools"):
+            # EntitySet: Fenster (f) mit Beobachtungen (b) verknüpft über window_id
+            obs_df = pd.DataFrame(obs_rows)
+            # Aggregationen pro Fenster über steer, gas, brake, speed, yaw_rate
+            es = ft.EntitySet(id="f").add_dataframe(dataframe_name="f", dataframe=win_df, index="window_id").add_dataframe(dataframe_name="b", dataframe=obs_df, index="obs_id", time_index="time").add_relationship("f", "window_id", "b", "window_id")
+            # Aggregationen: mean, std, min, max, sum, skew, kurtosis pro Fenster
+            fm, _ = ft.dfs(entityset=es, target_dataframe_name="f", agg_primitives=["mean", "std", "min", "max", "sum", "skew", "kurtosis"], trans_primitives=[], max_depth=1, verbose=False,
+                           progress_callback=lambda update, percent, elapsed: _report("Featuretools", n * percent / 100.0))
+            # ft.dfs enthält typischerweise auch die Originalspalten aus win_df (driver_id/recording).
+            # Beim Merge entstehen sonst doppelte Spalten (driver_id_x/driver_id_y), die später
+            # fälschlich als Features in feat_cols landen und zu "Dimension mismatch" führen.
+            fm_reset = fm.reset_index()
+            for col in ("driver_id", "recording"):
+                if col in fm_reset.columns:
+                    fm_reset = fm_reset.drop(columns=[col])
+            result_ft : pd.DataFrame = win_df.merge(fm_reset, on="window_id", how="left").drop(columns=["window_id"])
+            # Spaltennamen bereinigen (Sonderzeichen entfernen für sklearn-Kompatibilität)
+            result_ft.columns = ["".join(c if (c.isalnum() or c in "_-") else "_" for c in str(x)) for x in result_ft.columns]
+            for c in result_ft.columns:
+                if c not in ("driver_id", "recording"): result_ft[c] = pd.to_numeric(result_ft[c], errors="coerce")
+            result_ft["driver_id"], result_ft["recording"] = win_df["driver_id"].values, win_df["recording"].values
 
     if feature_set in ("tsfresh", "both"):
-        # TSFresh erwartet Long-Format: id (Fenster), time, kind (Signal), value
-        ts_rows, wid = [], 0
-        for i, p in enumerate(paths):
-            d = load_csv(p)
-            for i0, i1, ws, we in find_windows(d["t"]):
-                rel_t = d["t"][i0:i1] - d["t"][i0]
-                for sig, arr in [("steer", d["steer"]), ("gas", d["gas"]), ("brake", d["brake"]), ("speed", d["speed"]), ("yaw_rate", d["yaw_rate"])]:
-                    ts_rows.append(pd.DataFrame({"id": wid, "time": rel_t, "kind": sig, "value": arr[i0:i1]}))
-                wid += 1
-        if ts_rows:
-            # TSFresh: Impute fehlende Werte, Inf/NaN bereinigen
-            ts_feat = tsfresh_impute(tsfresh_extract(pd.concat(ts_rows, ignore_index=True), column_id="id", column_sort="time", column_kind="kind", column_value="value", default_fc_parameters=MinimalFCParameters(), n_jobs=0, disable_progressbar=True)).replace([np.inf, -np.inf], np.nan).fillna(0)
-            result_ts : pd.DataFrame = win_df[["driver_id", "recording"]].copy()
-            for c in ts_feat.columns: result_ts[c] = ts_feat[c].values
+        with stage("tsfresh"):
+            # TSFresh erwartet Long-Format: id (Fenster), time, kind (Signal), value
+            # Extraktion in Blöcken von Recordings (Kennwerte sind pro Fenster unabhängig),
+            # Imputation erst auf dem Gesamtergebnis – identisch zu einem einzigen Aufruf
+            chunk = max(1, -(-n // TSFRESH_CHUNKS))
+            ts_parts, wid = [], 0
+            for start in range(0, n, chunk):
+                check_cancelled(cancel_token)
+                ts_rows = []
+                for name, d in recordings[start:start + chunk]:
+                    for i0, i1, ws, we in find_windows(d["t"], cfg=cfg):
+                        rel_t = d["t"][i0:i1] - d["t"][i0]
+                        for sig, arr in [("steer", d["steer"]), ("gas", d["gas"]), ("brake", d["brake"]), ("speed", d["speed"]), ("yaw_rate", d["yaw_rate"])]:
+                            ts_rows.append(pd.DataFrame({"id": wid, "time": rel_t, "kind": sig, "value": arr[i0:i1]}))
+                        wid += 1
+                if ts_rows:
+                    ts_parts.append(tsfresh_extract(pd.concat(ts_rows, ignore_index=True), column_id="id", column_sort="time", column_kind="kind", column_value="value", default_fc_parameters=MinimalFCParameters(), n_jobs=0, disable_progressbar=True))
+                _report("TSFresh", min(n, start + chunk))
+            if ts_parts:
+                # TSFresh: Impute fehlende Werte, Inf/NaN bereinigen
+                ts_feat = tsfresh_impute(pd.concat(ts_parts)).replace([np.inf, -np.inf], np.nan).fillna(0)
+                result_ts : pd.DataFrame = win_df[["driver_id", "recording"]].copy()
+                for c in ts_feat.columns: result_ts[c] = ts_feat[c].values
 
     # Ergebnis: bei "both" Featuretools + TSFresh kombinieren, sonst nur eine Quelle
     result : pd.DataFrame = result_ft.copy() if feature_set == "both" else (result_ts if feature_set == "tsfresh" else result_ft)
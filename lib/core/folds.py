@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: folds
+============
+Fold-Plan für die Cross-Validation. StratifiedGroupKFold wird einmal pro Trainingslauf
+ausgeführt; der Plan hält pro Fold nur die Index-Arrays und wird von
+Hyperparameter-Suche, CV-Bewertung und Konfusionsmatrix gemeinsam genutzt.
+Die Zeilen werden erst bei der Vorverarbeitung (preprocess.py) geschnitten und
+danach verworfen – pro Fold bleiben nur die vorverarbeiteten Matrizen, die am
+Plan zwischengespeichert werden.
+
+Der Plan wird als fold_plan.npz mit den Artefakten gespeichert. Erneutes Training
+und eine Hyperparameter-Suche auf denselben Daten laden ihn wieder, statt
+StratifiedGroupKFold erneut auszuführen – die Bewertung bleibt reproduzierbar.
+
+Hauptfunktionen:
+    FoldPlan.create()         - Splits berechnen
+    FoldPlan.save()           - Plan als .npz speichern
+    FoldPlan.load()           - Gespeicherten Plan auf dieselben Daten anwenden
+    FoldPlan.load_or_create() - Gespeicherten Plan laden, wenn er passt, sonst neu berechnen
+    FoldPlan.preprocessed()   - Vorverarbeitete Folds (einmal pro Plan)
+"""
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from sklearn.model_selection import StratifiedGroupKFold
+
+from .cache import fingerprint
+from .preprocess import preprocess_folds
+
+FOLD_PLAN_FILE = "fold_plan.npz"  # Dateiname im artifacts-Ordner
+
+
+class Fold(NamedTuple):
+    """Ein CV-Fold: Zeilenindizes von Train- und Testteil."""
+    index: int
+    train_idx: np.ndarray
+    test_idx: np.ndarray
+
+
+class FoldPlan:
+    """
+    Fold-Zuordnung eines Trainingslaufs. Recordings bleiben innerhalb eines Folds
+    zusammen (Gruppierung nach Recording), die Klassen sind stratifiziert.
+    """
+
+    def __init__(self, X, y, groups, splits, n_splits: int, random_state: int):
+        self.X = np.asarray(X, dtype=float)
+        self.y = np.asarray(y)
+        self.groups = np.asarray(groups)
+        self.n_splits = n_splits
+        self.random_state = random_state
+        self.folds = [Fold(i, np.asarray(tr), np.asarray(te)) for i, (tr, te) in enumerate(splits)]
+        self._preprocessed = None
+
+    @classmethod
+    def create(cls, X, y, groups, n_splits: int, random_state: int) -> "FoldPlan":
+        """
+        Berechnet die Splits einmalig mit StratifiedGroupKFold.
+
+        Args:
+            X: Feature-DataFrame oder Matrix
+            y: Labels (parallel zu X)
+            groups: Recording-IDs (parallel zu X)
+            n_splits: Anzahl Folds
+            random_state: Random Seed für das Mischen der Gruppen
+        """
+        cv = StratifiedGroupKFold(n_splits=n_splits, shuffle=True, random_state=random_state)
+        return cls(X, y, groups, list(cv.split(X, y, groups)), n_splits, random_state)
+
+    @property
+    def splits(self) -> list[tuple[np.ndarray, np.ndarray]]:
+        """(train_idx, test_idx) pro Fold."""
+        return [(f.train_idx, f.test_idx) for f in self.folds]
+
+    def __len__(self):
+        return len(self.folds)
+
+    def fingerprint(self) -> str:
+        """Fingerprint der Fold-Zuordnung (Test-Indizes pro Fold)."""
+        return fingerprint([f.test_idx for f in self.folds])
+
+    def preprocessed(self):
+        """Vorverarbeitete Folds (Imputer + Scaler pro Fold); werden nur beim ersten Aufruf berechnet."""
+        if self._preprocessed is None:
+            self._preprocessed = preprocess_folds(self.X, self.y, self.groups, self.folds)
+        return self._preprocessed
+
+    def save(self, path: Path) -> Path:
+        """Speichert Splits, Labels und Recordings als .npz (ohne Feature-Matrix)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        arrays = {"n_splits": self.n_splits, "random_state": self.random_state,
+                  "y": self.y.astype(str), "groups": self.groups.astype(str)}
+        for f in self.folds:
+            arrays[f"train_{f.index}"], arrays[f"test_{f.index}"] = f.train_idx, f.test_idx
+        np.savez(path, **arrays)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, X, y, groups) -> "FoldPlan":
+        """
+        Lädt einen gespeicherten Plan und wendet ihn auf X an. y und groups müssen
+        mit den beim Speichern verwendeten Daten übereinstimmen.
+        """
+        with np.load(Path(path)) as d:
+            if not (np.array_equal(d["y"], np.asarray(y).astype(str)) and np.array_equal(d["groups"], np.asarray(groups).astype(str))):
+                raise ValueError(f"Fold-Plan {path} passt nicht zu den übergebenen Daten.")
+            n_splits = int(d["n_splits"])
+            splits = [(d[f"train_{i}"], d[f"test_{i}"]) for i in range(n_splits)]
+            return cls(X, y, groups, splits, n_splits, int(d["random_state"]))
+
+    @classmethod
+    def load_or_create(cls, path: Path, X, y, groups, n_splits: int, random_state: int) -> "FoldPlan":
+        """
+        Lädt den Plan aus path, wenn er zu y, groups, n_splits und random_state passt –
+        StratifiedGroupKFold liefert dafür dieselben Splits. Sonst (keine oder andere
+        Daten) werden die Splits mit create() neu berechnet.
+        """
+        path = Path(path)
+        if path.exists():
+            try:
+                plan = cls.load(path, X, y, groups)
+                if (plan.n_splits, plan.random_state) == (n_splits, random_state):
+                    return plan
+            except ValueError:
+                pass  # Plan eines anderen Datensatzes
+            except Exception as e:
+                print(f"Warnung: Fold-Plan {path} nicht lesbar: {e}")
+        return cls.create(X, y, groups, n_splits, random_state)
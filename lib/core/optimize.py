@@ -8,36 +8,67 @@ Recording-Level-Aggregation (Wahrscheinlichkeiten pro Recording mitteln, argmax)
 Damit entspricht die Bewertung dem finalen Training und es entsteht keine
 Datenleckage durch überlappende Fenster.
 
+Suchstrategien (search_strategy):
+    "grid"    - Alle Kombinationen des Grids mit voller CV (Standard)
+    "random"  - Zufällige Stichprobe aus dem Grid mit Budget n_iter
+    "halving" - Successive Halving: alle Kombinationen auf wenigen Folds bewerten,
+                nur die besten 1/HALVING_FACTOR mit mehr Folds weiter prüfen
+
+Die (Kombination, Fold)-Aufgaben werden auf einen Prozess-Pool verteilt (n_jobs);
+Zwischenergebnisse landen in optimize_results.json – gebündelt alle FLUSH_EVERY
+Ergebnisse, nach jeder Halving-Runde und am Ende (auch bei Abbruch). Ein CancelToken beendet
+die Worker-Prozesse sofort. Bereits bewertete
+(Kombination, Fold)-Paare werden aus dem SearchCache (cache.py) übernommen.
+Die Folds stammen aus einem FoldPlan (folds.py), Imputer und Scaler werden einmal
+pro Fold gefittet und von allen Kombinationen geteilt; pro Aufgabe wird nur noch
+der Klassifikator trainiert.
+
 Unterstützte Modelle: randomforest, logreg, gradientboosting
 GradientBoosting: n_estimators, learning_rate, max_depth, subsample (0.8 = Stochastic GB)
 
 Hauptfunktionen:
     get_param_grids()     - Liefert Parametergrids pro Modell
-    run_grid_search()     - Führt GridSearch für ein Modell aus
+    run_grid_search()     - Führt die Hyperparameter-Suche (grid/random/halving) für ein Modell aus
     run_grid_search_all() - GridSearch für alle konfigurierten Modelle
 """
 
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
 import numpy as np
-import pandas as pd
 from itertools import product
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
-from sklearn.model_selection import StratifiedGroupKFold
 
 from . import config
-from .config import MODELS, CV_SPLITS, RANDOM_STATE
+from .aggregate import aggregate_recordings
+from .cache import load_json, save_json, search_cache_for
+from .folds import FOLD_PLAN_FILE, FoldPlan
+from .cancel import check_cancelled, shutdown_now
+
+SEARCH_STRATEGIES = ("grid", "random", "halving")
+HALVING_FACTOR = 3  # Pro Runde bleibt 1/HALVING_FACTOR der Kandidaten, Folds wachsen um diesen Faktor
+CANCEL_POLL_SEC = 0.2  # Max. Wartezeit auf Pool-Ergebnisse zwischen zwei Abbruch-Prüfungen
+FLUSH_EVERY = 32  # Ergebnisse zwischen zwei Schreibvorgängen von optimize_results.json und SearchCache
+
+# Daten der laufenden Suche im Worker-Prozess (einmal pro Worker via _init_worker gesetzt)
+_worker_state = {}
 
 
-def get_param_grids():
+def get_param_grids(random_state=None):
     """
     Liefert Parametergrids für GridSearch pro Modell.
 
+    Args:
+        random_state: Seed in base_params (optional, sonst config.RANDOM_STATE)
+
     Returns:
         dict: {model_name: {"param_grid": dict, "base_params": dict}}
     """
+    if random_state is None:
+        random_state = config.RANDOM_STATE
     return {
         "randomforest": {
             "param_grid": {
@@ -49,7 +80,7 @@ def get_param_grids():
             },
             "base_params": {
                 "class_weight": "balanced",
-                "random_state": RANDOM_STATE,
+                "random_state": random_state,
             },
         },
         "logreg": {
@@ -60,7 +91,7 @@ def get_param_grids():
             },
             "base_params": {
                 "class_weight": "balanced",
-                "random_state": RANDOM_STATE,
+                "random_state": random_state,
             },
         },
         "gradientboosting": {
@@ -71,7 +102,7 @@ def get_param_grids():
                 "clf__subsample": [0.8, 1.0],
             },
             "base_params": {
-                "random_state": RANDOM_STATE,
+                "random_state": random_state,
             },
         },
     }
@@ -83,7 +114,7 @@ def _recording_level_accuracy(pipe, X, y, groups, classes):
     mitteln, argmax = Vorhersage, dann Accuracy über Recordings.
 
     Args:
-        pipe: Fitted Pipeline
+        pipe: Fitted Pipeline oder Klassifikator (dann ist X bereits vorverarbeitet)
         X: Features
         y: Labels (für Gruppen)
         groups: Recording-IDs pro Zeile
@@ -94,16 +125,81 @@ def _recording_level_accuracy(pipe, X, y, groups, classes):
     """
     # Recording-Level: Pro Gruppe Wahrscheinlichkeiten mitteln, argmax = Vorhersage
     proba = pipe.predict_proba(X)
-    inner = pipe.named_steps["clf"]
-    model_classes = list(inner.classes_)
-    pdf = pd.DataFrame(proba, columns=model_classes)
-    pdf["g"], pdf["y_true"] = groups, y.values
-    agg = pdf.groupby("g", sort=False).agg({**{c: "mean" for c in model_classes}, "y_true": "first"})
-    tl, pl = [], []
-    for gid in agg.index:
-        tl.append(agg.loc[gid, "y_true"])
-        pl.append(model_classes[np.argmax(agg.loc[gid, model_classes].values)])
-    return sum(1 for t, p in zip(tl, pl) if str(t) == str(p)) / len(tl) if tl else 0.0
+    inner = pipe.named_steps["clf"] if isinstance(pipe, Pipeline) else pipe
+    votes = aggregate_recordings(proba, groups, list(inner.classes_))
+    if not len(votes.recordings):
+        return 0.0
+    y_true = np.asarray(y)[votes.first_idx].astype(str)
+    return float(np.mean(y_true == votes.labels.astype(str)))
+
+
+def _build_classifier(model_name, params, base_params):
+    """Baut den Klassifikator für eine Parameterkombination (Vorverarbeitung siehe preprocess.py)."""
+    clf_params = {k.replace("clf__", ""): v for k, v in params.items()}
+    clf_params.update(base_params)
+    if model_name == "randomforest":
+        return RandomForestClassifier(**clf_params)
+    elif model_name == "logreg":
+        return LogisticRegression(**clf_params)
+    return GradientBoostingClassifier(**clf_params)
+
+
+def _candidate_params(param_grid, search_strategy, n_iter, random_state):
+    """
+    Liefert die zu bewertenden Parameterkombinationen in Grid-Reihenfolge.
+    Bei "random" wird ohne Zurücklegen eine Stichprobe von n_iter Kombinationen gezogen.
+    """
+    keys = list(param_grid.keys())
+    combinations = [dict(zip(keys, combo)) for combo in product(*[param_grid[k] for k in keys])]
+    if search_strategy == "random" and n_iter < len(combinations):
+        rng = np.random.default_rng(random_state)
+        chosen = sorted(rng.choice(len(combinations), size=max(1, n_iter), replace=False))
+        combinations = [combinations[i] for i in chosen]
+    return combinations
+
+
+def _init_worker(state):
+    """Initializer für Pool-Worker: übernimmt die vorverarbeiteten Folds einmal pro Prozess."""
+    _worker_state.clear()
+    _worker_state.update(state)
+
+
+def _score_task(ci, fi, params, state=None):
+    """
+    Trainiert eine Parameterkombination auf einem Fold und bewertet sie auf Recording-Ebene.
+
+    Returns:
+        tuple: (ci, fi, accuracy)
+    """
+    s = state if state is not None else _worker_state
+    fold = s["folds"][fi]
+    clf = _build_classifier(s["model_name"], params, s["base_params"])
+    clf.fit(fold.X_train, fold.y_train)
+    acc = _recording_level_accuracy(clf, fold.X_test, fold.y_test, fold.groups_test, s["classes"])
+    return ci, fi, acc
+
+
+def _resolve_n_jobs(n_jobs, n_tasks):
+    """Anzahl Worker: <= 0 bedeutet alle CPUs, nie mehr Worker als Aufgaben."""
+    n_jobs = n_jobs if n_jobs is not None else config.N_JOBS
+    if n_jobs <= 0:
+        n_jobs = os.cpu_count() or 1
+    return max(1, min(n_jobs, n_tasks))
+
+
+def _write_partial_results(results_path, model_name, candidates, fold_scores, n_done, n_tasks):
+    """Schreibt den Zwischenstand der Suche für model_name nach results_path (atomar, andere Modelle bleiben erhalten)."""
+    data = load_json(results_path, {}) if results_path.exists() else {}
+    data[model_name] = {
+        "status": "running" if n_done < n_tasks else "done",
+        "n_done": n_done,
+        "n_tasks": n_tasks,
+        "results": [
+            {"params": candidates[ci], "scores": {str(fi): float(v) for fi, v in sorted(scores.items())}}
+            for ci, scores in enumerate(fold_scores) if scores
+        ],
+    }
+    save_json(results_path, data)
 
 
 def run_grid_search(
@@ -114,78 +210,160 @@ def run_grid_search(
     cv_splits=None,
     random_state=None,
     param_grid_override=None,
+    search_strategy=None,
+    n_iter=None,
+    n_jobs=None,
+    results_path=None,
+    use_cache=True,
+    cache_dir=None,
+    fold_plan=None,
+    on_progress=None,
+    cancel_token=None,
+    cfg=None,
 ):
     """
-    Führt GridSearch für ein Modell aus. Bewertung erfolgt auf Recording-Ebene.
+    Führt die Hyperparameter-Suche für ein Modell aus. Bewertung erfolgt auf Recording-Ebene.
+    Jede (Kombination, Fold)-Aufgabe wird an einen Prozess-Pool gegeben; die Fold-Scores
+    werden pro Kombination gemittelt. Bei Gleichstand gewinnt die frühere Kombination im Grid.
 
     Args:
         X: Feature-DataFrame
         y: Labels (Series)
         groups: Recording-IDs (array, parallel zu X/y)
         model_name: "randomforest", "logreg" oder "gradientboosting"
-        cv_splits: Anzahl CV-Folds (optional)
-        random_state: Random Seed (optional)
+        cv_splits: Anzahl CV-Folds (optional, sonst cfg.cv_splits)
+        random_state: Random Seed (optional, sonst cfg.random_state)
         param_grid_override: Überschreibt Parametergrid (optional)
+        search_strategy: "grid" | "random" | "halving" (optional, sonst cfg.search_strategy)
+        n_iter: Budget an Kombinationen für "random" (optional, sonst cfg.search_n_iter)
+        n_jobs: Anzahl Worker-Prozesse, <= 0 = alle CPUs (optional, sonst cfg.n_jobs)
+        results_path: Pfad für Zwischenergebnisse, z.B. artifacts/optimize_results.json (optional)
+        use_cache: Bei True: Fold-Scores aus dem persistenten SearchCache übernehmen und dort ablegen
+        cache_dir: Cache-Ordner (optional, sonst cfg.cache_dir)
+        fold_plan: FoldPlan des Trainingslaufs (optional, sonst fold_plan.npz aus cfg.artifacts_dir,
+                   wenn er zu den Daten passt, oder aus cv_splits/random_state berechnet);
+                   teilt Splits und Vorverarbeitung über mehrere Modelle
+        on_progress: Optionaler Callback on_progress(erledigt, gesamt) nach jeder bewerteten (Kombination, Fold)-Aufgabe
+        cancel_token: Optionales CancelToken; beim Abbruch werden die Worker-Prozesse sofort beendet
+        cfg: RunConfig für alle nicht übergebenen Werte (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
         tuple: (best_params: dict, best_score: float, all_results: list)
     """
-    cv_splits = cv_splits or CV_SPLITS
-    random_state = random_state or RANDOM_STATE
-    grids = get_param_grids()
+    cfg = config.resolve(cfg)
+    cv_splits = cv_splits or cfg.cv_splits
+    random_state = cfg.random_state if random_state is None else random_state
+    search_strategy = search_strategy or cfg.search_strategy
+    n_iter = n_iter or cfg.search_n_iter
+    n_jobs = n_jobs if n_jobs is not None else cfg.n_jobs
+    cache_dir = cache_dir or cfg.cache_dir
+    grids = get_param_grids(random_state)
     if model_name not in grids:
         raise ValueError(f"Unbekanntes Modell: {model_name}")
+    if search_strategy not in SEARCH_STRATEGIES:
+        raise ValueError(f"Unbekannte Suchstrategie: {search_strategy}")
 
-    cfg = grids[model_name]
-    param_grid = param_grid_override or cfg["param_grid"]
-    base_params = cfg["base_params"]
+    grid = grids[model_name]
+    param_grid = param_grid_override or grid["param_grid"]
+    base_params = grid["base_params"]
 
-    cv = StratifiedGroupKFold(n_splits=cv_splits, shuffle=True, random_state=random_state)
     classes = sorted(y.unique().tolist())
+    if fold_plan is None:
+        # Gespeicherter Plan des letzten Trainings auf denselben Daten, sonst neu berechnen
+        fold_plan = FoldPlan.load_or_create(Path(cfg.artifacts_dir) / FOLD_PLAN_FILE, X, y, groups, cv_splits, random_state)
+    folds = fold_plan.preprocessed()
+    splits = fold_plan.splits
 
-    # Alle Parameterkombinationen durchlaufen (kein GridSearchCV, da custom scoring)
-    keys = list(param_grid.keys())
-    values = [param_grid[k] for k in keys]
-    combinations = list(product(*values))
+    # Kombinationen je nach Strategie (kein GridSearchCV, da custom scoring)
+    candidates = _candidate_params(param_grid, search_strategy, n_iter, random_state)
+    fold_scores = [{} for _ in candidates]  # pro Kandidat: {fold_index: accuracy}
+    n_folds = 1 if search_strategy == "halving" else len(splits)
+    n_total = len(candidates) * n_folds  # wächst bei "halving" mit jeder Runde
+    state = {"folds": folds, "classes": classes, "model_name": model_name, "base_params": base_params}
+    results_path = Path(results_path) if results_path is not None else None
+    cache = search_cache_for(model_name, X, y, groups, fold_plan.fingerprint(), cache_dir, cfg=cfg) if use_cache else None
+    cache_keys = [cache.key(params, base_params) if cache else None for params in candidates]
+    n_done, n_unflushed = 0, 0
+
+    def _flush():
+        # Zwischenstand und Cache gebündelt schreiben – nicht pro Aufgabe (sonst O(Aufgaben²))
+        nonlocal n_unflushed
+        if results_path is not None:
+            _write_partial_results(results_path, model_name, candidates, fold_scores, n_done, max(n_total, n_done))
+        if cache is not None:
+            cache.flush()
+        n_unflushed = 0
+
+    def _on_result(ci, fi, acc, cached=False):
+        nonlocal n_done, n_unflushed
+        fold_scores[ci][fi] = acc
+        if cache is not None and not cached:
+            cache.put(cache_keys[ci], fi, acc)
+        n_done += 1
+        n_unflushed += 1
+        if n_unflushed >= FLUSH_EVERY:
+            _flush()
+        if on_progress is not None:
+            on_progress(n_done, max(n_total, n_done))
+
+    n_workers = _resolve_n_jobs(n_jobs, n_total)
+    executor, stop = None, None
+    try:
+        alive = list(range(len(candidates)))
+        while True:
+            # Fehlende Folds der lebenden Kandidaten (bereits bewertete Folds werden übernommen)
+            tasks = []
+            for ci in alive:
+                for fi in range(n_folds):
+                    if fi in fold_scores[ci]:
+                        continue
+                    cached = cache.get(cache_keys[ci], fi) if cache is not None else None
+                    if cached is not None:
+                        _on_result(ci, fi, cached, cached=True)
+                    else:
+                        tasks.append((ci, fi, candidates[ci]))
+            if executor is None and n_workers > 1 and len(tasks) > 1:
+                # Pool erst starten, wenn wirklich etwas zu rechnen ist (nicht bei vollem Cache)
+                executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker, initargs=(state,))
+                if cancel_token is not None:
+                    stop = cancel_token.on_cancel(lambda ex=executor: shutdown_now(ex))
+            if executor is None:
+                for task in tasks:
+                    check_cancelled(cancel_token)
+                    _on_result(*_score_task(*task, state=state))
+            else:
+                pending = {executor.submit(_score_task, *task) for task in tasks}
+                while pending:
+                    check_cancelled(cancel_token)
+                    done, pending = wait(pending, timeout=CANCEL_POLL_SEC, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        check_cancelled(cancel_token)  # Beendete Worker liefern BrokenProcessPool
+                        _on_result(*future.result())
+            if n_folds >= len(splits):
+                break
+            # Successive Halving: nur die besten Kandidaten erhalten mehr Folds (Gleichstand: Grid-Reihenfolge)
+            keep = max(1, -(-len(alive) // HALVING_FACTOR))
+            alive = sorted(alive, key=lambda ci: (-np.mean(list(fold_scores[ci].values())), ci))[:keep]
+            n_prev, n_folds = n_folds, len(splits) if len(alive) == 1 else min(len(splits), n_folds * HALVING_FACTOR)
+            n_total += len(alive) * (n_folds - n_prev)
+            _flush()
+    finally:
+        if stop is not None:
+            cancel_token.remove(stop)
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        _flush()  # Auch bei Abbruch: bereits bewertete Folds bleiben im Cache
 
     best_score = -1.0
     best_params = None
     all_results = []
-
-    for combo in combinations:
-        params = dict(zip(keys, combo))
-        clf_params = {k.replace("clf__", ""): v for k, v in params.items()}
-        clf_params.update(base_params)
-
-        if model_name == "randomforest":
-            clf = RandomForestClassifier(**clf_params)
-        elif model_name == "logreg":
-            clf = LogisticRegression(**clf_params)
-        else:
-            clf = GradientBoostingClassifier(**clf_params)
-
-        pipe = Pipeline([
-            ("imputer", SimpleImputer(strategy="median")),
-            ("scaler", StandardScaler()),
-            ("clf", clf),
-        ])
-        # Pro Kombination: CV-Splits, Recording-Level-Accuracy als Metrik
-        scores = []
-        for train_idx, test_idx in cv.split(X, y, groups):
-            pipe.fit(X.iloc[train_idx], y.iloc[train_idx])
-            acc = _recording_level_accuracy(
-                pipe,
-                X.iloc[test_idx],
-                y.iloc[test_idx],
-                groups[test_idx],
-                classes,
-            )
-            scores.append(acc)
-
+    for ci, params in enumerate(candidates):
+        # Scores in Fold-Reihenfolge, unabhängig von der Abschlussreihenfolge im Pool
+        scores = [fold_scores[ci][fi] for fi in sorted(fold_scores[ci])]
         mean_score = np.mean(scores)
         all_results.append({"params": params, "mean_score": mean_score, "scores": scores})
-
-        if mean_score > best_score:
+        # Nur vollständig bewertete Kandidaten sind vergleichbar
+        if len(scores) == len(splits) and mean_score > best_score:
             best_score = mean_score
             best_params = params
 
@@ -198,6 +376,7 @@ def run_grid_search_all(
     groups,
     cv_splits=None,
     random_state=None,
+    cfg=None,
 ):
     """
     Führt GridSearch für alle konfigurierten Modelle aus.
@@ -208,14 +387,16 @@ def run_grid_search_all(
         groups: Recording-IDs (array)
         cv_splits: Anzahl CV-Folds (optional)
         random_state: Random Seed (optional)
+        cfg: RunConfig mit den Modellen und Standardwerten (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
         dict: {model_name: {"best_params": dict, "best_score": float, "all_results": list}}
     """
+    cfg = config.resolve(cfg)
     results = {}
-    for mdl in MODELS:
+    for mdl in cfg.models:
         best_params, best_score, all_results = run_grid_search(
-            X, y, groups, mdl, cv_splits, random_state
+            X, y, groups, mdl, cv_splits, random_state, cfg=cfg
         )
         results[mdl] = {
             "best_params": best_params,
@@ -9,15 +9,50 @@ artifacts/plots/: confusion/, importance/, accuracy/
 - Feature Importance: Top 30 pro Modell (RF/GB: feature_importances_; LogReg: |coef_|)
 - plot_feature_importance_all_models: Kombinierter Plot für alle Modelle
 - _align_feat_cols: Passt feat_cols an, wenn Imputer Spalten entfernt hat (Dimension-Mismatch-Vermeidung)
+
+Die plot_*-Funktionen bereiten nur die Daten auf (Konfusionszählungen, Importance-Vektoren
+mit Namen, Genauigkeiten), schreiben sie als kompakten Payload nach plots/data/<name>.json
+und übergeben sie je nach mode (sonst cfg.plots) an das Rendering:
+- "deferred": Hintergrund-Thread rendert die PNGs, während die Pipeline weiterläuft
+  (wait_for_plots() wartet auf die ausstehenden Grafiken, discard_plots() verwirft sie –
+  mit out_dir nur die Aufträge dieses Laufs, Grafiken paralleler Läufe bleiben unberührt)
+- "sync": sofort im aufrufenden Thread
+- "data": nur die Payloads, keine PNGs (das GUI zeichnet selbst mit render_figure())
+- "off": weder Payloads noch Grafiken (z.B. für Batch-Läufe wie test.py)
+
+Gerendert wird über die objektorientierte Matplotlib-API (Figure + Agg-Canvas) ohne
+pyplot-Zustand, damit das Rendern in einem eigenen Thread sicher ist.
+
+Jede Grafik wird über einen Fingerprint ihrer Eingabedaten adressiert (plots/index.json:
+Datei -> Fingerprint). Existiert PNG bzw. Payload bereits mit demselben Fingerprint, wird es
+nicht neu geschrieben – z.B. Importance-Plots bei wiederholter Vorhersage mit demselben Modell.
 """
 
+import os
+import threading
+from collections import deque
 from pathlib import Path
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
 
+from . import config
+from .cache import fingerprint, load_json, save_json
+from .profiler import stage
+
+PLOT_MODES = ("off", "data", "deferred", "sync")
+PLOT_VERSION = 2             # Erhöhen, wenn sich das Layout ändert (macht alle Fingerprints ungültig)
+
+_jobs = deque()              # Ausstehende Render-Aufträge (payload, png-pfad, fingerprint)
+_lock = threading.Lock()
+_changed = threading.Condition(_lock)  # Signalisiert jeden fertigen oder verworfenen Auftrag
+_idle = threading.Event()    # Gesetzt, sobald keine Aufträge mehr ausstehen
+_idle.set()
+_thread = None
+_running = None              # png-Pfad der gerade gerenderten Grafik
+_index_lock = threading.Lock()
+
 
 def _ensure_dir(path: Path) -> Path:
     """Erstellt Verzeichnis falls nötig und gibt Pfad zurück."""
@@ -45,12 +80,255 @@ def _align_feat_cols(pipe, feat_cols: list[str], imp: np.ndarray) -> list[str]:
         return feat_cols
 
 
+def _importance(pipe, feat_cols: list[str]):
+    """
+    Importance-Vektor und passende Feature-Namen einer Pipeline.
+
+    Returns:
+        (imp, namen) oder einen Text, warum es keine Importance gibt
+    """
+    clf = pipe.named_steps.get("clf") if pipe is not None else None
+    if clf is None:
+        return "keine Importance"
+    if hasattr(clf, "feature_importances_"):
+        imp = clf.feature_importances_  # RF, GradientBoosting
+    elif hasattr(clf, "coef_"):
+        # LogReg: coef_ ist (n_classes, n_features), Betrag über Klassen mitteln
+        imp = np.abs(clf.coef_).mean(axis=0)
+    else:
+        return "keine Importance"
+    names = _align_feat_cols(pipe, feat_cols, imp)
+    if len(imp) != len(names):
+        return "Dimension mismatch"
+    return [float(v) for v in imp], list(names)
+
+
+# --- Rendering (nur aufbereitete Daten, kein Modellzugriff) ---
+
+def _draw_importance(ax, values: list[float], names: list[str], title: str, top_n: int) -> None:
+    imp = np.asarray(values, dtype=float)
+    idx = np.argsort(imp)[::-1][:top_n]  # Top-N Features nach Importance
+    ax.barh(range(len(idx)), imp[idx], color="steelblue", alpha=0.8)
+    ax.set_yticks(range(len(idx)))
+    ax.set_yticklabels([names[i] for i in idx], fontsize=8)
+    ax.invert_yaxis()
+    ax.set_xlabel("Importance")
+    ax.set_title(title)
+
+
+def _draw_confusion(fig: Figure, payload: dict) -> None:
+    ax = fig.subplots()
+    disp = ConfusionMatrixDisplay(confusion_matrix=np.asarray(payload["counts"]), display_labels=payload["classes"])
+    disp.plot(ax=ax, cmap="Blues", values_format="d")
+    ax.set_title(f"Konfusionsmatrix – {payload['model']}")
+
+
+def _draw_accuracy(fig: Figure, payload: dict) -> None:
+    models = list(payload["accuracies"].keys())
+    accs = [payload["accuracies"][m] * 100 for m in models]
+    ax = fig.subplots()
+    colors = ["#2ecc71", "#3498db", "#9b59b6", "#e67e22"][:len(models)]
+    bars = ax.bar(models, accs, color=colors, alpha=0.8)
+    ax.set_ylabel("Accuracy (%)")
+    ax.set_title("Modell-Genauigkeit (CV)")
+    ax.set_ylim(0, 105)
+    for bar, v in zip(bars, accs):
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 2, f"{v:.1f}%", ha="center", fontsize=10)
+
+
+def _draw_importance_one(fig: Figure, payload: dict) -> None:
+    _draw_importance(fig.subplots(), payload["values"], payload["names"],
+                     f"Feature Importance (Top {payload['top_n']}) – {payload['model']}", payload["top_n"])
+
+
+def _draw_importance_all(fig: Figure, payload: dict) -> None:
+    entries = payload["models"]
+    axes = np.atleast_1d(fig.subplots(1, len(entries), sharey=False))
+    for ax, e in zip(axes, entries):
+        if "error" in e:
+            ax.set_title(f"{e['model']} – {e['error']}")
+        else:
+            _draw_importance(ax, e["values"], e["names"], f"Feature Importance (Top {payload['top_n']}) – {e['model']}", payload["top_n"])
+
+
+# kind -> (Zeichenfunktion, Standardgröße in Zoll)
+_DRAW = {
+    "confusion": (_draw_confusion, lambda p: (8, 6)),
+    "importance": (_draw_importance_one, lambda p: (10, 8)),
+    "accuracy": (_draw_accuracy, lambda p: (8, 5)),
+    "importance_all": (_draw_importance_all, lambda p: (6 * len(p["models"]), 8)),
+}
+
+
+def render_figure(payload: dict, figsize: tuple | None = None, dpi: int = 100) -> Figure:
+    """
+    Zeichnet eine Grafik aus ihrem Daten-Payload (plots/data/*.json).
+
+    Args:
+        payload: Dict mit "kind" ("confusion" | "importance" | "accuracy" | "importance_all") und Daten
+        figsize: Größe in Zoll (optional, sonst Standardgröße der Grafik)
+        dpi: Auflösung
+
+    Returns:
+        Figure mit Agg-Canvas (fig.canvas.buffer_rgba() nach fig.canvas.draw())
+    """
+    draw, default_size = _DRAW[payload["kind"]]
+    fig = Figure(figsize=figsize or default_size(payload), dpi=dpi)
+    FigureCanvasAgg(fig)
+    draw(fig, payload)
+    fig.tight_layout()
+    return fig
+
+
+def load_payload(path) -> dict | None:
+    """Lädt einen Daten-Payload aus plots/data/ (None bei Fehler)."""
+    return load_json(path)
+
+
+def _render(payload: dict, out_path: Path, fp: str) -> Path:
+    """Rendert das PNG und trägt den Fingerprint der Eingabedaten in den Index ein."""
+    with stage(f"plot[{out_path.stem}]"):
+        fig = render_figure(payload)
+        _ensure_dir(out_path.parent)
+        # Temp-Datei + os.replace: nie halb geschriebene PNGs, und eine per Hardlink
+        # übernommene Datei (staging.py) wird ersetzt statt überschrieben
+        tmp = out_path.with_name(f".{out_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fig.savefig(tmp, dpi=100, bbox_inches="tight", format="png")
+        os.replace(tmp, out_path)
+    _remember(out_path, fp)
+    return out_path
+
+
+# --- Fingerprint-Index ---
+
+def _index_entry(path: Path) -> tuple[Path, str]:
+    """Index-Datei (plots/index.json) und Schlüssel "unterordner/datei" zu einer Datei in plots/."""
+    return path.parents[1] / "index.json", f"{path.parent.name}/{path.name}"
+
+
+def _is_current(path: Path, fp: str) -> bool:
+    """True, wenn die Datei existiert und aus denselben Eingabedaten erzeugt wurde."""
+    index_path, key = _index_entry(path)
+    with _index_lock:
+        return path.exists() and load_json(index_path, {}).get(key) == fp
+
+
+def _remember(path: Path, fp: str) -> None:
+    index_path, key = _index_entry(path)
+    with _index_lock:
+        index = load_json(index_path, {})
+        index[key] = fp
+        save_json(index_path, index)
+
+
+# --- Hintergrund-Worker ---
+
+def _worker() -> None:
+    global _thread, _running
+    while True:
+        with _lock:
+            if not _jobs:
+                _thread = None
+                _idle.set()
+                _changed.notify_all()
+                return
+            payload, out_path, fp = _jobs.popleft()
+            _running = out_path
+        try:
+            _render(payload, out_path, fp)
+        except Exception as e:
+            print(f"Grafik {out_path.name} konnte nicht erstellt werden: {repr(e)}")
+        finally:
+            with _lock:
+                _running = None
+                _changed.notify_all()
+
+
+def _belongs(path: Path | None, out_dir) -> bool:
+    """True, wenn path eine Grafik unter out_dir ist (out_dir None = jeder Lauf)."""
+    if path is None:
+        return False
+    return out_dir is None or os.path.abspath(out_dir) in map(os.path.abspath, path.parents)
+
+
+def _pending(out_dir) -> bool:
+    """Noch ausstehende oder laufende Aufträge für out_dir (Aufruf unter _lock)."""
+    return _belongs(_running, out_dir) or any(_belongs(p, out_dir) for _, p, _ in _jobs)
+
+
+def _submit(payload: dict, name: str, subdir: str, out_dir: Path, mode: str | None = None, cfg=None) -> Path | None:
+    """
+    Schreibt den Daten-Payload nach plots/data/<name>.json und übergibt das PNG
+    plots/<subdir>/<name>.png gemäß mode (Standard: cfg.plots) an das Rendering.
+    Unveränderte Payloads und PNGs (gleicher Fingerprint) werden nicht neu geschrieben.
+
+    Returns:
+        PNG-Pfad (bei "deferred" erst nach wait_for_plots() garantiert vorhanden),
+        JSON-Pfad bei "data" oder None bei "off"
+    """
+    mode = mode or config.resolve(cfg).plots
+    if mode not in PLOT_MODES:
+        raise ValueError(f"Unbekannter Plot-Modus: {mode} (erlaubt: {', '.join(PLOT_MODES)})")
+    if mode == "off":
+        return None
+    plots_dir = Path(out_dir) / "plots"
+    fp = fingerprint(PLOT_VERSION, payload)
+    data_path = plots_dir / "data" / f"{name}.json"
+    if not _is_current(data_path, fp):
+        save_json(data_path, payload)
+        _remember(data_path, fp)
+    if mode == "data":
+        return data_path
+    out_path = plots_dir / subdir / f"{name}.png"
+    if _is_current(out_path, fp):
+        return out_path
+    if mode == "sync":
+        return _render(payload, out_path, fp)
+    global _thread
+    with _lock:
+        _jobs.append((payload, out_path, fp))
+        _idle.clear()
+        if _thread is None:
+            # Kein Daemon: ausstehende Grafiken werden auch bei Prozessende noch geschrieben
+            _thread = threading.Thread(target=_worker, name="plot-renderer")
+            _thread.start()
+    return out_path
+
+
+def wait_for_plots(timeout: float | None = None, out_dir: Path | None = None) -> bool:
+    """
+    Wartet, bis die im Hintergrund eingereihten Grafiken geschrieben sind – mit out_dir nur
+    die Grafiken unter diesem Ordner, sonst alle. False bei Timeout.
+    """
+    if out_dir is None:
+        return _idle.wait(timeout)
+    with _lock:
+        return _changed.wait_for(lambda: not _pending(out_dir), timeout)
+
+
+def discard_plots(timeout: float | None = None, out_dir: Path | None = None) -> bool:
+    """
+    Verwirft ausstehende Render-Aufträge (z.B. nach Abbruch) und wartet auf die laufende
+    Grafik. Mit out_dir nur die Aufträge dieses Laufs, sonst alle. False bei Timeout.
+    """
+    with _lock:
+        keep = [job for job in _jobs if not _belongs(job[1], out_dir)]
+        _jobs.clear()
+        _jobs.extend(keep)
+        _changed.notify_all()
+    return wait_for_plots(timeout, out_dir)
+
+
+# --- Öffentliche Schnittstelle ---
+
 def plot_confusion_matrix(
     y_true: list | np.ndarray,
     y_pred: list | np.ndarray,
     classes: list[str],
     model_name: str,
     out_dir: Path,
+    mode: str | None = None,
+    cfg=None,
 ) -> Path | None:
     """
     Erstellt Konfusionsmatrix und speichert sie in out_dir/plots/confusion/.
@@ -61,22 +339,16 @@ def plot_confusion_matrix(
         classes: Klassenbezeichnungen
         model_name: Modellname für Titel
         out_dir: Ausgabe-Ordner (z.B. artifacts_dir)
+        mode: "off" | "data" | "deferred" | "sync" (optional, sonst cfg.plots)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
-        Pfad zur gespeicherten Datei oder None bei Fehler
+        Pfad zum (ggf. noch entstehenden) PNG, bei mode "data" zum JSON-Payload; None bei Fehler / mode "off"
     """
     try:
-        plots_dir = _ensure_dir(out_dir / "plots" / "confusion")
         cm = confusion_matrix(y_true, y_pred, labels=classes)
-        fig, ax = plt.subplots(figsize=(8, 6))
-        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=classes)
-        disp.plot(ax=ax, cmap="Blues", values_format="d")
-        ax.set_title(f"Konfusionsmatrix – {model_name}")
-        plt.tight_layout()
-        out_path = plots_dir / f"confusion_{model_name}.png"
-        fig.savefig(out_path, dpi=100, bbox_inches="tight")
-        plt.close(fig)
-        return out_path
+        payload = {"kind": "confusion", "model": model_name, "classes": [str(c) for c in classes], "counts": cm.tolist()}
+        return _submit(payload, f"confusion_{model_name}", "confusion", out_dir, mode, cfg)
     except Exception:
         return None
 
@@ -86,6 +358,8 @@ def plot_feature_importance(
     feat_cols: list[str],
     model_name: str,
     out_dir: Path,
+    mode: str | None = None,
+    cfg=None,
 ) -> Path | None:
     """
     Erstellt Feature-Importance-Plot (RandomForest, GradientBoosting, ExtraTrees oder LogReg).
@@ -97,74 +371,40 @@ def plot_feature_importance(
         feat_cols: Liste der Feature-Spaltennamen
         model_name: Modellname für Titel
         out_dir: Ausgabe-Ordner (z.B. artifacts_dir)
+        mode: "off" | "data" | "deferred" | "sync" (optional, sonst cfg.plots)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
-        Pfad zur gespeicherten Datei oder None bei Fehler
+        Pfad zum (ggf. noch entstehenden) PNG, bei mode "data" zum JSON-Payload; None bei Fehler / mode "off"
     """
     try:
-        clf = pipe.named_steps.get("clf")
-        if clf is None:
-            return None
-        if hasattr(clf, "feature_importances_"):
-            imp = clf.feature_importances_  # RF, GradientBoosting
-        elif hasattr(clf, "coef_"):
-            # LogReg: coef_ ist (n_classes, n_features), Betrag über Klassen mitteln
-            imp = np.abs(clf.coef_).mean(axis=0)
-        else:
-            return None
-        feat_cols_aligned = _align_feat_cols(pipe, feat_cols, imp)
-        if len(imp) != len(feat_cols_aligned):
-            return None  # Dimension-Mismatch nach Alignment – Plot überspringen
-        idx = np.argsort(imp)[::-1][:30]  # Top 30 Features nach Importance
-        imp_sorted = imp[idx]
-        names_sorted = [feat_cols_aligned[i] for i in idx]
-        fig, ax = plt.subplots(figsize=(10, 8))
-        ax.barh(range(len(names_sorted)), imp_sorted, color="steelblue", alpha=0.8)
-        ax.set_yticks(range(len(names_sorted)))
-        ax.set_yticklabels(names_sorted, fontsize=8)
-        ax.invert_yaxis()
-        ax.set_xlabel("Importance")
-        ax.set_title(f"Feature Importance (Top 30) – {model_name}")
-        plt.tight_layout()
-        plots_dir = _ensure_dir(out_dir / "plots" / "importance")
-        out_path = plots_dir / f"importance_{model_name}.png"
-        fig.savefig(out_path, dpi=100, bbox_inches="tight")
-        plt.close(fig)
-        return out_path
+        data = _importance(pipe, feat_cols)
+        if isinstance(data, str):
+            return None  # Keine Importance oder Dimension-Mismatch nach Alignment – Plot überspringen
+        payload = {"kind": "importance", "model": model_name, "top_n": 30, "names": data[1], "values": data[0]}
+        return _submit(payload, f"importance_{model_name}", "importance", out_dir, mode, cfg)
     except Exception as e:
         print(f"Feature Importance Diagramm konnte nicht erstellt werden: {repr(e)}")
         return None
 
 
-def plot_accuracy(accuracies: dict[str, float], out_dir: Path) -> Path | None:
+def plot_accuracy(accuracies: dict[str, float], out_dir: Path, mode: str | None = None, cfg=None) -> Path | None:
     """
     Erstellt Balkendiagramm der Modell-Genauigkeiten.
     Speichert in out_dir/plots/accuracy/.
     Args:
         accuracies: {"randomforest": 0.88, "logreg": 0.94}
+        mode: "off" | "data" | "deferred" | "sync" (optional, sonst cfg.plots)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
-        Pfad zur gespeicherten Datei oder None bei Fehler
+        Pfad zum (ggf. noch entstehenden) PNG, bei mode "data" zum JSON-Payload; None bei Fehler / mode "off"
     """
     try:
         if not accuracies:
             return None
-        models = list(accuracies.keys())
-        accs = [accuracies[m] * 100 for m in models]
-        fig, ax = plt.subplots(figsize=(8, 5))
-        colors = ["#2ecc71", "#3498db", "#9b59b6", "#e67e22"][:len(models)]
-        bars = ax.bar(models, accs, color=colors, alpha=0.8)
-        ax.set_ylabel("Accuracy (%)")
-        ax.set_title("Modell-Genauigkeit (CV)")
-        ax.set_ylim(0, 105)
-        for bar, v in zip(bars, accs):
-            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 2, f"{v:.1f}%", ha="center", fontsize=10)
-        plt.tight_layout()
-        plots_dir = _ensure_dir(out_dir / "plots" / "accuracy")
-        out_path = plots_dir / "accuracy_models.png"
-        fig.savefig(out_path, dpi=100, bbox_inches="tight")
-        plt.close(fig)
-        return out_path
+        payload = {"kind": "accuracy", "accuracies": {str(m): float(a) for m, a in accuracies.items()}}
+        return _submit(payload, "accuracy_models", "accuracy", out_dir, mode, cfg)
     except Exception:
         return None
 
@@ -174,6 +414,8 @@ def plot_feature_importance_all_models(
     feat_cols: list[str],
     out_dir: Path,
     top_n: int = 20,
+    mode: str | None = None,
+    cfg=None,
 ) -> Path | None:
     """
     Erstellt einen kombinierten Feature-Importance-Plot für alle Modelle
@@ -184,50 +426,23 @@ def plot_feature_importance_all_models(
         feat_cols: Liste der Feature-Spaltennamen
         out_dir: Ausgabe-Ordner (z.B. artifacts_dir)
         top_n: Anzahl der Top-Features pro Modell (Standard: 20)
+        mode: "off" | "data" | "deferred" | "sync" (optional, sonst cfg.plots)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
 
     Returns:
-        Pfad zur gespeicherten Datei oder None bei Fehler
+        Pfad zum (ggf. noch entstehenden) PNG, bei mode "data" zum JSON-Payload; None bei Fehler / mode "off"
     """
     try:
-        models = [m for m in pipes if pipes[m] is not None]
-        if not models:
-            return None
-        n_models = len(models)
-        fig, axes = plt.subplots(1, n_models, figsize=(6 * n_models, 8), sharey=False)
-        if n_models == 1:
-            axes = [axes]
-        for ax, mdl in zip(axes, models):
-            pipe = pipes[mdl]
-            clf = pipe.named_steps.get("clf") if pipe else None
-            if clf is None:
-                ax.set_title(f"{mdl} – keine Importance")
+        entries = []
+        for m in pipes:
+            if pipes[m] is None:
                 continue
-            if hasattr(clf, "feature_importances_"):
-                imp = clf.feature_importances_
-            elif hasattr(clf, "coef_"):
-                imp = np.abs(clf.coef_).mean(axis=0)
-            else:
-                ax.set_title(f"{mdl} – keine Importance")
-                continue
-            feat_cols_aligned = _align_feat_cols(pipe, feat_cols, imp)
-            if len(imp) != len(feat_cols_aligned):
-                ax.set_title(f"{mdl} – Dimension mismatch")
-                continue
-            idx = np.argsort(imp)[::-1][:top_n]
-            imp_sorted = imp[idx]
-            names_sorted = [feat_cols_aligned[i] for i in idx]
-            ax.barh(range(len(names_sorted)), imp_sorted, color="steelblue", alpha=0.8)
-            ax.set_yticks(range(len(names_sorted)))
-            ax.set_yticklabels(names_sorted, fontsize=8)
-            ax.invert_yaxis()
-            ax.set_xlabel("Importance")
-            ax.set_title(f"Feature Importance (Top {top_n}) – {mdl}")
-        plt.tight_layout()
-        plots_dir = _ensure_dir(out_dir / "plots" / "importance")
-        out_path = plots_dir / "importance_all_models.png"
-        fig.savefig(out_path, dpi=100, bbox_inches="tight")
-        plt.close(fig)
-        return out_path
+            data = _importance(pipes[m], feat_cols)
+            entries.append({"model": m, "error": data} if isinstance(data, str) else {"model": m, "names": data[1], "values": data[0]})
+        if not entries:
+            return None
+        payload = {"kind": "importance_all", "top_n": top_n, "models": entries}
+        return _submit(payload, "importance_all_models", "importance", out_dir, mode, cfg)
     except Exception as e:
         print(f"Kombinierter Importance-Plot konnte nicht erstellt werden: {repr(e)}")
-        return None
\ No newline at end of file
+        return None
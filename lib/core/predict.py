@@ -7,21 +7,41 @@ extrahiert Features mit derselben Struktur wie beim Training, führt Vorhersage
 Modell aus und aggregiert pro Recording (argmax über gemittelte Fenster-Wahrscheinlichkeiten).
 Schreibt Ergebnisse in test_ergebnis_*.csv und erzeugt Feature-Importance-Plots.
 
-CLI: python -m DriveIdent.lib.core.predict [--data-dir DIR] [--test-labels FILE] [--artifacts DIR] [--config PATH]
+Ergebnisse pro Recording werden in CACHE_DIR/predictions abgelegt (Schlüssel: Inhalt der
+Recording-Datei + Fingerprint des Modell-Artefakts). Eine erneute Vorhersage berechnet
+Features und Wahrscheinlichkeiten nur für neue oder geänderte Recordings.
+
+Mit config.EARLY_EXIT werden die Fenster jedes Recordings in zeitlicher Reihenfolge
+gelesen; ein Modell hört auf, sobald der Abstand der besten zur zweitbesten Klasse im
+laufenden Mittelwert EARLY_EXIT_MARGIN übersteigt (frühestens nach EARLY_EXIT_MIN_WINDOWS
+Fenstern). Die Spalte n_windows gibt an, wie viele Fenster dafür gelesen wurden.
+Die Fenster werden in Blöcken (EARLY_EXIT_BLOCK) ausgewertet – ein predict_proba pro Block
+und Modell, mit dem NumPy-Export (compiled.py), falls vorhanden; innerhalb eines Blocks
+wird das erste Fenster bestimmt, nach dem die Margin erreicht ist.
+
+CLI: python -m DriveIdent.lib.core.predict [--data-dir DIR] [--test-labels FILE] [--artifacts DIR] [--config PATH] [--early-exit]
 """
 
 import argparse
 from pathlib import Path
 import numpy as np
 import pandas as pd
-import joblib
 from typing import Callable
 
 from . import config
-from .data import load_labels
+from .data import load_labels, load_recording, find_windows
+from .cache import file_fingerprint, prediction_cache_for
 from .features import extract_features
-from .progress import write_progress
+from .window_features import window_features
+from .progress import write_progress, ProgressStage
+from .aggregate import aggregate_recordings
+from .registry import get_estimator, get_model, get_models, get_metadata
 from .plots import plot_feature_importance, plot_feature_importance_all_models
+from .profiler import profile_run, stage
+from .cancel import check_cancelled
+from .staging import staged_output
+
+EARLY_EXIT_BLOCK = 8  # Fenster pro Block im Early-Exit-Modus (ein predict_proba pro Block und Modell)
 
 
 def _parse_args():
@@ -31,9 +51,141 @@ def _parse_args():
     p.add_argument("--test-labels", type=str, help="Test-Label-Datei (z.B. test_labels.lbl)")
     p.add_argument("--artifacts", type=str, help="Ordner mit Modellen")
     p.add_argument("--config", type=str, help="Pfad zu config.json")
+    p.add_argument("--early-exit", action="store_true", help="Pro Recording abbrechen, sobald die Vorhersage sicher ist")
     return p.parse_args()
 
-def predict(data_dir=None, test_labels_file : str | Path | pd.DataFrame | None = None, artifacts_dir=None, progress_callback : Callable | None = None):
+def _first_confident(sums: np.ndarray, proba: np.ndarray, start: int, min_windows: int, margin: float):
+    """
+    Erstes Fenster eines Blocks, nach dem der laufende Mittelwert die Margin übersteigt.
+
+    Args:
+        sums: Summe der Wahrscheinlichkeiten der start bisherigen Fenster
+        proba: Wahrscheinlichkeiten der Fenster des Blocks (Fenster start, start + 1, ...)
+
+    Returns:
+        Anzahl der bis dahin gelesenen Fenster oder None
+    """
+    n = np.arange(start + 1, start + len(proba) + 1)
+    mean = (sums + np.cumsum(proba, axis=0)) / n[:, None]
+    if mean.shape[1] > 1:
+        top2 = np.partition(mean, mean.shape[1] - 2, axis=1)[:, -2:]
+        marg = top2[:, 1] - top2[:, 0]
+    else:
+        marg = mean[:, 0]
+    hit = np.flatnonzero((marg > margin) & (n >= min_windows))
+    return int(n[hit[0]]) if len(hit) else None
+
+def _predict_early_exit(paths, ids, artifacts_dir, margin=None, min_windows=None, cancel_token=None, cfg=None) -> dict:
+    """
+    Sequenzielle Vorhersage mit vorzeitigem Abbruch. Features werden blockweise nur für die
+    Fenster berechnet, die noch mindestens ein Modell benötigt; ein Modell verwendet genau
+    die Fenster bis zum ersten, nach dem die Margin erreicht ist.
+
+    Returns:
+        {Modell: [{recording, soll, ist, korrekt, margin, n_windows, n_windows_total}]}
+    """
+    cfg = config.resolve(cfg)
+    margin = cfg.early_exit_margin if margin is None else margin
+    min_windows = cfg.early_exit_min_windows if min_windows is None else min_windows
+    ests = {mdl: get_estimator(artifacts_dir, mdl) for mdl in cfg.models}
+    first = get_metadata(artifacts_dir, cfg.models[0])
+    feat_cols = first["feat_cols"]
+    out = {mdl: [] for mdl in cfg.models}
+    for p, soll in zip(paths, ids):
+        check_cancelled(cancel_token)
+        name, d = load_recording(p)
+        wins = find_windows(d["t"], cfg=cfg)
+        if not wins:
+            continue
+        rows = {mdl: [] for mdl in cfg.models}
+        sums = {mdl: 0.0 for mdl in cfg.models}
+        active = list(cfg.models)
+        start = 0
+        while active and start < len(wins):
+            # Erster Block bis min_windows (vorher ist kein Abbruch möglich), danach EARLY_EXIT_BLOCK Fenster
+            stop = min(len(wins), max(start + EARLY_EXIT_BLOCK, min_windows))
+            feats = [window_features(d, i0, i1, first["feature_set"], max_points=cfg.max_points) for i0, i1, _, _ in wins[start:stop]]
+            X = np.array([[f.get(c, np.nan) for c in feat_cols] for f in feats], dtype=float)
+            for mdl in list(active):
+                est, _, compiled = ests[mdl]
+                with stage(f"predict_proba[{mdl}]"):
+                    proba = est.predict_proba(X if compiled else pd.DataFrame(X, columns=feat_cols))
+                n = _first_confident(sums[mdl], proba, start, min_windows, margin)
+                if n is not None:
+                    proba = proba[:n - start]
+                    active.remove(mdl)  # Modell ist sicher – keine weiteren Fenster
+                rows[mdl].append(proba)
+                sums[mdl] = sums[mdl] + proba.sum(axis=0)
+            start = stop
+        for mdl in cfg.models:
+            proba = np.concatenate(rows[mdl])
+            votes = aggregate_recordings(proba, np.zeros(len(proba)), ests[mdl][1])
+            ist = votes.labels[0]
+            out[mdl].append({"recording": name, "soll": soll, "ist": ist, "korrekt": ist == soll, "margin": float(votes.margin[0]),
+                             "n_windows": int(votes.n_windows[0]), "n_windows_total": len(wins)})
+    return out
+
+def _predict_recordings(paths, ids, artifacts_dir, feature_set, feat_cols, on_extraction_start=None, use_cache=True, on_progress=None, cancel_token=None, cfg=None) -> dict:
+    """
+    Vorhersage pro Recording aus den gemittelten Fenster-Wahrscheinlichkeiten. Mit use_cache
+    werden Ergebnisse unveränderter Recordings aus dem PredictionCache übernommen; Features
+    werden nur für die übrigen Recordings extrahiert.
+
+    Returns:
+        {Modell: [{recording, soll, ist, korrekt, margin}]} in der Reihenfolge von paths
+        (Recordings ohne gültiges Fenster fehlen, wie bisher)
+    """
+    cfg = config.resolve(cfg)
+    caches = {mdl: prediction_cache_for(artifacts_dir, mdl, cfg=cfg) for mdl in cfg.models} if use_cache else {}
+    rec_fps = [file_fingerprint(p) for p in paths] if use_cache else [None] * len(paths)
+    todo = [i for i, fp in enumerate(rec_fps) if not use_cache or any(c.get(fp) is None for c in caches.values())]
+    fresh = {mdl: {} for mdl in cfg.models}
+    recs = []
+    for i in todo:
+        check_cancelled(cancel_token)
+        _, d = load_recording(paths[i])
+        if find_windows(d["t"], cfg=cfg):
+            recs.append((str(i), d))  # Index als Recording-Schlüssel – Dateinamen können sich wiederholen
+        else:
+            for mdl in cfg.models: fresh[mdl][i] = {"n_windows": 0}
+    if use_cache:
+        print(f"Aus Cache: {len(paths) - len(todo)}/{len(paths)} Recordings")
+    if recs:
+        if on_extraction_start:
+            on_extraction_start()
+        result = extract_features(recs, [ids[int(k)] for k, _ in recs], feature_set, on_progress=on_progress, cancel_token=cancel_token, cfg=cfg)
+        # Fehlende Features (z.B. wenn TSFresh andere Spalten liefert) mit NaN auffüllen
+        for c in feat_cols:
+            if c not in result.columns: result[c] = np.nan
+        X = result[feat_cols]
+        for mdl in cfg.models:
+            pipe = get_model(artifacts_dir, mdl).pipe
+            with stage(f"predict_proba[{mdl}]"):
+                proba = pipe.predict_proba(X)
+            # Klassen vom Modell verwenden (nicht aus Test-Labels) – proba ist bereits in dieser Reihenfolge
+            model_classes = list(pipe.named_steps["clf"].classes_)
+            # Recording-Level: Wahrscheinlichkeiten pro Recording mitteln, argmax = finale Vorhersage
+            votes = aggregate_recordings(proba, result["recording"].values, model_classes)
+            for j, key in enumerate(votes.recordings):
+                fresh[mdl][int(key)] = {"classes": [str(c) for c in model_classes], "proba": votes.proba[j].tolist(),
+                                        "ist": str(votes.labels[j]), "margin": float(votes.margin[j]),
+                                        "n_windows": int(votes.n_windows[j])}
+
+    out = {mdl: [] for mdl in cfg.models}
+    for mdl in cfg.models:
+        for i, p in enumerate(paths):
+            if i in fresh[mdl]:
+                e = fresh[mdl][i]
+                if use_cache: caches[mdl].put(rec_fps[i], e)
+            else:
+                e = caches[mdl].get(rec_fps[i])
+            if e["n_windows"]:
+                out[mdl].append({"recording": Path(p).name, "soll": ids[i], "ist": e["ist"], "korrekt": e["ist"] == ids[i], "margin": e["margin"]})
+        if use_cache: caches[mdl].save()
+    return out
+
+@profile_run("predict")
+def predict(data_dir=None, test_labels_file : str | Path | pd.DataFrame | None = None, artifacts_dir=None, progress_callback : Callable | None = None, use_cache=True, cancel_token=None, cfg=None):
     """
     Führt Vorhersage mit allen trainierten Modellen aus. Pro Recording wird die
     Vorhersage aus den gemittelten Fenster-Wahrscheinlichkeiten ermittelt.
@@ -42,75 +194,87 @@ def predict(data_dir=None, test_labels_file : str | Path | pd.DataFrame | None =
         data_dir: Ordner mit Test-CSV-Recordings (optional)
         test_labels_file: Test-Label-Datei (optional)
         artifacts_dir: Ordner mit Modellen (optional)
+        use_cache: Ergebnisse unveränderter Recordings aus CACHE_DIR/predictions übernehmen
+        cancel_token: Optionales CancelToken (cancel.py); bei Abbruch wird Cancelled geworfen
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration); übergebene Argumente haben Vorrang
     """
-    data_dir = data_dir or config.DATA_DIR
-    test_labels_file = test_labels_file if test_labels_file is not None else config.TEST_LABELS_FILE
-    artifacts_dir = Path(artifacts_dir or config.ARTIFACTS_DIR)
+    cfg = config.resolve(cfg)
+    data_dir = data_dir or cfg.data_dir
+    test_labels_file = test_labels_file if test_labels_file is not None else cfg.test_labels_file
+    artifacts_dir = Path(artifacts_dir or cfg.artifacts_dir)
+    cfg = cfg.replace(data_dir=data_dir, artifacts_dir=artifacts_dir)
+    models = list(cfg.models)
 
     write_progress(artifacts_dir, phase="starting", message="Lade Test-Labels...", callback=progress_callback)
-    # FEATURE_SET und feat_cols aus erstem Modell laden – müssen mit Training übereinstimmen
-    _ld = joblib.load(artifacts_dir / f"model_{config.MODELS[0]}.joblib")
-    FEATURE_SET, feat_cols = _ld[2], _ld[1]
+    # FEATURE_SET und feat_cols aus den Metadaten des ersten Modells (model_*.json, ohne
+    # Unpickling) – müssen mit Training übereinstimmen. Die Registry lädt jedes Modell
+    # nur einmal (auch über mehrere Vorhersagen hinweg).
+    _meta = get_metadata(artifacts_dir, models[0])
+    FEATURE_SET, feat_cols = _meta["feature_set"], _meta["feat_cols"]
 
     paths, ids = load_labels(test_labels_file, False, data_dir)
     if not paths:
         raise SystemExit("Keine gültigen Test-Labels gefunden.")
     print(f"Lade {len(paths)} Test-Recordings...")
 
-    def _on_extraction_start():
-        write_progress(artifacts_dir, phase="extraction", message="Extraktion läuft...", callback=progress_callback)
-    result = extract_features(paths, ids, FEATURE_SET, on_extraction_start=_on_extraction_start)
-
-    # Fehlende Features (z.B. wenn TSFresh andere Spalten liefert) mit NaN auffüllen
-    for c in feat_cols:
-        if c not in result.columns: result[c] = np.nan
-    X = result[feat_cols]
-
-    total_models = len(config.MODELS)
-    for i, mdl in enumerate(config.MODELS):
-        completed = config.MODELS[:i]
-        in_progress = [mdl]
-        write_progress(
-            artifacts_dir,
-            phase="prediction",
-            total=total_models,
-            completed=completed,
-            in_progress=in_progress,
-            message=f"Vorhersage {mdl}...",
-            callback=progress_callback
-        )
-        pipe = joblib.load(artifacts_dir / f"model_{mdl}.joblib")[0]
-        proba = pipe.predict_proba(X)
-        inner = pipe.named_steps["clf"]
-        # Klassen vom Modell verwenden (nicht aus Test-Labels) – proba ist bereits in dieser Reihenfolge
-        model_classes = list(inner.classes_)
-        pdf = pd.DataFrame(proba, columns=model_classes)
-        pdf["rec"], pdf["y_true"] = result["recording"].values, result["driver_id"].values
-        # Recording-Level: Wahrscheinlichkeiten pro Recording mitteln, argmax = finale Vorhersage
-        agg = pdf.groupby("rec", sort=False).agg({**{c: "mean" for c in model_classes}, "y_true": "first"})
-        recs = [{"recording": r, "soll": agg.loc[r, "y_true"], "ist": model_classes[np.argmax(agg.loc[r, model_classes].values)], "korrekt": model_classes[np.argmax(agg.loc[r, model_classes].values)] == agg.loc[r, "y_true"]} for r in agg.index]
-        out = artifacts_dir / f"test_ergebnis_{mdl}.csv"
-        pd.DataFrame(recs).to_csv(out, index=False)
-        plot_feature_importance(pipe, feat_cols, mdl, artifacts_dir)
-        df_str = pd.DataFrame(recs).to_string(index=False)
-        korrekt = sum(x["korrekt"] for x in recs)
-        print(f"\n--- {mdl} ---")
-        print(df_str)
-        print(f"Korrekt: {korrekt}/{len(recs)}")
-        print(f"Gespeichert: {out}, plots/prediction/")
+    early = cfg.early_exit
+    if early:
+        write_progress(artifacts_dir, phase="extraction", message="Sequenzielle Vorhersage (Early Exit)...", callback=progress_callback)
+        results = _predict_early_exit(paths, ids, artifacts_dir, cancel_token=cancel_token, cfg=cfg)
+    else:
+        def _on_extraction_start():
+            write_progress(artifacts_dir, phase="extraction", message="Extraktion läuft...", callback=progress_callback)
+        extraction = ProgressStage(artifacts_dir, "extraction", len(paths), "Recordings", progress_callback)
+
+        def _on_progress(done, total, step):
+            extraction.total = total  # nur die nicht gecachten Recordings
+            extraction.update(done, f"Extraktion: {step}")
+        results = _predict_recordings(paths, ids, artifacts_dir, FEATURE_SET, feat_cols, _on_extraction_start, use_cache, _on_progress, cancel_token, cfg)
+
+    total_models = len(models)
+    # Ergebnisse und Grafiken zuerst in einen Staging-Ordner, nach erfolgreichem Ende (inkl.
+    # Grafiken) nach artifacts_dir verschieben – ein Abbruch hinterlässt keine halben Ergebnisse
+    with staged_output(artifacts_dir) as out_dir:
+        for i, mdl in enumerate(models):
+            check_cancelled(cancel_token)
+            completed = models[:i]
+            in_progress = [mdl]
+            write_progress(
+                artifacts_dir,
+                phase="prediction",
+                total=total_models,
+                completed=completed,
+                in_progress=in_progress,
+                message=f"Vorhersage {mdl}...",
+                callback=progress_callback
+            )
+            pipe = get_model(artifacts_dir, mdl).pipe
+            recs = results[mdl]
+            name = f"test_ergebnis_{mdl}.csv"
+            pd.DataFrame(recs).to_csv(out_dir / name, index=False)
+            plot_feature_importance(pipe, feat_cols, mdl, out_dir, cfg=cfg)
+            df_str = pd.DataFrame(recs).to_string(index=False)
+            korrekt = sum(x["korrekt"] for x in recs)
+            print(f"\n--- {mdl} ---")
+            print(df_str)
+            print(f"Korrekt: {korrekt}/{len(recs)}")
+            if early:
+                print(f"Gelesene Fenster: {sum(x['n_windows'] for x in recs)}/{sum(x['n_windows_total'] for x in recs)}")
+            print(f"Gespeichert: {artifacts_dir / name}, plots/prediction/")
 
+        # Kombinierter Feature-Importance-Plot für alle Modelle
+        pipes_all = {mdl: a.pipe for mdl, a in get_models(artifacts_dir, models).items()}
+        plot_feature_importance_all_models(pipes_all, feat_cols, out_dir, cfg=cfg)
+    # staged_output hat auf die Grafiken gewartet und alles verschoben – erst jetzt "Fertig"
     write_progress(
         artifacts_dir,
         phase="done",
         total=total_models,
-        completed=config.MODELS,
+        completed=models,
         in_progress=[],
         message="Fertig",
         callback=progress_callback
     )
-    # Kombinierter Feature-Importance-Plot für alle Modelle
-    pipes_all = {mdl: joblib.load(artifacts_dir / f"model_{mdl}.joblib")[0] for mdl in config.MODELS}
-    plot_feature_importance_all_models(pipes_all, feat_cols, artifacts_dir)
 
 if __name__ == "__main__":
     args = _parse_args()
@@ -120,6 +284,7 @@ if __name__ == "__main__":
     if args.data_dir: overrides["data_dir"] = args.data_dir
     if args.test_labels: overrides["test_labels_file"] = args.test_labels
     if args.artifacts: overrides["artifacts_dir"] = args.artifacts
+    if args.early_exit: overrides["early_exit"] = True
     if overrides:
         config.apply_overrides(**overrides)
     predict()
\ No newline at end of file
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: preprocess
+=================
+Gemeinsame Vorverarbeitung (Median-Imputation + Standardisierung) für Training und
+Hyperparameter-Suche. Imputer und Scaler hängen nur von den Trainingszeilen eines
+Folds ab, nicht vom Modell oder der Parameterkombination – daher werden die
+vorverarbeiteten Matrizen einmal pro Fold berechnet und von allen Schätzern geteilt.
+
+Für die Vorhersage wird trotzdem eine vollständige Pipeline (imputer, scaler, clf)
+gespeichert, damit model_*.joblib eigenständig bleibt.
+
+Hauptfunktionen:
+    fit_preprocessing()  - Fittet Imputer + Scaler auf X, liefert (Pipeline, X_transformiert)
+    preprocess_folds()   - Vorverarbeitete Train/Test-Matrizen pro CV-Fold (siehe FoldPlan.preprocessed)
+    assemble_pipeline()  - Baut aus gefitteter Vorverarbeitung und Klassifikator die finale Pipeline
+"""
+from typing import NamedTuple
+
+import numpy as np
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import StandardScaler
+from sklearn.pipeline import Pipeline
+
+
+class PreprocessedFold(NamedTuple):
+    """Ein CV-Fold mit vorverarbeiteten Matrizen (Imputer/Scaler auf den Trainingszeilen gefittet)."""
+    train_idx: np.ndarray
+    test_idx: np.ndarray
+    X_train: np.ndarray
+    y_train: np.ndarray
+    X_test: np.ndarray
+    y_test: np.ndarray
+    groups_test: np.ndarray
+
+
+def _make_preprocessing() -> Pipeline:
+    """Vorverarbeitungs-Schritte, identisch zu den ersten Schritten der Modell-Pipeline."""
+    return Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler())])
+
+
+def fit_preprocessing(X):
+    """
+    Fittet Imputer und Scaler auf X.
+
+    Args:
+        X: Feature-DataFrame
+
+    Returns:
+        (pre, Xt) – gefittete Vorverarbeitungs-Pipeline und transformierte Matrix
+    """
+    pre = _make_preprocessing()
+    Xt = pre.fit_transform(X)
+    return pre, Xt
+
+
+def preprocess_folds(X, y, groups, folds) -> list[PreprocessedFold]:
+    """
+    Berechnet die vorverarbeiteten Matrizen pro Fold (einmal, für alle Modelle und Kombinationen).
+    Die Rohzeilen eines Folds werden nur für die Transformation geschnitten.
+
+    Args:
+        X: Feature-Matrix (NumPy)
+        y: Labels (parallel zu X)
+        groups: Recording-IDs (parallel zu X)
+        folds: Folds eines FoldPlan (folds.py) mit train_idx/test_idx
+
+    Returns:
+        Liste von PreprocessedFold in Fold-Reihenfolge
+    """
+    out = []
+    for f in folds:
+        tr, te = f.train_idx, f.test_idx
+        pre, X_train = fit_preprocessing(X[tr])
+        out.append(PreprocessedFold(tr, te, X_train, y[tr], pre.transform(X[te]), y[te], groups[te]))
+    return out
+
+
+def assemble_pipeline(pre: Pipeline, clf) -> Pipeline:
+    """Kombiniert gefittete Vorverarbeitung und gefitteten Klassifikator zur eigenständigen Pipeline."""
+    return Pipeline(list(pre.steps) + [("clf", clf)])
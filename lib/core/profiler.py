@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: profiler
+===============
+Laufzeit- und Speicherprofil der Pipeline. Die Hauptstufen (load_labels, load_csv,
+find_windows, build_window_data, Featuretools, TSFresh, jeder Fold-Fit, predict_proba,
+jede Grafik) sind mit stage() bzw. @profiled markiert. Während eines Laufs mit aktivem
+Profiling (cfg.profile bzw. config.PROFILE oder Umgebungsvariable DRIVEIDENT_PROFILE) werden pro Stufe
+Aufrufe, Gesamt- und Maximaldauer, tracemalloc-Spitze und RSS-Höchststand gesammelt und
+am Ende in artifacts_dir/profile.json geschrieben – ein Eintrag pro Lauf-Art ("train",
+"predict"), bei "print" zusätzlich als Tabelle.
+
+Ohne aktiven Lauf kosten die Markierungen nur eine Abfrage einer globalen Variable.
+tracemalloc verlangsamt speicherintensive Stufen merklich – Zeiten eines Profil-Laufs
+sind deshalb nur untereinander vergleichbar.
+
+- PROFILE_MODES: "off" | "file" | "print"
+- profile_run(): Dekorator für train()/predict() – ein Lauf pro Aufruf
+- stage(): Kontextmanager für einen Abschnitt, profiled(): Dekorator für Funktionen
+"""
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from . import config
+from .cache import load_json, save_json
+
+try:
+    import resource  # Nur Unix; unter Windows ohne RSS-Höchststand
+except ImportError:
+    resource = None
+
+PROFILE_MODES = ("off", "file", "print")
+ENV_VAR = "DRIVEIDENT_PROFILE"
+
+_run = None               # Aktiver Lauf (_Run) oder None
+_lock = threading.Lock()
+
+
+def _mode(cfg: config.RunConfig | None = None) -> str:
+    """Profil-Modus: Umgebungsvariable vor cfg.profile bzw. config.PROFILE ("1"/"true" = "file")."""
+    env = os.environ.get(ENV_VAR, "").strip().lower()
+    if env:
+        return {"1": "file", "true": "file", "0": "off", "false": "off"}.get(env, env)
+    return config.resolve(cfg).profile
+
+
+def _rss_peak_mb() -> float | None:
+    """Höchststand des residenten Speichers des Prozesses (MB) oder None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # macOS: Bytes, Linux: KB
+
+
+class _Run:
+    """Gesammelte Stufen eines Laufs. Speicherspitzen nur im Thread, der den Lauf gestartet hat."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.thread = threading.get_ident()
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self.t0 = time.perf_counter()
+        self.stats = {}    # Name -> {"calls", "total_sec", "max_sec", "mem_peak_mb", "rss_peak_mb"}
+        self.stack = [0]   # Gesicherte Speicherspitze je offener Stufe des Lauf-Threads (unten: der Lauf)
+        self.own_tracing = not tracemalloc.is_tracing()
+        if self.own_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    def record(self, name: str, sec: float, mem_peak: int | None) -> None:
+        with _lock:
+            s = self.stats.setdefault(name, {"calls": 0, "total_sec": 0.0, "max_sec": 0.0, "mem_peak_mb": None, "rss_peak_mb": None})
+            s["calls"] += 1
+            s["total_sec"] += sec
+            s["max_sec"] = max(s["max_sec"], sec)
+            if mem_peak is not None:
+                s["mem_peak_mb"] = max(s["mem_peak_mb"] or 0.0, round(mem_peak / 2**20, 1))
+            s["rss_peak_mb"] = _rss_peak_mb()
+
+    def finish(self) -> dict:
+        peak = max(self.stack[0], tracemalloc.get_traced_memory()[1])
+        if self.own_tracing:
+            tracemalloc.stop()
+        total = time.perf_counter() - self.t0
+        stages = [{"name": n, **{k: (round(v, 4) if k.endswith("_sec") else v) for k, v in s.items()}}
+                  for n, s in sorted(self.stats.items(), key=lambda kv: -kv[1]["total_sec"])]
+        return {"run": self.label, "started": self.started, "total_sec": round(total, 3),
+                "mem_peak_mb": round(peak / 2**20, 1), "rss_peak_mb": _rss_peak_mb(), "stages": stages}
+
+
+@contextmanager
+def stage(name: str):
+    """Misst einen Abschnitt als Stufe name (ohne aktiven Lauf: keine Wirkung)."""
+    run = _run
+    if run is None:
+        yield
+        return
+    main = threading.get_ident() == run.thread
+    if main:
+        # Bisherige Spitze der Elternstufe sichern, dann für diese Stufe neu messen
+        run.stack[-1] = max(run.stack[-1], tracemalloc.get_traced_memory()[1])
+        run.stack.append(0)
+        tracemalloc.reset_peak()
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        sec = time.perf_counter() - t
+        peak = None
+        if main:
+            peak = max(run.stack.pop(), tracemalloc.get_traced_memory()[1])
+            run.stack[-1] = max(run.stack[-1], peak)
+        run.record(name, sec, peak)
+
+
+def profiled(name: str | None = None):
+    """Dekorator: jeder Aufruf der Funktion ist eine Stufe (Standardname: Funktionsname)."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _run is None:
+                return fn(*args, **kwargs)
+            with stage(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def print_summary(profile: dict) -> None:
+    """Gibt ein Profil als Tabelle aus (Stufen nach Gesamtdauer sortiert)."""
+    total = profile["total_sec"] or 1.0
+    print(f"\nProfil {profile['run']}: {profile['total_sec']:.2f} s, tracemalloc-Spitze {profile['mem_peak_mb']} MB, RSS-Höchststand {profile['rss_peak_mb']} MB")
+    print(f"{'Stufe':<36} {'Aufrufe':>8} {'Summe s':>9} {'Anteil':>7} {'Max s':>8} {'Spitze MB':>10}")
+    for s in profile["stages"]:
+        mem = "" if s["mem_peak_mb"] is None else f"{s['mem_peak_mb']:.1f}"
+        print(f"{s['name']:<36} {s['calls']:>8} {s['total_sec']:>9.3f} {s['total_sec'] / total:>7.1%} {s['max_sec']:>8.3f} {mem:>10}")
+
+
+def profile_run(label: str):
+    """
+    Dekorator für train()/predict(): Bei aktivem Profiling wird der Aufruf als Lauf label
+    gemessen und das Profil unter dem Schlüssel label in artifacts_dir/profile.json
+    geschrieben (auch bei Fehlern).
+    Modus und artifacts_dir werden aus den Argumenten cfg bzw. artifacts_dir gelesen,
+    sonst aus der globalen Konfiguration.
+    """
+    def deco(fn):
+        sig = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global _run
+            bound = sig.bind_partial(*args, **kwargs).arguments
+            cfg = config.resolve(bound.get("cfg"))
+            mode = _mode(cfg)
+            if mode not in PROFILE_MODES:
+                raise ValueError(f"Unbekannter Profil-Modus: {mode} (erlaubt: {', '.join(PROFILE_MODES)})")
+            if mode == "off" or _run is not None:
+                return fn(*args, **kwargs)
+            artifacts_dir = bound.get("artifacts_dir") or cfg.artifacts_dir
+            _run = _Run(label)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                run, _run = _run, None
+                profile = run.finish()
+                # Ein Eintrag pro Lauf-Art: predict() überschreibt nicht das Profil von train()
+                path = Path(artifacts_dir) / "profile.json"
+                profiles = load_json(path) or {}
+                profiles[label] = profile
+                save_json(path, profiles)
+                if mode == "print":
+                    print_summary(profile)
+        return wrapper
+    return deco
@@ -6,13 +6,143 @@ Schreibt pipeline_progress.json für Frontend-Polling. Das Frontend kann die Dat
 periodisch lesen, um den Pipeline-Fortschritt anzuzeigen (Phase, abgeschlossene/laufende
 Schritte, Prozent). Optional wird ein callback aufgerufen.
 
-Phasen: starting, extraction, training, prediction, done
+Phasen: starting, extraction, training, prediction, done, cancelled
+
+write_progress() blockiert nicht: Ereignisse landen in einer thread-sicheren Queue und
+werden von einem Hintergrund-Thread an die Abonnenten verteilt. Pro Ausgabe-Ordner zählt
+nur der jeweils neueste Stand (Zusammenfassen), und jeder Abonnent wird höchstens in
+seinem Intervall bedient:
+- Datei: pipeline_progress.json, atomar geschrieben (Temp-Datei + Rename), FILE_INTERVAL
+- Callback: z.B. ProgressPopup.updateProgress, CALLBACK_INTERVAL
+- weitere Abonnenten über subscribe() (z.B. log_subscriber), CALLBACK_INTERVAL
+Phasenwechsel werden sofort zugestellt; bei phase "done" und "cancelled" wartet
+write_progress(), bis alles zugestellt ist. Feingranularer Fortschritt (pro Recording,
+pro Fold) kostet damit weder Datei-I/O noch GUI-Aktualisierungen.
+
+ProgressStage meldet Fortschritt innerhalb einer Phase in Einheiten (Recordings, Folds,
+Bewertungen) und schätzt die Restzeit aus dem gemessenen Durchsatz (Einheiten pro Sekunde).
 """
 
-import json
+import queue
+import threading
+import time
 from pathlib import Path
 from typing import Callable
 
+from .cache import save_json
+
+FILE_INTERVAL = 0.5       # Sekunden zwischen zwei Schreibvorgängen von pipeline_progress.json
+CALLBACK_INTERVAL = 0.1   # Sekunden zwischen zwei Aufrufen von Callback und Abonnenten
+
+_events = queue.Queue()
+_subscribers = []         # Globale Abonnenten: fn(data: dict)
+_lock = threading.Lock()
+_thread = None
+
+
+class _Channel:
+    """Neuester Stand und Zustellzeitpunkte pro Ausgabe-Ordner."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.data = None
+        self.callback = None
+        self.phase = None
+        self.file_due = self.notify_due = False
+        self.file_at = self.notify_at = 0.0
+
+
+def subscribe(fn: Callable[[dict], None]) -> Callable[[dict], None]:
+    """Registriert einen Abonnenten, der jeden zugestellten Fortschritts-Stand (Dict wie in der Datei) erhält."""
+    with _lock:
+        _subscribers.append(fn)
+    return fn
+
+
+def unsubscribe(fn: Callable[[dict], None]) -> None:
+    """Entfernt einen mit subscribe() registrierten Abonnenten."""
+    with _lock:
+        if fn in _subscribers:
+            _subscribers.remove(fn)
+
+
+def log_subscriber(data: dict) -> None:
+    """Abonnent für Konsolen-Logs: eine Zeile pro zugestelltem Stand."""
+    print(f"[{data['phase']}] {data['percent']:.0f}% {data['message']}")
+
+
+def _deliver(ch: _Channel, now: float, force: bool = False) -> None:
+    if ch.file_due and (force or now - ch.file_at >= FILE_INTERVAL):
+        save_json(ch.path, ch.data)  # Kein Abbruch bei Schreibfehlern (z.B. Ordner nicht beschreibbar)
+        ch.file_due, ch.file_at = False, now
+    if ch.notify_due and (force or now - ch.notify_at >= CALLBACK_INTERVAL):
+        ch.notify_due, ch.notify_at = False, now
+        d = ch.data
+        with _lock:
+            subs = list(_subscribers)
+        if ch.callback is not None:
+            subs.insert(0, lambda d: ch.callback(d["phase"], d["total"], d["completed"], d["in_progress"], d["message"], d["remaining"], d["percent"]))
+        for fn in subs:
+            try:
+                fn(d)
+            except Exception as e:
+                print(f"Fortschritts-Abonnent fehlgeschlagen: {repr(e)}")
+
+
+def _next_due(channels: dict, now: float) -> float | None:
+    """Wartezeit bis zur nächsten fälligen Zustellung (None = nichts ausstehend)."""
+    waits = []
+    for ch in channels.values():
+        if ch.file_due:
+            waits.append(ch.file_at + FILE_INTERVAL - now)
+        if ch.notify_due:
+            waits.append(ch.notify_at + CALLBACK_INTERVAL - now)
+    return max(0.0, min(waits)) if waits else None
+
+
+def _dispatch() -> None:
+    channels = {}
+    while True:
+        now = time.monotonic()
+        try:
+            ev = _events.get(timeout=_next_due(channels, now))
+        except queue.Empty:
+            ev = None
+        now = time.monotonic()
+        if ev is None:
+            for ch in channels.values():
+                _deliver(ch, now)
+            continue
+        kind, payload = ev
+        if kind == "flush":
+            for ch in channels.values():
+                _deliver(ch, now, force=True)
+            payload.set()
+            continue
+        path, data, callback = payload
+        ch = channels.setdefault(path, _Channel(path))
+        urgent = data["phase"] != ch.phase
+        ch.data, ch.callback, ch.phase = data, callback, data["phase"]
+        ch.file_due = ch.notify_due = True
+        _deliver(ch, now, force=urgent)
+
+
+def _ensure_dispatcher() -> None:
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_dispatch, name="progress-bus", daemon=True)
+            _thread.start()
+
+
+def flush_progress(timeout: float | None = None) -> bool:
+    """Stellt alle ausstehenden Stände sofort zu und wartet darauf. False bei Timeout."""
+    _ensure_dispatcher()
+    done = threading.Event()
+    _events.put(("flush", done))
+    return done.wait(timeout)
+
+
 def write_progress(
     out_dir: Path,
     phase: str,
@@ -20,24 +150,32 @@ def write_progress(
     completed: list | None = None,
     in_progress: list | None = None,
     message: str | None = None,
-    callback: Callable[[str, int, list[str], list[str], str | None , int, float], None] | None = None
+    callback: Callable[[str, int, list[str], list[str], str | None , int, float], None] | None = None,
+    done: float | None = None,
+    unit: str | None = None,
+    rate: float | None = None,
+    eta_sec: float | None = None,
 ) -> None:
     """
-    Schreibt Fortschritt in pipeline_progress.json für Frontend-Anzeige.
+    Meldet Fortschritt für pipeline_progress.json und callback (asynchron, zusammengefasst).
 
     Args:
         out_dir: Ausgabe-Ordner (z.B. artifacts_dir)
-        phase: "starting" | "extraction" | "training" | "prediction" | "done"
+        phase: "starting" | "extraction" | "training" | "prediction" | "done" | "cancelled"
         total: Gesamtanzahl Schritte (z.B. Anzahl Modelle)
         completed: Liste abgeschlossener Schritte (z.B. ["randomforest", "logreg"])
         in_progress: Liste laufender Schritte (z.B. ["logreg"])
         message: Anzeige-Text für den Nutzer
+        callback: Wird im Thread des Fortschritts-Busses aufgerufen (GUI muss in den Tk-Thread wechseln)
+        done: Erledigte Einheiten von total (optional, sonst len(completed))
+        unit: Bezeichnung der Einheiten (z.B. "Recordings", "Folds")
+        rate: Gemessener Durchsatz in Einheiten pro Sekunde
+        eta_sec: Geschätzte Restzeit der Phase in Sekunden
     """
-    path = out_dir / "pipeline_progress.json"
-    completed_list = completed or []
-    in_progress_list = in_progress or []
-    n_completed = len(completed_list)
-    remaining = max(0, total - n_completed - len(in_progress_list))
+    completed_list = list(completed or [])
+    in_progress_list = list(in_progress or [])
+    n_completed = len(completed_list) if done is None else done
+    remaining = max(0, total - n_completed - len(in_progress_list)) if done is None else max(0, round(total - done))
 
     if total > 0:
         percent = min(100.0, round(n_completed / total * 100.0, 1))
@@ -54,12 +192,55 @@ def write_progress(
         "message": message or "",
         "remaining": remaining,
         "percent": percent,
+        "done": done,
+        "unit": unit,
+        "rate": rate,
+        "eta_sec": eta_sec,
     }
-    try:
-        out_dir.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
-    except Exception:
-        pass  # Kein Abbruch bei Schreibfehlern (z.B. Ordner nicht beschreibbar)
-
-    if callback is not None:
-        callback(phase, total, completed_list, in_progress_list, message, remaining, percent)
\ No newline at end of file
+    _ensure_dispatcher()
+    _events.put(("event", (Path(out_dir) / "pipeline_progress.json", data, callback)))
+    if phase in ("done", "cancelled"):
+        flush_progress()  # Endstand liegt vor, wenn train()/predict() zurückkehren
+
+
+def format_eta(seconds: float) -> str:
+    """Restzeit als "m:ss" bzw. "h:mm:ss"."""
+    m, sec = divmod(int(round(seconds)), 60)
+    h, m = divmod(m, 60)
+    return f"{h}:{m:02d}:{sec:02d}" if h else f"{m}:{sec:02d}"
+
+
+class ProgressStage:
+    """
+    Fortschritt innerhalb einer Phase in Einheiten (z.B. Recordings, Folds). Die Restzeit
+    wird aus dem Durchsatz seit Beginn der Stufe geschätzt (erledigte Einheiten / Sekunden).
+
+    Args:
+        out_dir: Ausgabe-Ordner (z.B. artifacts_dir)
+        phase: Phase wie in write_progress
+        total: Anzahl Einheiten der Stufe
+        unit: Bezeichnung der Einheiten für Anzeige und Datei
+        callback: Fortschritts-Callback wie in write_progress
+    """
+
+    def __init__(self, out_dir: Path, phase: str, total: int, unit: str, callback: Callable | None = None):
+        self.out_dir, self.phase, self.total, self.unit, self.callback = out_dir, phase, total, unit, callback
+        self.done = 0.0
+        self.start = time.monotonic()
+
+    def update(self, done: float, message: str, completed: list | None = None, in_progress: list | None = None) -> None:
+        """Meldet den Stand done (erledigte Einheiten, auch Bruchteile) mit Anzeige-Text."""
+        self.done = min(float(done), float(self.total))
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed if self.done > 0 and elapsed > 0 else None
+        eta = (self.total - self.done) / rate if rate else None
+        text = f"{message} – {self.done:.0f}/{self.total} {self.unit}"
+        if eta is not None:
+            text += f", noch ca. {format_eta(eta)}"
+        write_progress(self.out_dir, self.phase, total=self.total, completed=completed, in_progress=in_progress,
+                       message=text, callback=self.callback, done=round(self.done, 2), unit=self.unit,
+                       rate=round(rate, 3) if rate else None, eta_sec=round(eta, 1) if eta is not None else None)
+
+    def advance(self, n: float = 1, message: str = "", completed: list | None = None, in_progress: list | None = None) -> None:
+        """Erhöht den Stand um n Einheiten."""
+        self.update(self.done + n, message, completed, in_progress)
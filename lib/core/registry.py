@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: registry
+===============
+In-Process-Registry für trainierte Modelle. Jedes model_*.joblib wird nur einmal
+deserialisiert und in einem LRU-Cache gehalten; bei jedem Zugriff wird über
+Änderungszeit und Größe der Datei geprüft, ob der Eintrag noch aktuell ist.
+train, predict und Plots teilen sich so die geladenen Pipelines, feat_cols und
+FEATURE_SET – wiederholte Vorhersagen aus dem GUI zahlen keine Ladezeit mehr.
+
+Artefakte eines Modells:
+    model_<name>.joblib  - Pipeline, feat_cols, FEATURE_SET (komprimiert)
+    model_<name>.json    - Metadaten: Feature-Liste, Feature-Set, Klassen, Fensterparameter,
+                           Fingerprint der Trainingsdaten – lesbar ohne Unpickling
+    model_<name>_arrays/ - NumPy-Export für mmap (siehe compiled.py)
+
+Hauptfunktionen:
+    model_path()   - Pfad des Artefakts für ein Modell
+    meta_path()    - Pfad der Metadaten-Datei
+    save_model()   - Speichert Pipeline + Metadaten und registriert das Modell
+    get_metadata() - Metadaten ohne Laden der Pipeline
+    get_model()    - Liefert ModelArtifact (pipe, feat_cols, feature_set) aus Cache oder Datei
+    get_models()   - get_model() für mehrere Modelle
+    get_compiled() - NumPy-Export (per mmap) aus Cache oder Datei
+    get_estimator() - NumPy-Export, falls vorhanden, sonst die sklearn-Pipeline
+    put_model()    - Registriert ein gerade gespeichertes Modell ohne erneutes Laden
+    clear()        - Leert den Cache
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import NamedTuple
+
+import joblib
+
+from .compiled import CompiledModel, compiled_path, load_compiled
+
+MAX_CACHED_MODELS = 8  # LRU-Kapazität (Anzahl Artefakte im Speicher)
+FORMAT_VERSION = 2     # Version des Artefakt-Formats (model_*.json)
+COMPRESS = 3           # zlib-Stufe für model_*.joblib
+
+_cache: "OrderedDict[str, tuple[tuple[int, int], ModelArtifact | CompiledModel]]" = OrderedDict()
+_lock = threading.Lock()
+
+
+class ModelArtifact(NamedTuple):
+    """Inhalt eines model_*.joblib: Pipeline, Feature-Spalten und Feature-Set des Trainings."""
+    pipe: object
+    feat_cols: list
+    feature_set: str
+
+
+def model_path(artifacts_dir, model_name: str) -> Path:
+    """Pfad des gespeicherten Modells im artifacts-Ordner."""
+    return Path(artifacts_dir) / f"model_{model_name}.joblib"
+
+
+def meta_path(artifacts_dir, model_name: str) -> Path:
+    """Pfad der Metadaten-Datei (JSON) eines Modells."""
+    return Path(artifacts_dir) / f"model_{model_name}.json"
+
+
+def _stamp(path: Path) -> tuple[int, int]:
+    """Änderungszeit (ns) und Größe – ändert sich, sobald die Datei neu geschrieben wird."""
+    st = path.stat()
+    return st.st_mtime_ns, st.st_size
+
+
+def _store(key: str, stamp, artifact: ModelArtifact) -> None:
+    with _lock:
+        _cache[key] = (stamp, artifact)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_MODELS:
+            _cache.popitem(last=False)
+
+
+def get_model(artifacts_dir, model_name: str) -> ModelArtifact:
+    """
+    Liefert das Modell aus dem Cache oder lädt es (einmal) von der Festplatte.
+
+    Args:
+        artifacts_dir: Ordner mit model_*.joblib
+        model_name: z.B. "randomforest"
+
+    Returns:
+        ModelArtifact(pipe, feat_cols, feature_set)
+    """
+    path = model_path(artifacts_dir, model_name)
+    key = str(path.resolve())
+    stamp = _stamp(path)  # FileNotFoundError, wenn das Modell nicht trainiert wurde
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _cache.move_to_end(key)
+            return hit[1]
+    artifact = ModelArtifact(*joblib.load(path))
+    _store(key, stamp, artifact)
+    return artifact
+
+
+def get_models(artifacts_dir, model_names) -> dict[str, ModelArtifact]:
+    """get_model() für mehrere Modelle, Reihenfolge wie model_names."""
+    return {m: get_model(artifacts_dir, m) for m in model_names}
+
+
+def _write_atomic(path: Path, mode: str, write) -> None:
+    """
+    Schreibt über eine eindeutige Temp-Datei + os.replace nach path: gleichzeitige Läufe
+    im selben Prozess überschreiben sich nicht gegenseitig die Temp-Datei.
+    """
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(mode, encoding="utf-8" if "b" not in mode else None, dir=path.parent,
+                                         prefix=f"{path.name}.", suffix=".tmp", delete=False) as f:
+            tmp = Path(f.name)
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if tmp is not None:
+            tmp.unlink(missing_ok=True)
+        raise
+
+
+def save_model(artifacts_dir, model_name: str, artifact: ModelArtifact, meta: dict | None = None, register: bool = True) -> dict:
+    """
+    Speichert ein Modell: komprimiertes model_*.joblib und model_*.json mit Metadaten.
+    feat_cols, feature_set und Klassen werden aus dem Artefakt übernommen, meta ergänzt
+    weitere Einträge (z.B. Fensterparameter, Fingerprint der Trainingsdaten).
+    Mit register=False wird das Modell nicht registriert – z.B. in einem Staging-Ordner,
+    dessen Dateien erst später an ihren Platz kommen (dann put_model() mit dem Zielordner).
+
+    Returns:
+        Geschriebene Metadaten
+    """
+    artifact = ModelArtifact(*artifact)
+    _write_atomic(model_path(artifacts_dir, model_name), "wb", lambda f: joblib.dump(tuple(artifact), f, compress=COMPRESS))
+    data = {"format": FORMAT_VERSION, "model": model_name,
+            "estimator": type(artifact.pipe.named_steps["clf"]).__name__,
+            "classes": [str(c) for c in artifact.pipe.named_steps["clf"].classes_],
+            "feature_set": artifact.feature_set, "feat_cols": list(artifact.feat_cols)}
+    data.update(meta or {})
+    _write_atomic(meta_path(artifacts_dir, model_name), "w", lambda f: json.dump(data, f, indent=2, ensure_ascii=False))
+    if register:
+        put_model(artifacts_dir, model_name, artifact)
+    return data
+
+
+def get_metadata(artifacts_dir, model_name: str) -> dict:
+    """
+    Metadaten eines Modells aus model_*.json, ohne die Pipeline zu laden. Für Artefakte
+    ohne JSON (ältere Trainingsläufe) werden feat_cols, feature_set und Klassen aus dem
+    geladenen Modell abgeleitet.
+    """
+    path = meta_path(artifacts_dir, model_name)
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    art = get_model(artifacts_dir, model_name)
+    return {"model": model_name, "estimator": type(art.pipe.named_steps["clf"]).__name__,
+            "classes": [str(c) for c in art.pipe.named_steps["clf"].classes_],
+            "feature_set": art.feature_set, "feat_cols": list(art.feat_cols)}
+
+
+def get_compiled(artifacts_dir, model_name: str) -> CompiledModel:
+    """
+    NumPy-Export eines Modells (model_*_arrays/, per mmap eingeblendet) aus Cache oder Datei.
+    Die Arrays liegen nur einmal im Page-Cache, auch wenn mehrere Prozesse sie laden.
+    """
+    path = compiled_path(artifacts_dir, model_name)
+    key = str(path.resolve())
+    stamp = _stamp(path / "kind.npy")
+    with _lock:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == stamp:
+            _cache.move_to_end(key)
+            return hit[1]
+    model = load_compiled(path)
+    _store(key, stamp, model)
+    return model
+
+
+def get_estimator(artifacts_dir, model_name: str):
+    """
+    Schätzer für die Vorhersage: der NumPy-Export (bitgleich zu sklearn, ohne Aufruf-Overhead
+    von sklearn/pandas) oder – für Artefakte ohne Export – die sklearn-Pipeline.
+
+    Returns:
+        (estimator, classes, compiled) – bei compiled=True erwartet predict_proba eine
+        NumPy-Matrix in feat_cols-Reihenfolge, sonst einen DataFrame mit feat_cols
+    """
+    if compiled_path(artifacts_dir, model_name).exists():
+        est = get_compiled(artifacts_dir, model_name)
+        return est, list(est.classes_), True
+    pipe = get_model(artifacts_dir, model_name).pipe
+    return pipe, list(pipe.named_steps["clf"].classes_), False
+
+
+def put_model(artifacts_dir, model_name: str, artifact: ModelArtifact) -> None:
+    """Registriert ein gerade nach model_path() gespeichertes Modell, damit es nicht neu geladen wird."""
+    path = model_path(artifacts_dir, model_name)
+    _store(str(path.resolve()), _stamp(path), ModelArtifact(*artifact))
+
+
+def clear() -> None:
+    """Leert den Cache (z.B. nach dem Löschen des artifacts-Ordners)."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: server
+=============
+Langlebiger Vorhersage-Dienst über localhost-HTTP. Der Prozess importiert
+Featuretools/TSFresh/sklearn einmal und hält die Modelle über die Registry im
+Speicher, sodass eine Vorhersage weder Interpreter-Start noch Deserialisierung zahlt.
+
+Gleichzeitig eintreffende Anfragen werden gesammelt (Micro-Batching, BATCH_WINDOW_MS):
+alle Recordings eines Batches durchlaufen gemeinsam eine Feature-Extraktion und pro
+Modell einen predict_proba-Aufruf; danach werden die Ergebnisse wieder auf die
+einzelnen Anfragen verteilt. Scheitert der gemeinsame Durchlauf, werden die Anfragen
+einzeln wiederholt; nur die fehlerhafte Anfrage erhält einen Fehler. Das
+Ergebnisformat entspricht backend_adapter.predict: {Modell: [{recording, soll, ist, korrekt}, ...]}.
+
+Endpunkte:
+    GET  /health   - {"ok": true, "models": [...]}
+    POST /predict  - {"recordings": [...], "labels": [...]} -> {"ok": true, "ergebnisse": {...}}
+                     Ein Recording ist ein CSV-Pfad oder ein Dict mit "name" und den
+                     Arrays t, steer, gas, brake, speed, yaw_rate. labels ist optional.
+
+CLI: python -m DriveIdent.lib.core.server [--host HOST] [--port PORT] [--artifacts DIR] [--config PATH]
+"""
+import argparse
+import json
+import queue
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+
+from . import config
+from .aggregate import aggregate_recordings
+from .data import find_windows, load_recording
+from .features import extract_features
+from .registry import get_metadata, get_models
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW_MS = 50  # Wartezeit nach der ersten Anfrage, um weitere in denselben Batch aufzunehmen
+MAX_BATCH = 32        # Max. Anzahl Anfragen pro Batch
+
+
+def _py(v):
+    """NumPy-Skalare in JSON-taugliche Python-Werte umwandeln."""
+    return v.item() if isinstance(v, np.generic) else v
+
+
+class PredictionService:
+    """
+    Hält die Modelle warm und bündelt Anfragen zu Batches.
+
+    Args:
+        artifacts_dir: Ordner mit trainierten Modellen (optional, sonst cfg.artifacts_dir)
+        models: Zu verwendende Modelle (optional, sonst cfg.models)
+        batch_window_ms: Sammelzeit pro Batch in Millisekunden
+        max_batch: Max. Anzahl Anfragen pro Batch
+        cfg: RunConfig für Fensterparameter und Standardwerte (optional, sonst aktuelle globale Konfiguration)
+    """
+
+    def __init__(self, artifacts_dir=None, models=None, batch_window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH, cfg=None):
+        cfg = config.resolve(cfg)
+        self.artifacts_dir = Path(artifacts_dir or cfg.artifacts_dir)
+        self.models = list(models or cfg.models)
+        self.cfg = cfg.replace(artifacts_dir=self.artifacts_dir, models=tuple(self.models))
+        self.batch_window_ms = batch_window_ms
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+        get_models(self.artifacts_dir, self.models)  # Modelle vorab laden (Fehler sofort beim Start)
+
+    def start(self):
+        """Startet den Batch-Thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Beendet den Batch-Thread, nachdem alle bereits eingereihten Anfragen bearbeitet sind."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, recordings, labels=None) -> Future:
+        """
+        Reiht eine Anfrage ein. Recordings werden bereits im aufrufenden Thread geladen,
+        damit fehlerhafte Eingaben nur diese Anfrage betreffen.
+
+        Returns:
+            Future mit dem Ergebnis-Dict {Modell: [{recording, soll, ist, korrekt}]}
+        """
+        recs = [load_recording(r) for r in recordings]
+        labels = list(labels) if labels is not None else [""] * len(recs)
+        if len(labels) != len(recs):
+            raise ValueError("labels muss dieselbe Länge wie recordings haben.")
+        fut = Future()
+        self._queue.put((recs, labels, fut))
+        return fut
+
+    def predict(self, recordings, labels=None, timeout=None) -> dict:
+        """submit() und auf das Ergebnis warten."""
+        return self.submit(recordings, labels).result(timeout)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            jobs = [job]
+            wait = self.batch_window_ms / 1000.0
+            stop = False
+            while len(jobs) < self.max_batch:
+                try:
+                    job = self._queue.get(timeout=wait)
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                jobs.append(job)
+                wait = 0.005  # Nach dem ersten Nachzügler nur noch bereits wartende Anfragen einsammeln
+            jobs = [j for j in jobs if j[2].set_running_or_notify_cancel()]
+            for (_, _, fut), res in zip(jobs, self._process(jobs)):
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+            if stop:
+                return
+
+    def _process(self, jobs) -> list:
+        """
+        Vorhersage für alle Anfragen des Batches. Schlägt der gemeinsame Durchlauf fehl,
+        werden die Anfragen einzeln wiederholt (wie batch._predict_chunk), sodass nur die
+        fehlerhafte Anfrage scheitert.
+
+        Returns:
+            Liste mit einem Ergebnis-Dict pro Anfrage bzw. deren Exception
+        """
+        if len(jobs) > 1:
+            try:
+                return self._predict_jobs(jobs)
+            except Exception:
+                pass  # Eine fehlerhafte Anfrage soll nicht den ganzen Batch verwerfen: einzeln wiederholen
+        results = []
+        for job in jobs:
+            try:
+                results.extend(self._predict_jobs([job]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _predict_jobs(self, jobs) -> list:
+        """Eine Feature-Extraktion und ein predict_proba pro Modell für alle übergebenen Anfragen."""
+        arts = get_models(self.artifacts_dir, self.models)  # validiert über mtime – neu trainierte Modelle werden übernommen
+        first = get_metadata(self.artifacts_dir, self.models[0])
+        results = [{mdl: [] for mdl in self.models} for _ in jobs]
+
+        # Eindeutige Schlüssel "Anfrage/Position", da Namen über Anfragen hinweg kollidieren können
+        recs, ids, owner = [], [], {}
+        for j, (job_recs, labels, _) in enumerate(jobs):
+            for k, ((name, d), label) in enumerate(zip(job_recs, labels)):
+                if not find_windows(d["t"], cfg=self.cfg):
+                    continue  # Recording ohne gültiges Fenster – wie in predict nicht im Ergebnis
+                key = f"{j}/{k}"
+                recs.append((key, d))
+                ids.append(label)
+                owner[key] = (j, name)
+        if not recs:
+            return results
+
+        feat = extract_features(recs, ids, first["feature_set"], cfg=self.cfg)
+        for c in first["feat_cols"]:
+            if c not in feat.columns: feat[c] = np.nan
+        X = feat[first["feat_cols"]]
+        groups = feat["recording"].values
+        for mdl in self.models:
+            pipe = arts[mdl].pipe
+            proba = pipe.predict_proba(X)
+            votes = aggregate_recordings(proba, groups, list(pipe.named_steps["clf"].classes_))
+            soll = feat["driver_id"].values[votes.first_idx]
+            for key, t, p in zip(votes.recordings, soll, votes.labels):
+                j, name = owner[key]
+                t, p = _py(t), _py(p)
+                results[j][mdl].append({"recording": name, "soll": t, "ist": p, "korrekt": p == t})
+        return results
+
+
+def _make_handler(service: PredictionService):
+    class _Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"ok": True, "models": service.models})
+            else:
+                self._send(404, {"ok": False, "error": f"Unbekannter Pfad: {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send(404, {"ok": False, "error": f"Unbekannter Pfad: {self.path}"})
+                return
+            try:
+                n = int(self.headers.get("Content-Length", 0))
+                req = json.loads(self.rfile.read(n) or b"{}")
+                fut = service.submit(req["recordings"], req.get("labels"))
+            except Exception as e:
+                self._send(400, {"ok": False, "error": str(e)})
+                return
+            try:
+                self._send(200, {"ok": True, "ergebnisse": fut.result()})
+            except Exception as e:
+                self._send(500, {"ok": False, "error": str(e)})
+
+        def log_message(self, format, *args):
+            pass  # Keine Zeile pro Anfrage auf stderr
+
+    return _Handler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, artifacts_dir=None, models=None, cfg=None):
+    """Startet den Dienst und blockiert bis Strg+C."""
+    service = PredictionService(artifacts_dir, models, cfg=cfg).start()
+    httpd = ThreadingHTTPServer((host, port), _make_handler(service))
+    print(f"Vorhersage-Dienst läuft auf http://{host}:{port} (Modelle: {', '.join(service.models)})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        service.stop()
+
+
+def request_predict(recordings, labels=None, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+    """
+    Client für POST /predict. Arrays in Recording-Dicts dürfen NumPy-Arrays sein.
+
+    Returns:
+        (erfolg, fehlermeldung, ergebnisse) – wie backend_adapter.predict
+    """
+    recs = [{k: (np.asarray(v).tolist() if k != "name" else v) for k, v in r.items()} if isinstance(r, dict) else str(r)
+            for r in recordings]
+    payload = {"recordings": recs}
+    if labels is not None:
+        payload["labels"] = [_py(l) for l in labels]
+    req = urllib.request.Request(f"http://{host}:{port}/predict", data=json.dumps(payload).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            res = json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        res = json.loads(e.read() or b"{}")
+    if not res.get("ok"):
+        return False, res.get("error", "Unbekannter Fehler"), {}
+    return True, None, res["ergebnisse"]
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Startet den Vorhersage-Dienst (localhost-HTTP).")
+    p.add_argument("--host", type=str, default=DEFAULT_HOST, help="Adresse (Standard: 127.0.0.1)")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port")
+    p.add_argument("--artifacts", type=str, help="Ordner mit Modellen")
+    p.add_argument("--config", type=str, help="Pfad zu config.json")
+    args = p.parse_args()
+    if args.config:
+        config._load_from_file(args.config)
+    serve(args.host, args.port, cfg=config.current().replace(artifacts_dir=args.artifacts))
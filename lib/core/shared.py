@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: shared
+=============
+Feature-Matrix, Labels und Recording-Gruppen in Shared Memory für Worker-Prozesse.
+Ohne Shared Memory erhält jeder Worker eines ProcessPoolExecutor eine eigene Kopie der
+Daten (initargs werden pro Prozess gepickelt) – der Speicherbedarf wächst mit der Anzahl
+der Worker. SharedDataset legt die Arrays einmal im Elternprozess in
+multiprocessing.shared_memory ab; Worker hängen sich über einen kleinen, picklebaren
+SharedHandle ohne Kopie an (NumPy-Views auf denselben Speicher).
+
+Labels und Gruppen liegen als int32-Codes im Shared Memory, die Klassennamen und
+Recording-IDs (wenige Einträge) reisen im Handle mit.
+
+Aufräumen: Nur der Elternprozess besitzt die Segmente. Der Kontextmanager gibt sie beim
+Verlassen frei (unlink), auch wenn Worker abstürzen oder eine Exception den Pool beendet.
+Endet der Elternprozess selbst unerwartet, entfernt der resource_tracker von
+multiprocessing die verbliebenen Segmente.
+
+- SharedDataset.create(X, y, groups): Kontextmanager im Elternprozess, .handle für die Worker
+- SharedDataset.attach(handle): Ansicht im Worker (X, y, groups ohne Kopie der Matrix)
+"""
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+
+class SharedHandle(NamedTuple):
+    """Picklebare Beschreibung eines SharedDataset: Segmentnamen, Formen, Klassen und Recordings."""
+    X: tuple        # (Segmentname, Form, dtype)
+    y: tuple
+    groups: tuple
+    classes: tuple  # Label pro Code in y
+    recordings: tuple  # Recording-ID pro Code in groups
+
+
+def _to_shm(a: np.ndarray) -> tuple[shared_memory.SharedMemory, tuple]:
+    """Kopiert a in ein neues Segment und liefert (Segment, (Name, Form, dtype))."""
+    a = np.ascontiguousarray(a)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, a.nbytes))
+    np.ndarray(a.shape, a.dtype, buffer=shm.buf)[...] = a
+    return shm, (shm.name, a.shape, a.dtype.str)
+
+
+def _view(shm: shared_memory.SharedMemory, spec: tuple) -> np.ndarray:
+    _, shape, dtype = spec
+    return np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+
+
+class SharedDataset:
+    """
+    Feature-Matrix X (float64), Labels y und Recording-Gruppen groups in Shared Memory.
+    X, y und groups verhalten sich wie die ursprünglichen Arrays; y und groups werden dabei
+    aus den Codes gebildet (kleine Arrays), X ist eine View auf das Segment.
+    """
+
+    def __init__(self, segments, handle: SharedHandle, owner: bool):
+        self._segments = segments
+        self.handle = handle
+        self._owner = owner
+        self.X = _view(segments[0], handle.X)
+        self.y_codes = _view(segments[1], handle.y)
+        self.group_codes = _view(segments[2], handle.groups)
+        self.y = np.asarray(handle.classes, dtype=object)[self.y_codes]
+        self.groups = np.asarray(handle.recordings, dtype=object)[self.group_codes]
+
+    @classmethod
+    def create(cls, X, y, groups) -> "SharedDataset":
+        """Legt X, y und groups im Elternprozess in Shared Memory ab (Besitzer der Segmente)."""
+        y_codes, classes = pd.factorize(np.asarray(y), sort=False)
+        g_codes, recordings = pd.factorize(np.asarray(groups), sort=False)
+        segments, specs = [], []
+        try:
+            for a in (np.asarray(X, dtype=float), y_codes.astype(np.int32), g_codes.astype(np.int32)):
+                shm, spec = _to_shm(a)
+                segments.append(shm)
+                specs.append(spec)
+        except BaseException:
+            for shm in segments:
+                shm.close()
+                shm.unlink()
+            raise
+        handle = SharedHandle(*specs, tuple(classes.tolist()), tuple(recordings.tolist()))
+        return cls(segments, handle, owner=True)
+
+    @classmethod
+    def attach(cls, handle: SharedHandle) -> "SharedDataset":
+        """Hängt sich im Worker an die Segmente eines SharedDataset an (ohne Kopie von X)."""
+        segments = [shared_memory.SharedMemory(name=spec[0]) for spec in (handle.X, handle.y, handle.groups)]
+        return cls(segments, handle, owner=False)
+
+    def close(self) -> None:
+        """Gibt die Views frei und schließt die Segmente; der Besitzer entfernt sie zusätzlich (unlink)."""
+        self.X = self.y_codes = self.group_codes = None
+        for shm in self._segments:
+            try:
+                shm.close()
+            except BufferError:
+                pass  # Noch Views in Benutzung – Segment bleibt bis zum Prozessende gemappt
+            if self._owner:
+                try:
+                    shm.unlink()
+                except FileNotFoundError:
+                    pass
+        self._segments = []
+
+    def __enter__(self) -> "SharedDataset":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
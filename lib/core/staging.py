@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: staging
+==============
+Ausgaben eines Laufs (Modelle, Ergebnisse, Grafiken) entstehen zuerst in einem
+Staging-Ordner innerhalb des Ziels (artifacts/.staging-XXXX) und werden erst nach
+erfolgreichem Ende an ihren Platz verschoben. Bei Abbruch oder Fehler wird nur der
+Staging-Ordner gelöscht: Ein abgebrochenes Training hinterlässt keinen gemischten
+Modellsatz aus alten und neuen Modellen, und Dateien paralleler Läufe werden nicht berührt.
+
+Bestehende Grafiken (plots/) werden per Hardlink in den Staging-Ordner übernommen,
+damit unveränderte Grafiken weiterhin über ihren Fingerprint erkannt und nicht neu
+gerendert werden. Geschrieben wird immer über Temp-Datei + os.replace, die Originale
+bleiben dadurch bis zum Übernehmen unverändert.
+
+- staged_output(out_dir): Kontextmanager, liefert den Staging-Ordner
+- commit_staging(staging, out_dir): Inhalt an seinen Platz verschieben
+- discard_staging(staging): Ausstehende Grafiken verwerfen und Ordner löschen
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from .cache import load_json, save_json
+from .plots import discard_plots, wait_for_plots
+
+STAGING_PREFIX = ".staging-"
+PLOTS_INDEX = Path("plots") / "index.json"  # Fingerprint-Index der Grafiken (plots.py)
+
+
+def make_staging(out_dir: str | Path) -> Path:
+    """Legt einen neuen Staging-Ordner in out_dir an und übernimmt die vorhandenen Grafiken."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=out_dir))
+    plots = out_dir / "plots"
+    if plots.is_dir():
+        for root, _, files in os.walk(plots):
+            dest = staging / Path(root).relative_to(out_dir)
+            dest.mkdir(parents=True, exist_ok=True)
+            for f in files:
+                try:
+                    os.link(Path(root) / f, dest / f)
+                except OSError:
+                    shutil.copy2(Path(root) / f, dest / f)  # Dateisystem ohne Hardlinks
+    return staging
+
+
+def commit_staging(staging: Path, out_dir: str | Path) -> None:
+    """
+    Verschiebt den Inhalt von staging nach out_dir (os.replace pro Datei) und entfernt
+    staging. Unveränderte, per Hardlink übernommene Grafiken bleiben unberührt; im
+    Grafik-Index werden nur die Einträge der neu geschriebenen Dateien übernommen.
+    """
+    out_dir = Path(out_dir)
+    index = load_json(staging / PLOTS_INDEX, {})
+    written = []
+    for root, _, files in os.walk(staging):
+        rel = Path(root).relative_to(staging)
+        dest = out_dir / rel
+        dest.mkdir(parents=True, exist_ok=True)
+        for f in files:
+            src, dst = Path(root) / f, dest / f
+            if rel / f == PLOTS_INDEX or (dst.exists() and os.path.samefile(src, dst)):
+                continue
+            os.replace(src, dst)
+            written.append(rel / f)
+    new = {k: v for k, v in index.items() if Path("plots") / k in written}
+    if new:
+        save_json(out_dir / PLOTS_INDEX, {**load_json(out_dir / PLOTS_INDEX, {}), **new})
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def discard_staging(staging: Path) -> None:
+    """Verwirft ausstehende Grafiken des Laufs und löscht den Staging-Ordner."""
+    discard_plots(out_dir=staging)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+@contextmanager
+def staged_output(out_dir: str | Path):
+    """
+    Kontextmanager für die Ausgaben eines Laufs: liefert den Staging-Ordner, wartet am
+    Ende auf dessen Grafiken und verschiebt alles nach out_dir. Bei einer Exception
+    (auch Cancelled) wird der Staging-Ordner verworfen und die Exception weitergereicht.
+    """
+    staging = make_staging(out_dir)
+    try:
+        yield staging
+        wait_for_plots(out_dir=staging)
+    except BaseException:
+        discard_staging(staging)
+        raise
+    commit_staging(staging, out_dir)
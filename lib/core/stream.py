@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: stream
+=============
+Inkrementelle Fahrererkennung für Live-Telemetrie. StreamingPredictor nimmt Samples
+(t, steer, gas, brake, speed, yaw_rate) einzeln oder blockweise entgegen und legt
+sie in einem vorab allozierten Ring-Puffer ab, der genau ein Fenster (window_sec bei
+max_rate_hz) fasst. Sobald ein Fenster vollständig ist (Fensterende alle step_sec),
+werden die laufenden Summen pro Signal um die hinzugekommenen und herausgefallenen
+Samples fortgeschrieben, die Features mit window_features berechnet (Summe,
+Mittelwert, Streuung und RMS aus den laufenden Summen), jedes Modell liefert
+predict_proba, und die laufenden Recording-Mittelwerte werden aktualisiert. Damit
+steht nach jedem Schritt eine Schätzung bereit; last_latency_ms misst die Kosten
+eines Schritts.
+
+Fenster folgen denselben Regeln wie data.find_windows (Start alle step_sec ab dem
+ersten Sample, Länge window_sec, mindestens min_points Punkte; Werte aus cfg).
+
+Verwendung:
+    sp = StreamingPredictor("artifacts")
+    for sample in telemetry:
+        sp.push(**sample)
+        print(sp.estimate())
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .aggregate import align_proba
+from .registry import get_compiled, get_metadata, get_model
+from .window_features import SIGNALS, Moments, window_features
+
+_CHANNELS = ("t",) + SIGNALS
+MAX_RATE_HZ = 100      # Angenommene maximale Abtastrate; Ring-Puffer = window_sec * max_rate_hz Samples
+RESYNC_WINDOWS = 64    # Laufende Summen nach so vielen Fenstern exakt neu berechnen
+
+
+class _RingBuffer:
+    """
+    Ring-Puffer fester Größe für die Telemetrie-Kanäle (Zeile 0 = t, dann SIGNALS).
+    Samples werden über fortlaufende absolute Indizes adressiert und an Position
+    index % capacity abgelegt; [start, end) ist der gehaltene Bereich. Die Kapazität
+    ist auf ein Fenster bei der maximalen Abtastrate ausgelegt und wird nur verdoppelt,
+    wenn ein Fenster mehr Samples enthält (höhere Abtastrate als angenommen).
+    """
+
+    def __init__(self, capacity: int):
+        self.data = np.empty((len(_CHANNELS), capacity))
+        self.start = 0
+        self.end = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.data.shape[1]
+
+    def free(self) -> int:
+        return self.capacity - (self.end - self.start)
+
+    def append(self, block: np.ndarray) -> None:
+        """Schreibt block (Kanäle x n, n <= free()) hinter das neueste Sample."""
+        n, cap = block.shape[1], self.capacity
+        p = self.end % cap
+        k = min(n, cap - p)
+        self.data[:, p:p + k] = block[:, :k]
+        self.data[:, :n - k] = block[:, k:]
+        self.end += n
+
+    def grow(self) -> None:
+        held = self.slice(self.start, self.end)
+        self.data = np.empty((len(_CHANNELS), 2 * self.capacity))
+        self.end = self.start
+        self.append(held)
+
+    def slice(self, i0: int, i1: int) -> np.ndarray:
+        """Samples [i0, i1) als Kanäle x n (View, nur beim Umbruch eine Kopie)."""
+        cap = self.capacity
+        p = i0 % cap
+        if p + i1 - i0 <= cap:
+            return self.data[:, p:p + i1 - i0]
+        return np.concatenate((self.data[:, p:], self.data[:, :p + i1 - i0 - cap]), axis=1)
+
+    def search(self, t: float) -> int:
+        """Absoluter Index des ersten gehaltenen Samples mit Zeit >= t."""
+        cap = self.capacity
+        p, n = self.start % cap, self.end - self.start
+        head = self.data[0, p:min(p + n, cap)]
+        if len(head) == n or (len(head) and head[-1] >= t):
+            return self.start + int(np.searchsorted(head, t))
+        return self.start + len(head) + int(np.searchsorted(self.data[0, :n - len(head)], t))
+
+    def drop_before(self, i: int) -> None:
+        self.start = min(max(self.start, i), self.end)
+
+
+class _RunningSums:
+    """
+    Laufende Summen der Signale über den Indexbereich [a, b) des Ring-Puffers: Anzahl
+    endlicher und nicht-endlicher Werte, Summe (x - shift) und Summe (x - shift)².
+    Beim Vorrücken eines Fensters werden nur die hinzukommenden bzw. herausfallenden
+    Samples addiert bzw. subtrahiert; alle RESYNC_WINDOWS Fenster wird exakt neu
+    summiert (shift = Mittelwert), damit sich Rundungsfehler nicht aufsummieren.
+    """
+
+    def __init__(self):
+        self.a = self.b = 0
+        self.shift = np.zeros(len(SIGNALS))
+        self.acc = np.zeros((4, len(SIGNALS)))
+        self.n_updates = None  # None: noch nie exakt summiert
+
+    def _sums(self, block: np.ndarray) -> np.ndarray:
+        x = block[1:]
+        ok = np.isfinite(x)
+        dx = np.where(ok, x - self.shift[:, None], 0.0)
+        return np.array([ok.sum(axis=1), (~ok).sum(axis=1), dx.sum(axis=1), (dx * dx).sum(axis=1)])
+
+    def extend(self, buf: _RingBuffer, b: int) -> None:
+        """Nimmt die Samples [b_alt, b) hinzu."""
+        if b > self.b:
+            self.acc += self._sums(buf.slice(self.b, b))
+            self.b = b
+
+    def drop(self, buf: _RingBuffer, a: int) -> None:
+        """Entfernt die Samples [a_alt, a); muss vor buf.drop_before(a) aufgerufen werden."""
+        if a >= self.b:
+            self.a = self.b = a
+            self.acc[:] = 0.0
+        elif a > self.a:
+            self.acc -= self._sums(buf.slice(self.a, a))
+            self.a = a
+
+    def window(self, buf: _RingBuffer, i0: int, i1: int) -> dict:
+        """Summen über das Fenster [i0, i1) als {Signal: Moments}."""
+        self.drop(buf, i0)
+        if self.n_updates is None or self.n_updates >= RESYNC_WINDOWS:
+            x = buf.slice(i0, i1)[1:]
+            ok = np.isfinite(x)
+            self.shift = np.where(ok, x, 0.0).sum(axis=1) / np.maximum(ok.sum(axis=1), 1)
+            self.acc = self._sums(buf.slice(i0, i1))
+            self.b = i1
+            self.n_updates = 0
+        else:
+            self.extend(buf, i1)
+            self.n_updates += 1
+        n, bad, s1, s2 = self.acc
+        return {s: Moments(int(n[j]), int(bad[j]), float(self.shift[j]), float(s1[j]), float(s2[j]))
+                for j, s in enumerate(SIGNALS)}
+
+
+class StreamingPredictor:
+    """
+    Laufende Fahrererkennung auf Basis der trainierten model_*.joblib-Pipelines.
+
+    Args:
+        artifacts_dir: Ordner mit trainierten Modellen (optional, sonst cfg.artifacts_dir)
+        models: Zu verwendende Modelle (optional, sonst cfg.models)
+        window_sec, step_sec, min_points, max_points: Fensterparameter (optional, sonst cfg)
+        compiled: Bei True die NumPy-Exporte (model_*_arrays/, per mmap) statt der sklearn-Pipelines verwenden
+        max_rate_hz: Angenommene maximale Abtastrate für die Größe des Ring-Puffers
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
+    """
+
+    def __init__(self, artifacts_dir=None, models=None, window_sec=None, step_sec=None, min_points=None, max_points=None,
+                 compiled=False, max_rate_hz=MAX_RATE_HZ, cfg=None):
+        cfg = config.resolve(cfg)
+        artifacts_dir = artifacts_dir or cfg.artifacts_dir
+        self.models = list(models or cfg.models)
+        self.compiled = compiled
+        if compiled:
+            self.estimators = {m: get_compiled(artifacts_dir, m) for m in self.models}
+        else:
+            self.estimators = {m: get_model(artifacts_dir, m).pipe for m in self.models}
+        first = get_metadata(artifacts_dir, self.models[0])
+        self.feat_cols, self.feature_set = list(first["feat_cols"]), first["feature_set"]
+        self.classes = {m: [str(c) for c in self._classes(m)] for m in self.models}
+        self.window_sec = window_sec or cfg.window_sec
+        self.step_sec = step_sec or cfg.step_sec
+        self.min_points = min_points or cfg.min_points
+        self.max_points = max_points or cfg.max_points
+        self.capacity = int(np.ceil(self.window_sec * max_rate_hz)) + 1
+        self.reset()
+
+    def _classes(self, m: str):
+        est = self.estimators[m]
+        return est.classes_ if self.compiled else est.named_steps["clf"].classes_
+
+    def reset(self) -> None:
+        """Beginnt ein neues Recording (Puffer und laufende Mittelwerte leeren)."""
+        self._buf = _RingBuffer(self.capacity)
+        self._running = _RunningSums()
+        self._t0 = None          # Zeit des ersten Samples
+        self._k = 0              # Index des nächsten offenen Fensters (Start = _t0 + _k * step_sec)
+        self._last_t = -np.inf
+        self.n_windows = 0
+        self.last_latency_ms = 0.0
+        self._sums = {m: np.zeros(len(self.classes[m])) for m in self.models}
+
+    def push(self, t, steer, gas, brake, speed, yaw_rate) -> int:
+        """Fügt ein Sample hinzu. Returns: Anzahl der dadurch abgeschlossenen Fenster."""
+        return self.push_many({"t": [t], "steer": [steer], "gas": [gas], "brake": [brake], "speed": [speed], "yaw_rate": [yaw_rate]})
+
+    def push_many(self, samples: dict) -> int:
+        """
+        Fügt mehrere Samples hinzu (Dict mit gleich langen Arrays pro Kanal, zeitlich sortiert).
+        Samples mit ungültigem oder rückläufigem Zeitstempel werden verworfen.
+
+        Returns:
+            Anzahl der abgeschlossenen Fenster
+        """
+        block = np.array([np.asarray(samples[c], dtype=float).ravel() for c in _CHANNELS])
+        t = block[0]
+        keep = np.isfinite(t) & (t > np.maximum.accumulate(np.concatenate(([self._last_t], t)))[:-1])
+        if not keep.all():
+            block = block[:, keep]
+        if not block.shape[1]:
+            return 0
+        if self._t0 is None:
+            self._t0 = float(block[0, 0])
+        done, k = 0, 0
+        while k < block.shape[1]:
+            if not self._buf.free():
+                # Puffer voll, ohne dass ein Fenster abgeschlossen ist: Abtastrate höher als max_rate_hz
+                print(f"Warnung: Mehr als {self._buf.capacity} Samples pro Fenster – Ring-Puffer wird vergrößert")
+                self._buf.grow()
+            n = min(self._buf.free(), block.shape[1] - k)
+            self._buf.append(block[:, k:k + n])
+            self._last_t = float(block[0, k + n - 1])
+            done += self._advance()
+            k += n
+        return done
+
+    def _advance(self) -> int:
+        """Wertet alle Fenster aus, deren Ende bereits überschritten wurde."""
+        done = 0
+        # Fenster [s, s + ws) ist vollständig, sobald ein Sample jenseits von s + ws liegt (wie find_windows)
+        while self._last_t - self.window_sec + 1e-9 > self._t0 + self._k * self.step_sec:
+            s = self._t0 + self._k * self.step_sec
+            i0, i1 = self._buf.search(s), self._buf.search(s + self.window_sec)
+            if i1 - i0 >= self.min_points:
+                self._predict_window(i0, i1)
+                done += 1
+            self._k += 1
+            i_next = self._buf.search(self._t0 + self._k * self.step_sec)
+            self._running.drop(self._buf, i_next)
+            self._buf.drop_before(i_next)
+        return done
+
+    def _predict_window(self, i0: int, i1: int) -> None:
+        start = time.perf_counter()
+        moments = self._running.window(self._buf, i0, i1)
+        win = self._buf.slice(i0, i1)
+        d = dict(zip(_CHANNELS, win))
+        feats = window_features(d, 0, i1 - i0, self.feature_set, self.max_points, moments=moments)
+        x = np.array([[feats.get(c, np.nan) for c in self.feat_cols]])
+        # Pipelines wurden mit Spaltennamen gefittet – Eingabe als DataFrame mit feat_cols
+        xin = x if self.compiled else pd.DataFrame(x, columns=self.feat_cols)
+        for m in self.models:
+            proba = self.estimators[m].predict_proba(xin)
+            self._sums[m] += align_proba(proba, self._classes(m), self.classes[m])[0]
+        self.n_windows += 1
+        self.last_latency_ms = (time.perf_counter() - start) * 1000.0
+
+    def estimate(self) -> dict:
+        """
+        Aktuelle Recording-Level-Schätzung pro Modell.
+
+        Returns:
+            {model: {"ist", "proba": {klasse: p}, "margin", "n_windows"}}; "ist" ist None,
+            solange noch kein Fenster abgeschlossen ist
+        """
+        out = {}
+        for m in self.models:
+            classes = self.classes[m]
+            if not self.n_windows:
+                out[m] = {"ist": None, "proba": {}, "margin": 0.0, "n_windows": 0}
+                continue
+            mean = self._sums[m] / self.n_windows
+            order = np.argsort(mean)[::-1]
+            margin = float(mean[order[0]] - mean[order[1]]) if len(order) > 1 else float(mean[order[0]])
+            out[m] = {"ist": classes[order[0]], "proba": dict(zip(classes, mean.tolist())), "margin": margin, "n_windows": self.n_windows}
+        return out
@@ -8,30 +8,33 @@ StratifiedGroupKFold (Recordings bleiben zusammen, keine Datenleckage). Optional
 GridSearch für Hyperparameter vor dem finalen Training. Speichert Modelle, CV-Ergebnisse,
 Konfusionsmatrizen und Feature-Importance-Plots.
 
-CLI: python -m DriveIdent.lib.core.train [--data-dir DIR] [--labels FILE] [--artifacts DIR] [--config PATH] [--optimize]
+CLI: python -m DriveIdent.lib.core.train [--data-dir DIR] [--labels FILE] [--artifacts DIR] [--config PATH] [--optimize] [--search-strategy grid|random|halving]
 """
 
 import argparse
-import json
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-import joblib
 from typing import Callable
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import StandardScaler
-from sklearn.pipeline import Pipeline
-from sklearn.model_selection import StratifiedGroupKFold
 
 from . import config
 from .data import load_labels
 from .features import extract_features
-from .progress import write_progress
+from .progress import write_progress, ProgressStage
 from .plots import plot_confusion_matrix, plot_feature_importance, plot_feature_importance_all_models, plot_accuracy
 from .optimize import run_grid_search, get_param_grids
+from .preprocess import fit_preprocessing, assemble_pipeline
+from .aggregate import align_proba, aggregate_recordings
+from .folds import FOLD_PLAN_FILE, FoldPlan
+from .registry import ModelArtifact, put_model, save_model
+from .cache import fingerprint, load_json, save_json
+from .compiled import compiled_path, save_compiled
+from .profiler import profile_run, stage
+from .cancel import check_cancelled
+from .staging import staged_output
 
 def _parse_args():
     """CLI-Argumente parsen und config.apply_overrides vorbereiten."""
@@ -43,8 +46,38 @@ def _parse_args():
     p.add_argument("--cv-splits", type=int, help="Anzahl CV-Folds")
     p.add_argument("--random-state", type=int, help="Random Seed")
     p.add_argument("--optimize", action="store_true", help="GridSearch für Hyperparameter vor Training")
+    p.add_argument("--search-strategy", choices=["grid", "random", "halving"], help="Suchstrategie der Hyperparameter-Optimierung")
     return p.parse_args()
 
+def _fit(clf, X, y, cancel_token=None):
+    """clf.fit mit Abbruch-Prüfung; GradientBoosting prüft das Token nach jeder Boosting-Iteration."""
+    if cancel_token is not None and isinstance(clf, GradientBoostingClassifier):
+        clf.fit(X, y, monitor=lambda i, est, locals_: cancel_token.cancelled)
+    else:
+        clf.fit(X, y)
+    check_cancelled(cancel_token)
+
+def make_classifier(mdl, random_state, best_params=None):
+    """
+    Klassifikator eines Modelltyps: mit den Parametern der Hyperparameter-Suche
+    (best_params, Schlüssel "clf__...") oder mit den Standardwerten.
+    Gemeinsam genutzt von train() und der Split-Auswertung (evaluate.py).
+    """
+    if best_params is not None:
+        clf_params = {k.replace("clf__", ""): v for k, v in best_params.items()}
+        clf_params.update(get_param_grids(random_state)[mdl]["base_params"])
+        if mdl == "randomforest":
+            return RandomForestClassifier(**clf_params)
+        elif mdl == "logreg":
+            return LogisticRegression(**clf_params)
+        return GradientBoostingClassifier(**clf_params)
+    if mdl == "randomforest":
+        return RandomForestClassifier(n_estimators=300, max_depth=5, min_samples_split=10, min_samples_leaf=4, max_features="log2", class_weight="balanced", random_state=random_state)
+    elif mdl == "logreg":
+        return LogisticRegression(C=100.0, solver="saga", max_iter=5000, class_weight="balanced", random_state=random_state)
+    return GradientBoostingClassifier(n_estimators=250, learning_rate=0.05, max_depth=3, subsample=0.8, random_state=random_state)
+
+@profile_run("train")
 def train(
         data_dir : str | Path | None = None, 
         labels : str | Path | pd.DataFrame | None = None,
@@ -52,6 +85,9 @@ def train(
         cv_splits=None, random_state=None, 
         progress_callback : Callable | None = None,
         use_grid_search : bool | None = None,
+        search_strategy : str | None = None,
+        cancel_token=None,
+        cfg=None,
     ):
     """
     Trainiert alle konfigurierten Modelle. Verwendet StratifiedGroupKFold, damit
@@ -64,14 +100,23 @@ def train(
         cv_splits: Anzahl CV-Folds (optional)
         random_state: Random Seed (optional)
         progress_callback: Callback für Fortschrittsanzeige (optional)
-        use_grid_search: Bei True: GridSearch vor Training (optional, sonst config.USE_GRID_SEARCH)
+        use_grid_search: Bei True: GridSearch vor Training (optional, sonst cfg.use_grid_search)
+        search_strategy: "grid" | "random" | "halving" (optional, sonst cfg.search_strategy)
+        cancel_token: Optionales CancelToken (cancel.py); bei Abbruch wird Cancelled geworfen,
+                      Modelle und Ergebnisse des Laufs werden verworfen (staging.py)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration); übergebene Argumente haben Vorrang
     """
-    data_dir = data_dir or config.DATA_DIR
-    labels = labels if labels is not None else config.LABELS_FILE
-    artifacts_dir = Path(artifacts_dir or config.ARTIFACTS_DIR)
-    cv_splits = cv_splits or config.CV_SPLITS
-    random_state = random_state or config.RANDOM_STATE
-    use_grid_search = use_grid_search if use_grid_search is not None else config.USE_GRID_SEARCH
+    cfg = config.resolve(cfg)
+    data_dir = data_dir or cfg.data_dir
+    labels = labels if labels is not None else cfg.labels_file
+    artifacts_dir = Path(artifacts_dir or cfg.artifacts_dir)
+    cv_splits = cv_splits or cfg.cv_splits
+    random_state = cfg.random_state if random_state is None else random_state
+    use_grid_search = use_grid_search if use_grid_search is not None else cfg.use_grid_search
+    search_strategy = search_strategy or cfg.search_strategy
+    cfg = cfg.replace(data_dir=data_dir, artifacts_dir=artifacts_dir, cv_splits=cv_splits, random_state=random_state,
+                      use_grid_search=use_grid_search, search_strategy=search_strategy)
+    models = list(cfg.models)
 
     write_progress(artifacts_dir, phase="starting", message="Lade Labels...", callback=progress_callback)
     paths, ids = load_labels(labels, True, data_dir)
@@ -81,115 +126,132 @@ def train(
 
     def _on_extraction_start():
         write_progress(artifacts_dir, phase="extraction", message="Extraktion läuft...", callback=progress_callback)
-    result = extract_features(paths, ids, config.FEATURE_SET, on_extraction_start=_on_extraction_start)
+    extraction = ProgressStage(artifacts_dir, "extraction", len(paths), "Recordings", progress_callback)
+    result = extract_features(paths, ids, cfg.feature_set, on_extraction_start=_on_extraction_start,
+                              on_progress=lambda done, total, step: extraction.update(done, f"Extraktion: {step}"),
+                              cancel_token=cancel_token, cfg=cfg)
 
     feat_cols = [c for c in result.columns if c not in ("driver_id", "recording")]
     X, y = result[feat_cols], result["driver_id"]
     # Gruppierung nach Recording: Fenster derselben Fahrt nicht in Train und Test
     groups = np.asarray(result["recording"].values)
     classes = sorted(y.unique().tolist())
-    cv = StratifiedGroupKFold(n_splits=cv_splits, shuffle=True, random_state=random_state)
+    # Splits einmal pro Lauf berechnen (bzw. den gespeicherten Plan derselben Daten laden);
+    # Imputer + Scaler einmal pro Fold fitten – geteilt von allen Modellen und GridSearch-Kombinationen
+    fold_plan = FoldPlan.load_or_create(artifacts_dir / FOLD_PLAN_FILE, X, y, groups, cv_splits, random_state)
+    folds = fold_plan.preprocessed()
+    pre_full, Xt_full = fit_preprocessing(X)  # Vorverarbeitung der finalen Modelle
     artifacts_dir.mkdir(exist_ok=True)
+    # Gemeinsame Metadaten aller Modelle dieses Laufs (model_*.json)
+    meta = {
+        "window": {"window_sec": cfg.window_sec, "step_sec": cfg.step_sec,
+                   "min_points": cfg.min_points, "max_points": cfg.max_points},
+        "data_fingerprint": fingerprint(X, np.asarray(y, dtype=str), np.asarray(groups, dtype=str)),
+        "n_windows": int(len(X)), "n_recordings": int(len(np.unique(groups))),
+    }
     ergebnis = pd.DataFrame(columns=["Model", "Precision"])
     print("Using models")
-    print(config.MODELS)
-
-    # Optional: GridSearch für optimale Hyperparameter
-    best_params_per_model = {}
-    if use_grid_search:
-        write_progress(artifacts_dir, phase="training", message="Hyperparameter-Optimierung...", callback=progress_callback)
-        print("Hyperparameter-Optimierung via GridSearch...")
-        opt_results = {}
-        for mdl in config.MODELS:
-            print(f"  GridSearch für {mdl}...")
-            best_params, best_score, all_results = run_grid_search(
-                X, y, groups, mdl, cv_splits, random_state
-            )
-            best_params_per_model[mdl] = best_params
-            opt_results[mdl] = {"best_params": best_params, "best_score": float(best_score)}
-            print(f"    Beste Score: {best_score:.2%}, Params: {best_params}")
-        (artifacts_dir / "optimize_results.json").write_text(json.dumps(opt_results, indent=2), encoding="utf-8")
-
-    total_models = len(config.MODELS)
-    accuracies = {}
-    for i, mdl in enumerate(config.MODELS):
-        completed = config.MODELS[:i]
-        in_progress = [mdl]
-        write_progress(
-            artifacts_dir,
-            phase="training",
-            total=total_models,
-            completed=completed,
-            in_progress=in_progress,
-            message=f"Trainiere {mdl}...",
-            callback=progress_callback
-        )
-
-        # Hyperparameter: aus GridSearch oder Standardwerte
-        if mdl in best_params_per_model:
-            bp = best_params_per_model[mdl]
-            cfg = get_param_grids()[mdl]
-            base = cfg["base_params"]
-            clf_params = {k.replace("clf__", ""): v for k, v in bp.items()}
-            clf_params.update(base)
-            if mdl == "randomforest":
-                clf = RandomForestClassifier(**clf_params)
-            elif mdl == "logreg":
-                clf = LogisticRegression(**clf_params)
-            else:
-                clf = GradientBoostingClassifier(**clf_params)
-        else:
-            if mdl == "randomforest":
-                clf = RandomForestClassifier(n_estimators=300, max_depth=5, min_samples_split=10, min_samples_leaf=4, max_features="log2", class_weight="balanced", random_state=random_state)
-            elif mdl == "logreg":
-                clf = LogisticRegression(C=100.0, solver="saga", max_iter=5000, class_weight="balanced", random_state=random_state)
-            else:
-                clf = GradientBoostingClassifier(n_estimators=250, learning_rate=0.05, max_depth=3, subsample=0.8, random_state=random_state)
-        pipe = Pipeline([("imputer", SimpleImputer(strategy="median")), ("scaler", StandardScaler()), ("clf", clf)])
-        tl, pl = [], []
-        for train_idx, test_idx in cv.split(X, y, groups):
-            pipe.fit(X.iloc[train_idx], y.iloc[train_idx])
-            proba = pipe.predict_proba(X.iloc[test_idx])
-            inner = pipe.named_steps["clf"]
-            # Klassen-Reihenfolge kann abweichen – Matrix auf unsere classes mappen
-            # (für Recording-Level-Aggregation und Konfusionsmatrix)
-            fp = np.zeros((proba.shape[0], len(classes)))
-            for j, cls in enumerate(inner.classes_):
-                if str(cls) in classes: fp[:, classes.index(str(cls))] = proba[:, j]
-            pdf = pd.DataFrame(fp, columns=classes)
-            pdf["g"], pdf["y_true"] = groups[test_idx], result.iloc[test_idx]["driver_id"].values
-            # Pro Recording: Wahrscheinlichkeiten mitteln, dann argmax für Vorhersage
-            agg = pdf.groupby("g", sort=False)[classes].mean()
-            yt = pdf.groupby("g", sort=False)["y_true"].first()
-            for gid in agg.index:
-                tl.append(yt.loc[gid])
-                pl.append(classes[np.argmax(agg.loc[gid][classes].values)])
-        acc = sum(1 for t, p in zip(tl, pl) if str(t) == str(p)) / len(tl) if tl else 0
-        accuracies[mdl] = acc
-        # Finales Modell auf allen Trainingsdaten für spätere Vorhersage
-        pipe.fit(X, y)
-        joblib.dump((pipe, feat_cols, config.FEATURE_SET), artifacts_dir / f"model_{mdl}.joblib")
-        ergebnis.loc[len(ergebnis)] = [mdl, acc]
-        print(f"{mdl}: {acc:.2%}")
-        # Plots: Konfusionsmatrix, Feature Importance
-        plot_confusion_matrix(tl, pl, classes, mdl, artifacts_dir)
-        plot_feature_importance(pipe, feat_cols, mdl, artifacts_dir)
+    print(models)
+
+    # Ausgaben zuerst in einen Staging-Ordner; erst nach erfolgreichem Ende (inkl. Grafiken)
+    # werden sie nach artifacts_dir verschoben – ein Abbruch lässt die alten Modelle unverändert.
+    # Fortschritt und Zwischenstand der Suche gehen weiter direkt nach artifacts_dir.
+    with staged_output(artifacts_dir) as out_dir:
+        fold_plan.save(out_dir / FOLD_PLAN_FILE)
+        # Optional: GridSearch für optimale Hyperparameter
+        best_params_per_model = {}
+        if use_grid_search:
+            write_progress(artifacts_dir, phase="training", message="Hyperparameter-Optimierung...", callback=progress_callback)
+            print(f"Hyperparameter-Optimierung via {search_strategy}-Suche...")
+            opt_results = {}
+            opt_path = artifacts_dir / "optimize_results.json"
+            for mdl in models:
+                print(f"  Suche für {mdl}...")
+                search = ProgressStage(artifacts_dir, "training", 0, "Bewertungen", progress_callback)
+
+                def _on_search_progress(done, total, mdl=mdl, search=search):
+                    search.total = total  # wächst bei "halving" mit jeder Runde
+                    search.update(done, f"Hyperparameter-Suche {mdl}")
+                with stage(f"search[{mdl}]"):
+                    best_params, best_score, all_results = run_grid_search(
+                        X, y, groups, mdl, cv_splits, random_state,
+                        search_strategy=search_strategy, n_jobs=cfg.n_jobs, results_path=opt_path, fold_plan=fold_plan,
+                        on_progress=_on_search_progress, cancel_token=cancel_token, cfg=cfg,
+                    )
+                best_params_per_model[mdl] = best_params
+                opt_results[mdl] = {"best_params": best_params, "best_score": float(best_score), "search_strategy": search_strategy, "n_evaluated": len(all_results)}
+                print(f"    Beste Score: {best_score:.2%}, Params: {best_params}")
+            # Zusammenfassung zu den Ergebnissen pro Kombination ergänzen, nicht ersetzen
+            partial = load_json(opt_path, {})
+            save_json(opt_path, {**partial, **{mdl: {**partial.get(mdl, {}), **res} for mdl, res in opt_results.items()}})
+
+        total_models = len(models)
+        accuracies = {}
+        pipes_all = {}
+        artifacts = {}
+        # Fortschritt pro Fold (CV-Folds + finales Modell je Modelltyp)
+        fitting = ProgressStage(artifacts_dir, "training", total_models * (len(folds) + 1), "Folds", progress_callback)
+        for i, mdl in enumerate(models):
+            check_cancelled(cancel_token)
+            completed = models[:i]
+            in_progress = [mdl]
+            fitting.update(i * (len(folds) + 1), f"Trainiere {mdl} (Fold 1/{len(folds)})", completed, in_progress)
+
+            # Hyperparameter: aus GridSearch oder Standardwerte
+            clf = make_classifier(mdl, random_state, best_params_per_model.get(mdl))
+            tl, pl = [], []
+            for k, fold in enumerate(folds):
+                if k:
+                    fitting.advance(1, f"Trainiere {mdl} (Fold {k + 1}/{len(folds)})", completed, in_progress)
+                with stage(f"fit_fold[{mdl}]"):
+                    _fit(clf, fold.X_train, fold.y_train, cancel_token)
+                with stage(f"predict_proba[{mdl}]"):
+                    proba = clf.predict_proba(fold.X_test)
+                # Klassen-Reihenfolge kann abweichen – Matrix auf unsere classes mappen
+                # (für Recording-Level-Aggregation und Konfusionsmatrix)
+                fp = align_proba(proba, clf.classes_, classes)
+                # Pro Recording: Wahrscheinlichkeiten mitteln, dann argmax für Vorhersage
+                votes = aggregate_recordings(fp, fold.groups_test, classes)
+                tl.extend(fold.y_test[votes.first_idx])
+                pl.extend(votes.labels)
+            acc = sum(1 for t, p in zip(tl, pl) if str(t) == str(p)) / len(tl) if tl else 0
+            accuracies[mdl] = acc
+            # Finales Modell auf allen Trainingsdaten für spätere Vorhersage (eigenständige Pipeline)
+            fitting.advance(1, f"Trainiere {mdl} (finales Modell)", completed, in_progress)
+            with stage(f"fit_final[{mdl}]"):
+                _fit(clf, Xt_full, y, cancel_token)
+            pipe = assemble_pipeline(pre_full, clf)
+            artifact = ModelArtifact(pipe, feat_cols, cfg.feature_set)
+            save_model(out_dir, mdl, artifact, meta, register=False)  # Registrierung erst am endgültigen Pfad
+            artifacts[mdl] = artifact
+            # NumPy-Export für eingebettete Vorhersage – auf den Trainingsdaten gegen sklearn geprüft
+            if not save_compiled(compiled_path(out_dir, mdl), pipe, feat_cols, cfg.feature_set, X_check=X):
+                print(f"Warnung: Export model_{mdl}_arrays weicht von sklearn ab")
+            pipes_all[mdl] = pipe
+            ergebnis.loc[len(ergebnis)] = [mdl, acc]
+            print(f"{mdl}: {acc:.2%}")
+            # Plots: Konfusionsmatrix, Feature Importance (Rendern läuft im Hintergrund weiter)
+            plot_confusion_matrix(tl, pl, classes, mdl, out_dir, cfg=cfg)
+            plot_feature_importance(pipe, feat_cols, mdl, out_dir, cfg=cfg)
 
+        plot_accuracy(accuracies, out_dir, cfg=cfg)
+        # Kombinierter Feature-Importance-Plot für alle Modelle (Subplots nebeneinander)
+        plot_feature_importance_all_models(pipes_all, feat_cols, out_dir, cfg=cfg)
+        ergebnis.to_csv(out_dir / "ergebnis.csv")
+    # staged_output hat auf die Grafiken gewartet und alles verschoben – Modelle unter ihrem
+    # endgültigen Pfad registrieren (os.replace erhält mtime und Größe), erst dann "Fertig"
+    for mdl, artifact in artifacts.items():
+        put_model(artifacts_dir, mdl, artifact)
     write_progress(
         artifacts_dir,
         phase="done",
         total=total_models,
-        completed=config.MODELS,
+        completed=models,
         in_progress=[],
         message="Fertig",
         callback=progress_callback
     )
-    plot_accuracy(accuracies, artifacts_dir)
-    # Kombinierter Feature-Importance-Plot für alle Modelle (Subplots nebeneinander)
-    pipes_all = {mdl: joblib.load(artifacts_dir / f"model_{mdl}.joblib")[0] for mdl in config.MODELS}
-    plot_feature_importance_all_models(pipes_all, feat_cols, artifacts_dir)
-    ergebnis.to_csv(artifacts_dir / "ergebnis.csv")
-    print("Gespeichert: artifacts/model_*.joblib, ergebnis.csv, plots/")
+    print("Gespeichert: artifacts/model_*.joblib, model_*.json, model_*_arrays/, ergebnis.csv, plots/")
 
 if __name__ == "__main__":
     args = _parse_args()
@@ -201,6 +263,7 @@ if __name__ == "__main__":
     if args.artifacts: overrides["artifacts_dir"] = args.artifacts
     if args.cv_splits: overrides["cv_splits"] = args.cv_splits
     if args.random_state: overrides["random_state"] = args.random_state
+    if args.search_strategy: overrides["search_strategy"] = args.search_strategy
     if overrides:
         config.apply_overrides(**overrides)
     use_opt = args.optimize or config.USE_GRID_SEARCH
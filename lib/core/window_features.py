@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Modul: window_features
+======================
+Feature-Berechnung für einzelne Fenster mit NumPy, ohne Featuretools/TSFresh.
+Liefert dieselben Spaltennamen wie features.extract_features() und reproduziert
+deren Kennwerte, ist aber für ein einzelnes Fenster um Größenordnungen schneller.
+Grundlage für die inkrementelle Vorhersage (stream.py).
+
+- Featuretools-Teil: Fenster auf MAX_POINTS resampelt (wie build_window_data),
+  Aggregationen mean, std, min, max, sum, skew, kurtosis über time und alle Signale
+- TSFresh-Teil: MinimalFCParameters auf allen Punkten des Fensters
+
+Unterschied zur Batch-Extraktion: TSFresh imputiert nicht-endliche Werte spaltenweise
+über alle Fenster eines Laufs; hier wird pro Fenster auf 0 gesetzt.
+
+Optional können laufende Summen pro Signal (Moments, von stream.py inkrementell
+fortgeschrieben) übergeben werden; Summe, Mittelwert, Standardabweichung, Varianz
+und RMS werden dann daraus statt aus den Punkten des Fensters berechnet.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from . import config
+
+SIGNALS = ("steer", "gas", "brake", "speed", "yaw_rate")
+FT_PRIMITIVES = ("KURTOSIS", "MAX", "MEAN", "MIN", "SKEW", "STD", "SUM")
+TS_FEATURES = ("sum_values", "median", "mean", "length", "standard_deviation", "variance",
+               "root_mean_square", "maximum", "absolute_maximum", "minimum")
+
+
+class Moments(NamedTuple):
+    """Laufende Summen eines Signals über ein Fenster (verschoben um shift für numerische Stabilität)."""
+    n: int        # Anzahl endlicher Werte
+    n_bad: int    # Anzahl nicht-endlicher Werte
+    shift: float
+    s1: float     # Summe (x - shift) über die endlichen Werte
+    s2: float     # Summe (x - shift)² über die endlichen Werte
+
+    def total(self) -> float:
+        return self.n * self.shift + self.s1
+
+    def mean(self) -> float:
+        return self.shift + self.s1 / self.n if self.n else np.nan
+
+    def var(self, ddof: int = 0) -> float:
+        if self.n - ddof <= 0:
+            return np.nan
+        return max(self.s2 - self.s1 ** 2 / self.n, 0.0) / (self.n - ddof)
+
+
+def _skew(x: np.ndarray) -> float:
+    """Bias-korrigierte Schiefe wie pandas.Series.skew (NaN werden ignoriert)."""
+    x = x[np.isfinite(x)]
+    n = len(x)
+    if n < 3:
+        return np.nan
+    d = x - x.mean()
+    m2, m3 = (d ** 2).mean(), (d ** 3).mean()
+    if m2 == 0:
+        return 0.0
+    return float(np.sqrt(n * (n - 1)) / (n - 2) * m3 / m2 ** 1.5)
+
+
+def _kurtosis(x: np.ndarray) -> float:
+    """
+    Exzess-Kurtosis (Fisher, nicht bias-korrigiert) wie der Featuretools-Teil von
+    extract_features: NaN propagiert, ein konstantes Signal (z.B. Bremse nie betätigt)
+    ergibt wie dort 0.0 – nicht NaN wie scipy.stats.kurtosis.
+    """
+    if not np.all(np.isfinite(x)) or len(x) == 0:
+        return np.nan
+    d = x - x.mean()
+    m2, m4 = (d ** 2).mean(), (d ** 4).mean()
+    if m2 == 0:
+        return 0.0
+    return float(m4 / m2 ** 2 - 3.0)
+
+
+def _featuretools_features(cols: dict, moments: dict = None) -> dict:
+    """
+    Aggregationen pro Spalte mit den bereinigten Featuretools-Spaltennamen (z.B. MEAN_b_steer_).
+    moments (optional): {Signal: Moments} über genau die Punkte in cols – liefert MEAN, STD, SUM.
+    """
+    out = {}
+    moments = moments or {}
+    for prim in FT_PRIMITIVES:
+        for name in sorted(cols):
+            x = cols[name]
+            v = x[np.isfinite(x)]
+            m = moments.get(name)
+            if m is not None and prim == "MEAN":
+                val = m.mean()
+            elif m is not None and prim == "STD":
+                val = np.sqrt(m.var(ddof=1))
+            elif m is not None and prim == "SUM":
+                val = m.total()
+            elif prim == "KURTOSIS":
+                val = _kurtosis(x)
+            elif prim == "SKEW":
+                val = _skew(x)
+            elif prim == "SUM":
+                val = float(v.sum())
+            elif not len(v):
+                val = np.nan
+            elif prim == "MAX":
+                val = float(v.max())
+            elif prim == "MIN":
+                val = float(v.min())
+            elif prim == "MEAN":
+                val = float(v.mean())
+            else:
+                val = float(v.std(ddof=1)) if len(v) > 1 else np.nan
+            out[f"{prim}_b_{name}_"] = val
+    return out
+
+
+def _tsfresh_features(cols: dict, moments: dict = None) -> dict:
+    """
+    MinimalFCParameters von TSFresh mit dessen Spaltennamen (z.B. steer__mean).
+    moments (optional): {Signal: Moments} über die Punkte in cols – liefert Summe,
+    Mittelwert, Standardabweichung, Varianz und RMS, sofern alle Werte endlich sind.
+    """
+    out = {}
+    moments = moments or {}
+    for name in SIGNALS:
+        x = cols[name]
+        n = len(x)
+        m = moments.get(name)
+        if m is None or m.n_bad or not m.n:
+            vals = {
+                "sum_values": x.sum(),
+                "mean": x.mean() if n else np.nan,
+                "standard_deviation": x.std() if n else np.nan,
+                "variance": x.var() if n else np.nan,
+                "root_mean_square": np.sqrt(np.mean(np.square(x))) if n else np.nan,
+            }
+        else:
+            mean, var = m.mean(), m.var()
+            vals = {"sum_values": m.total(), "mean": mean, "standard_deviation": np.sqrt(var), "variance": var,
+                    "root_mean_square": np.sqrt(var + mean ** 2)}
+        vals.update({
+            "median": np.median(x) if n else np.nan,
+            "length": float(n),
+            "maximum": x.max() if n else np.nan,
+            "absolute_maximum": np.abs(x).max() if n else np.nan,
+            "minimum": x.min() if n else np.nan,
+        })
+        for feat in TS_FEATURES:
+            v = float(vals[feat])
+            out[f"{name}__{feat}"] = v if np.isfinite(v) else 0.0
+    return out
+
+
+def window_features(d: dict, i0: int, i1: int, feature_set: str = None, max_points: int = None, cfg=None,
+                    moments: dict = None) -> dict:
+    """
+    Berechnet die Features eines Fensters [i0, i1) einer Zeitreihe.
+
+    Args:
+        d: Dict mit Arrays t, steer, gas, brake, speed, yaw_rate (wie data.load_csv)
+        i0: Startindex (inklusive)
+        i1: Endindex (exklusive)
+        feature_set: "featuretools" | "tsfresh" | "both" (optional, sonst cfg.feature_set)
+        max_points: Resampling-Grenze des Featuretools-Teils (optional, sonst cfg.max_points)
+        cfg: RunConfig (optional, sonst aktuelle globale Konfiguration)
+        moments: Laufende Summen {Signal: Moments} über [i0, i1) (optional, sonst aus den Punkten);
+            der Featuretools-Teil nutzt sie nur, wenn das Fenster nicht resampelt wird
+
+    Returns:
+        dict {Spaltenname: Wert}
+    """
+    if feature_set is None or max_points is None:
+        cfg = config.resolve(cfg)
+        feature_set = feature_set or cfg.feature_set
+        max_points = max_points or cfg.max_points
+    out = {}
+    if feature_set in ("featuretools", "both"):
+        # Resampling wie build_window_data: gleichmäßige Indizes, höchstens max_points
+        idx = np.linspace(0, i1 - i0 - 1, min(i1 - i0, max_points), dtype=int) + i0
+        cols = {"time": d["t"][idx] - d["t"][i0]}
+        cols.update({s: np.asarray(d[s][idx], dtype=float) for s in SIGNALS})
+        out.update(_featuretools_features(cols, moments if len(idx) == i1 - i0 else None))
+    if feature_set in ("tsfresh", "both"):
+        out.update(_tsfresh_features({s: np.asarray(d[s][i0:i1], dtype=float) for s in SIGNALS}, moments))
+    return out
@@ -8,7 +8,7 @@ from .ValidationPopup import ValidationPopup
 from .ProgressPopup import ProgressPopup
 from DriveIdent.lib.FileImporter import selectFilesFromOS, loadCsvAsDataFrame
 from DriveIdent.lib.FileExporter import saveLabelFileOS
-from DriveIdent.lib.core.backend_adapter import train, predict, validate_csv, set_config
+from DriveIdent.lib.core.backend_adapter import train, predict, validate_csv, set_config, CancelToken
 from typing import Literal, Callable
 import pandas as pd
 import threading
@@ -160,6 +160,7 @@ class MainWindow(tk.Tk):
 
         config["models"] = models
         config["feature_set"] = featureSets
+        config["plots"] = "data"    # The ModelFrame draws the charts itself from plots/data/, no PNGs needed
         for k, v in self.options.items():
             config[k] = v.get()
         return config
@@ -169,22 +170,26 @@ class MainWindow(tk.Tk):
         proceed, reason = self.canStartTraining()
         if proceed:
             set_config(self.mapConfig())
-            popup = ProgressPopup(self, self.styleConfig, "Training")
+            cancelToken = CancelToken()     # Abbrechen in the popup stops the backend within about a second
+            popup = ProgressPopup(self, self.styleConfig, "Training", onCancel=cancelToken.cancel)
             # Starts the training helper function in a second thread to avoid blocking the main thread. This allows the GUI (mostly the ProgressPopup) to update while training
             threading.Thread(
                 target=self.training,
-                args=(popup.updateProgress,popup,),
+                args=(popup.updateProgress,popup,cancelToken,),
                 daemon=True
             ).start()
             return
         messagebox.showwarning("Unvollständiges Setup", reason)
 
-    def training(self, callback, popup : ProgressPopup):
+    def training(self, callback, popup : ProgressPopup, cancelToken : CancelToken):
         '''
         Helper function which starts the training by calling backend_adapters train function. 
         Once training is completed, closes the popup and either displays an error, or loads model accuracy data and opens the ModelFrame 
+        If the user aborted the training, nothing is displayed.
         '''
-        success, out = train(self.dataDir, self.trainFiles, self.styleConfig["paths"]["artifacts"], progress_callback=callback)
+        success, out = train(self.dataDir, self.trainFiles, self.styleConfig["paths"]["artifacts"], progress_callback=callback, cancel_token=cancelToken)
+        if cancelToken.cancelled:
+            return
         if not success:
             popup.close()
             messagebox.showerror("Kritischer Fehler", "Training fehlgeschlagen" if out is None else out)
@@ -196,22 +201,26 @@ class MainWindow(tk.Tk):
         
     def startPrediction(self):
         ''' Starts the prediction process. Opens a ProgressPopup to display prediction progress.'''
-        popup = ProgressPopup(self, self.styleConfig, "Vorhersagen")
+        cancelToken = CancelToken()     # Abbrechen in the popup stops the backend within about a second
+        popup = ProgressPopup(self, self.styleConfig, "Vorhersagen", onCancel=cancelToken.cancel)
 
         # Starts the prediction helper function in a second thread to avoid blocking the main thread. This allows the GUI (mostly the ProgressPopup) to update while training
         threading.Thread(
             target=self.prediction,
-            args=(popup.updateProgress,),
+            args=(popup.updateProgress,cancelToken,),
             daemon=True
         ).start()
 
-    def prediction(self, callback):
+    def prediction(self, callback, cancelToken : CancelToken):
         '''
         Helper function which starts the prediction by calling backend_adapters predict function. 
         Once prediction is completed, closes the popup and either displays an error, or loads the prediction results into the testFiles DataFrame and updates the EditableTable displaying this data
+        If the user aborted the prediction, nothing is displayed.
         '''
-        success, out, result = predict(self.dataDir, self.testFiles.copy(), self.styleConfig["paths"]["artifacts"], progress_callback=callback)
-        
+        success, out, result = predict(self.dataDir, self.testFiles.copy(), self.styleConfig["paths"]["artifacts"], progress_callback=callback, cancel_token=cancelToken)
+        if cancelToken.cancelled:
+            return
+
         if not success:
             messagebox.showerror("Kritischer Fehler", "Vorhersage fehlgeschlagen" if out is None else out)
             return
@@ -293,5 +302,8 @@ class MainWindow(tk.Tk):
         return True, ""
     
 def getPlotPaths(path : str) -> list[str]:
-    ''' Returns a List of file paths to plot images '''
+    ''' Returns a List of file paths to plot data payloads (plots/data/*.json), or to plot images if no payloads exist '''
+    payloads = sorted(Path(path, "data").glob("*.json"))
+    if payloads:
+        return [str(p) for p in payloads]
     return [str(p) for p in Path(path).rglob("*.png")]
\ No newline at end of file
@@ -2,13 +2,15 @@ import tkinter as tk
 from typing import cast, Callable, Literal
 from .frames.ProgressFrame import ProgressFrame
 
+POLL_MS = 100   # Interval in which the latest reported progress is applied to the widgets
+
 class ProgressPopup(tk.Frame):
     """
     This Class creates a popup displaying the progress of a process.
     The Windows size is 500x600 by default and can not be resized.
     """
 
-    def __init__(self, parent, styleConfig : dict, title : str):
+    def __init__(self, parent, styleConfig : dict, title : str, onCancel : Callable | None = None):
         '''
         Constructor of EditableTable.
 
@@ -16,6 +18,7 @@ class ProgressPopup(tk.Frame):
             parent: Tkinter Parent Object where this Object is depending on
             styleConfig: A dictionary containing stylization information
             title: Title of the Window, which is also displayed at the center
+            onCancel: Optional Callback Function which is called when the user aborts the process (Abbrechen-Button or closing the window), ie. CancelToken.cancel
         '''
 
         popup = tk.Toplevel(parent)
@@ -23,27 +26,49 @@ class ProgressPopup(tk.Frame):
         popup.geometry("500x600")
         popup.resizable(False, False)
         popup.attributes('-topmost', True)  # Allways stay on top
-        popup.protocol("WM_DELETE_WINDOW", self.close)  # Execute close if window is closed using the OS-Buttons
+        popup.protocol("WM_DELETE_WINDOW", self.cancel)  # Execute cancel if window is closed using the OS-Buttons
 
         popup.transient(parent)
         popup.grab_set()          # makes window modal
 
         self.styleConfig = styleConfig
         self.popup = popup
+        self.onCancel = onCancel
 
-        self.frame = ProgressFrame(popup, styleConfig, title, 100, onCancel=self.close)
+        self.frame = ProgressFrame(popup, styleConfig, title, 100, onCancel=self.cancel)
         self.frame.pack(pady=styleConfig["paddings"]["default"], expand=True)
 
+        self.latest = None  # Latest progress reported by the backend, applied in the Tk thread by applyProgress
+        self.popup.after(POLL_MS, self.applyProgress)
+
     def updateProgress(self, phase, total, completed_list, in_progress_list, message, remaining, percent):
-        ''' Callback function which can be handed to the backend_adapters train or predict functions to update their progress. '''
+        '''
+        Callback function which can be handed to the backend_adapters train or predict functions to update their progress.
+        It is called from a background thread, so it only stores the progress; the widgets are updated by applyProgress.
+        '''
+        self.latest = (phase, message, percent)
+
+    def applyProgress(self):
+        ''' Applies the latest reported progress to the widgets. Runs in the Tk thread and reschedules itself until the popup is closed. '''
         if not self.popup.winfo_exists():
             return
 
-        self.frame.messageLabel.config(text=message)
-        self.frame.progress.config(value=int(percent))
+        if self.latest is not None:
+            phase, message, percent = self.latest
+            self.frame.messageLabel.config(text=message)
+            self.frame.progress.config(value=int(percent))
+
+            if phase in ("done", "cancelled"):
+                self.close()
+                return
+
+        self.popup.after(POLL_MS, self.applyProgress)
 
-        if phase == "done":
-            self.close()
+    def cancel(self):
+        ''' Aborts the running process (if an onCancel callback was given) and closes the Popup '''
+        if self.onCancel is not None:
+            self.onCancel()
+        self.close()
 
     def close(self):
         ''' Closes the Popup '''
@@ -5,6 +5,8 @@ import pandas as pd
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 from DriveIdent.lib.core.backend_adapter import train, predict
+from DriveIdent.lib.core import config
+from DriveIdent.lib.core.evaluate import evaluate_splits, find_splits
 import itertools
 import csv
 import argparse
@@ -113,12 +115,14 @@ def run_split(train_path, data_dir, fail_on_err = True):
 
     results = []
     try:
+        cfg = config.current().replace(plots="off")  # Headless: Artefakte werden danach gelöscht, Grafiken nicht rendern
         out, err = train(
             data_dir=data_dir,
             labels=train_df,
             artifacts_dir=artifacts_dir,
             progress_callback=None,
-            use_grid_search=False
+            use_grid_search=False,
+            cfg=cfg
         )
 
         if not out:
@@ -128,7 +132,8 @@ def run_split(train_path, data_dir, fail_on_err = True):
             data_dir=data_dir,
             test_labels_file=test_df,
             artifacts_dir=artifacts_dir,
-            progress_callback=None
+            progress_callback=None,
+            cfg=cfg
         )
 
         if not out:
@@ -160,14 +165,29 @@ def run_split(train_path, data_dir, fail_on_err = True):
 
     return results
 
-def main():
-    
-    parser = argparse.ArgumentParser(description="Führt Vorhersagen über alle möglichen Kombinationen von 2 - 7 Trainingstriplets durch")
-    parser.add_argument("--data-dir", type=str, help="Ordner mit CSV-Recordings")
-    args = parser.parse_args()
-    data_dir = args.data_dir
-
-    split()
+def run_all_splits(data_dir):
+    ''' Evaluates all splits with the split evaluation engine: features are extracted once, every split only selects its rows '''
+    splits = find_splits(split_dir)
+    cfg = config.current().replace(plots="off")
+    if data_dir:
+        cfg = cfg.replace(data_dir=data_dir)
+
+    with tqdm(total=len(splits), desc="Processing Splits") as pbar:
+        def on_progress(done, total, step):
+            if step == "Splits":
+                pbar.update(done - pbar.n)
+            else:
+                pbar.set_postfix_str(f"{step} {done:.0f}/{total}")
+
+        results_df = evaluate_splits(splits, on_progress=on_progress, cfg=cfg)
+
+    # One triplet = one recording per driver
+    results_df["train_triplets"] = results_df["n_train_recordings"] // 3
+    results_df["test_triplets"] = results_df["n_test_recordings"] // 3
+    return results_df[["split", "model", "train_triplets", "test_triplets", "n_correct", "n_test_samples", "accuracy"]]
+
+def run_all_splits_full_pipeline(data_dir):
+    ''' Evaluates all splits by running the complete train and predict pipeline per split (slow, for cross-checking the engine) '''
     train_files = sorted(glob.glob(f"{split_dir}/split_*_train.lbl"))
 
     max_workers = 4
@@ -181,7 +201,21 @@ def main():
                 all_results.extend(future.result())
                 pbar.update(1)
 
-    results_df = pd.DataFrame(all_results)
+    return pd.DataFrame(all_results)
+
+def main():
+    
+    parser = argparse.ArgumentParser(description="Führt Vorhersagen über alle möglichen Kombinationen von 2 - 7 Trainingstriplets durch")
+    parser.add_argument("--data-dir", type=str, help="Ordner mit CSV-Recordings")
+    parser.add_argument("--full-pipeline", action="store_true", help="Pro Split train() und predict() ausführen statt Features einmal zu extrahieren (langsam)")
+    args = parser.parse_args()
+    data_dir = args.data_dir
+
+    split()
+    if args.full_pipeline:
+        results_df = run_all_splits_full_pipeline(data_dir)
+    else:
+        results_df = run_all_splits(data_dir)
     results_df.to_csv("evaluation_results.csv", index=False)
 
     print("FERTIG.")
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Repo-Root in sys.path, damit "lib.core" als Paket importiert werden kann
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+DRIVERS = ("anna", "bert", "carl")
+
+
+def write_recording(path: Path, rng, d: int, n: int = 3000, brake_off: bool = False) -> Path:
+    """Schreibt ein synthetisches Recording im CSV-Format des Simulators (mit Einheiten-Zeile)."""
+    t = np.arange(n) * 0.02
+    brake = np.zeros(n) if brake_off else rng.uniform(0, 1, n) * 0.3
+    df = pd.DataFrame({
+        "timestamp": t,
+        "wheel_position": np.sin(t * (0.1 + d * 0.05)) + rng.normal(0, 0.1 + d * 0.05, n),
+        "car0_throttle_position": rng.uniform(0, 1, n) * (0.5 + 0.2 * d),
+        "car0_brake_position": brake,
+        "car0_velocity_vehicle": 20 + 5 * d + rng.normal(0, 1, n),
+        "rot_vel": [f"0,{v:.4f},0" for v in rng.normal(0, 0.1 * (d + 1), n)],
+    })
+    units = pd.DataFrame([["s", "deg", "-", "-", "m/s", "rad/s"]], columns=df.columns)
+    pd.concat([units, df]).to_csv(path, index=False)
+    return path
+
+
+@pytest.fixture(scope="session")
+def recordings(tmp_path_factory):
+    """
+    Ordner mit 4 Recordings pro Fahrer; das letzte Recording jedes Fahrers hat keine
+    Bremsung (konstantes Signal). Liefert (data_dir, DataFrame File/Label).
+    """
+    data_dir = tmp_path_factory.mktemp("data")
+    rng = np.random.default_rng(0)
+    rows = []
+    for d, drv in enumerate(DRIVERS):
+        for r in range(4):
+            name = f"rec_{drv}_{r}.csv"
+            write_recording(data_dir / name, rng, d, brake_off=(r == 3))
+            rows.append((name, drv))
+    return data_dir, pd.DataFrame(rows, columns=["File", "Label"])
+
+
+@pytest.fixture(scope="session")
+def trained(recordings, tmp_path_factory):
+    """
+    Trainiert alle Modelle (Featuretools, 2 Folds) auf den Recordings 0, 1 und 3 jedes Fahrers.
+    Liefert (data_dir, artifacts_dir, Test-Labels, RunConfig); die Test-Labels enthalten
+    Recordings mit und ohne Bremsung.
+    """
+    from lib.core import config
+    from lib.core.train import train
+
+    data_dir, labels = recordings
+    artifacts_dir = tmp_path_factory.mktemp("artifacts")
+    cfg = config.current().replace(data_dir=data_dir, artifacts_dir=artifacts_dir, cache_dir=tmp_path_factory.mktemp("cache"),
+                                   feature_set="featuretools", cv_splits=2, plots="off", profile="off", use_grid_search=False)
+    rec = labels["File"].str.extract(r"_(\d)\.csv$")[0].astype(int)
+    train(labels=labels[rec != 2].reset_index(drop=True), cfg=cfg)
+    test_labels = labels[rec >= 2].reset_index(drop=True)
+    return data_dir, artifacts_dir, test_labels, cfg
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from lib.core.aggregate import aggregate_recordings, align_proba
+
+
+def _pandas_reference(proba, groups, y, classes):
+    """Bisherige Aggregation: groupby(sort=False), Mittelwert pro Klasse, erstes Soll-Label, argmax."""
+    pdf = pd.DataFrame(proba, columns=classes)
+    pdf["g"], pdf["y_true"] = groups, y
+    agg = pdf.groupby("g", sort=False).agg({**{c: "mean" for c in classes}, "y_true": "first"})
+    labels = [classes[np.argmax(agg.loc[g, classes].values)] for g in agg.index]
+    return agg, labels
+
+
+def test_aggregate_recordings_matches_pandas_groupby():
+    """Mittelwerte, Labels, Reihenfolge, Fensterzahl und Soll-Label wie die frühere pandas-Aggregation."""
+    rng = np.random.default_rng(0)
+    classes = ["anna", "bert", "carl"]
+    # Ungeordnete, wiederkehrende Recording-IDs mit unterschiedlich vielen Fenstern
+    groups = rng.choice([f"rec_{i}.csv" for i in range(40)], size=500)
+    y = np.array([classes[int(g[4:-4]) % 3] for g in groups], dtype=object)
+    proba = rng.dirichlet(np.ones(3), size=len(groups))
+
+    votes = aggregate_recordings(proba, groups, classes)
+    agg, labels = _pandas_reference(proba, groups, y, classes)
+
+    assert list(votes.recordings) == list(agg.index)
+    np.testing.assert_allclose(votes.proba, agg[classes].to_numpy(), rtol=1e-12)
+    assert list(votes.labels) == labels
+    assert list(y[votes.first_idx]) == list(agg["y_true"])
+    assert list(votes.n_windows) == list(pd.Series(groups).value_counts(sort=False).reindex(agg.index))
+    top = np.sort(agg[classes].to_numpy(), axis=1)
+    np.testing.assert_allclose(votes.margin, top[:, -1] - top[:, -2], rtol=1e-12)
+
+
+def test_align_proba_matches_previous_column_mapping():
+    """Klassen des Modells werden wie früher per Name auf die Klassenliste abgebildet, fehlende bleiben 0."""
+    rng = np.random.default_rng(1)
+    proba = rng.dirichlet(np.ones(2), size=5)
+    model_classes, classes = np.array(["carl", "anna"]), ["anna", "bert", "carl"]
+    expected = np.zeros((5, 3))
+    for j, cls in enumerate(model_classes):
+        expected[:, classes.index(str(cls))] = proba[:, j]
+    assert np.array_equal(align_proba(proba, model_classes, classes), expected)
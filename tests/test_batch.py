@@ -0,0 +1,26 @@
+import pandas as pd
+
+from lib.core import batch
+from lib.core.batch import predict_batch
+
+
+def test_failing_recording_only_affects_its_row(trained, tmp_path, monkeypatch):
+    """Schlägt die Feature-Extraktion für ein Recording fehl, werden die übrigen des Blocks einzeln vorhergesagt."""
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    extract = batch.extract_features
+
+    def _extract(recs, *args, **kwargs):
+        if any(p.endswith("rec_bert_2.csv") for p, _ in recs):
+            raise ValueError("defekt")
+        return extract(recs, *args, **kwargs)
+
+    monkeypatch.setattr(batch, "extract_features", _extract)
+    out = tmp_path / "batch.csv"
+    res = predict_batch(data_dir / "rec_*_2.csv", out, n_jobs=1, chunk_size=8, progress=None, cfg=cfg)
+    df = pd.read_csv(out)
+    assert res["n_recordings"] == 3 and res["n_errors"] == 1
+    failed = df[df["error"].notna()]
+    assert failed["recording"].tolist() == ["rec_bert_2.csv"] and failed["error"].tolist() == ["defekt"]
+    ok = df[df["error"].isna()]
+    assert sorted(ok["recording"].unique()) == ["rec_anna_2.csv", "rec_carl_2.csv"]
+    assert len(ok) == 2 * len(cfg.models)
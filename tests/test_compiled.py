@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from lib.core.compiled import compiled_path, load_compiled, save_compiled
+from lib.core.features import extract_features
+from lib.core.preprocess import assemble_pipeline, fit_preprocessing
+from lib.core.registry import get_compiled, get_metadata, get_model
+
+
+def test_compiled_export_matches_trained_pipelines(trained):
+    """Die beim Training geschriebenen model_*_arrays/ liefern bitgleich dieselben Wahrscheinlichkeiten wie die Pipelines."""
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    meta = get_metadata(artifacts_dir, cfg.models[0])
+    feat = extract_features([data_dir / f for f in test_labels["File"]], list(test_labels["Label"]),
+                            meta["feature_set"], cfg=cfg)
+    X = feat.reindex(columns=meta["feat_cols"])
+    X.iloc[::2, ::3] = np.nan  # fehlende Werte: Imputer bzw. Verzweigung für NaN
+    for m in cfg.models:
+        assert compiled_path(artifacts_dir, m).is_dir()
+        expected = get_model(artifacts_dir, m).pipe.predict_proba(X)
+        assert np.array_equal(get_compiled(artifacts_dir, m).predict_proba(X.to_numpy(dtype=float)), expected)
+
+
+@pytest.mark.parametrize("n_classes", [2, 3])
+@pytest.mark.parametrize("make_clf", [
+    lambda: LogisticRegression(max_iter=500),
+    lambda: RandomForestClassifier(n_estimators=15, max_depth=6, random_state=0),
+    lambda: GradientBoostingClassifier(n_estimators=20, max_depth=3, subsample=0.8, random_state=0),
+], ids=["logreg", "randomforest", "gradientboosting"])
+def test_compiled_predict_proba_is_bit_identical(tmp_path, make_clf, n_classes):
+    """Binär und mehrklassig, mit NaN und einer Spalte ganz ohne Trainingswerte: kein Unterschied zu sklearn."""
+    rng = np.random.default_rng(n_classes)
+    X = rng.normal(size=(120, 5))
+    y = np.array(["a", "b", "c"][:n_classes] * (120 // n_classes))
+    X[:, 1] += (y == "b") * 1.5
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[:, 4] = np.nan  # verwirft SimpleImputer
+    pre, Xt = fit_preprocessing(X)
+    pipe = assemble_pipeline(pre, make_clf().fit(Xt, y))
+
+    X_new = rng.normal(size=(60, 5))
+    X_new[rng.random(X_new.shape) < 0.1] = np.nan
+    path = tmp_path / "model_x_arrays"
+    assert save_compiled(path, pipe, [f"f{i}" for i in range(5)], "featuretools", X_check=X_new)
+    compiled = load_compiled(path)
+    assert list(compiled.classes_) == list(pipe.classes_)
+    assert np.array_equal(compiled.predict_proba(X_new), pipe.predict_proba(X_new))
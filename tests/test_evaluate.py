@@ -0,0 +1,51 @@
+import math
+
+import pandas as pd
+
+from lib.core import config
+from lib.core.evaluate import evaluate_splits, plan_splits
+from lib.core.predict import predict
+from lib.core.train import train
+
+
+def test_plan_splits_balanced_and_capped(recordings):
+    """Jeder Fahrer gibt n Train- und k Test-Recordings ab; max_splits begrenzt auf eine reproduzierbare Stichprobe."""
+    _, labels = recordings
+    all_splits = plan_splits(labels, k=1, train_sizes=[3], max_splits=None)
+    assert len(all_splits) == 4 ** 3
+    capped = plan_splits(labels, k=1, train_sizes=[1, 2], max_splits=10, random_state=3)
+    assert len(capped) == 2 * 10 and [s.split for s in capped] == list(range(1, 21))
+    for s in all_splits + capped:
+        n = len(s.train) // 3
+        assert s.train["Label"].value_counts().to_dict() == {d: n for d in ("anna", "bert", "carl")}
+        assert s.test["Label"].value_counts().to_dict() == {d: 1 for d in ("anna", "bert", "carl")}
+        assert not set(s.train["File"]) & set(s.test["File"])
+    key = [(tuple(s.train["File"]), tuple(s.test["File"])) for s in capped]
+    assert len(set(key[:10])) == len(set(key[10:])) == 10  # verschiedene Kombinationen pro Trainingsgröße
+    assert [(tuple(s.train["File"]), tuple(s.test["File"])) for s in
+            plan_splits(labels, k=1, train_sizes=[1, 2], max_splits=10, random_state=3)] == key
+    # Unterhalb der Grenze: alle Kombinationen, keine Stichprobe
+    total = math.comb(4, 1) * math.comb(3, 1)
+    assert len(plan_splits(labels, k=1, train_sizes=[1], max_splits=total ** 3)) == total ** 3
+
+
+def test_evaluate_splits_matches_train_and_predict(recordings, tmp_path):
+    """Pro Split liefert evaluate_splits dasselbe Ergebnis wie train() + predict() (test.py --full-pipeline)."""
+    data_dir, labels = recordings
+    cfg = config.current().replace(data_dir=data_dir, cache_dir=tmp_path / "cache", feature_set="featuretools",
+                                   cv_splits=2, n_jobs=1, plots="off", profile="off", use_grid_search=False)
+    splits = plan_splits(labels, k=1, train_sizes=[2], max_splits=3, random_state=1)
+    engine = evaluate_splits(splits, cfg=cfg)
+    assert (engine["accuracy"] < 1).any()  # Fehlklassifikationen: Vergleich nicht nur bei perfekter Accuracy
+
+    for s in splits:
+        art = tmp_path / f"split_{s.split}"
+        run = cfg.replace(artifacts_dir=art)
+        train(labels=s.train, cfg=run)
+        predict(test_labels_file=s.test, use_cache=False, cfg=run)
+        rows = engine[engine["split"] == s.split].set_index("model")
+        for mdl in cfg.models:
+            res = pd.read_csv(art / f"test_ergebnis_{mdl}.csv")
+            assert rows.loc[mdl, "n_test_samples"] == len(res)
+            assert rows.loc[mdl, "n_correct"] == res["korrekt"].sum()
+            assert rows.loc[mdl, "n_train_recordings"] == len(s.train)
@@ -0,0 +1,54 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from lib.core import train as train_module
+from lib.core.folds import FOLD_PLAN_FILE, FoldPlan
+
+
+def _data():
+    rng = np.random.default_rng(0)
+    groups = np.repeat([f"r{i}" for i in range(12)], 5)
+    y = np.repeat(["a", "b", "c"] * 4, 5)
+    return rng.normal(size=(len(y), 3)), y, groups
+
+
+def test_saved_plan_is_reused_only_for_the_same_data(tmp_path, monkeypatch):
+    """Ein gespeicherter Plan wird für dieselben Daten und Parameter geladen, sonst neu berechnet."""
+    X, y, groups = _data()
+    plan = FoldPlan.create(X, y, groups, 3, 7)
+    path = plan.save(tmp_path / FOLD_PLAN_FILE)
+    created = []
+    create = FoldPlan.create.__func__
+    monkeypatch.setattr(FoldPlan, "create", classmethod(lambda cls, *a: created.append(a[3:]) or create(cls, *a)))
+
+    loaded = FoldPlan.load_or_create(path, X, y, groups, 3, 7)
+    assert not created and loaded.fingerprint() == plan.fingerprint()
+    for a, b in zip(loaded.splits, plan.splits):
+        assert all(np.array_equal(u, v) for u, v in zip(a, b))
+
+    FoldPlan.load_or_create(path, X, y, groups, 2, 7)
+    FoldPlan.load_or_create(path, X, y[::-1], groups, 3, 7)
+    assert created == [(2, 7), (3, 7)]
+    with pytest.raises(ValueError):
+        FoldPlan.load(path, X, y, groups[::-1])
+
+
+def test_retraining_reloads_the_fold_plan(recordings, trained, tmp_path, monkeypatch):
+    """train() speichert fold_plan.npz; erneutes Training auf denselben Daten führt StratifiedGroupKFold nicht erneut aus."""
+    _, labels = recordings
+    data_dir, artifacts_dir, _, cfg = trained
+    assert (artifacts_dir / FOLD_PLAN_FILE).exists()
+    art = tmp_path / "artifacts"
+    shutil.copytree(artifacts_dir, art)
+
+    def _no_split(*args, **kwargs):
+        raise AssertionError("Splits neu berechnet")
+
+    monkeypatch.setattr(FoldPlan, "create", _no_split)
+    rec = labels["File"].str.extract(r"_(\d)\.csv$")[0].astype(int)
+    train_module.train(data_dir, labels[rec != 2].reset_index(drop=True), art, cfg=cfg.replace(models=("logreg",)))
+    with np.load(art / FOLD_PLAN_FILE) as new, np.load(artifacts_dir / FOLD_PLAN_FILE) as old:
+        assert sorted(new.files) == sorted(old.files)
+        assert all(np.array_equal(new[k], old[k]) for k in old.files)
@@ -0,0 +1,142 @@
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from lib.core import cache, config, optimize
+from lib.core.cache import load_json, save_json
+from lib.core.optimize import run_grid_search
+from lib.core.train import make_classifier
+
+
+def test_tuned_classifier_uses_run_seed():
+    """Mit Suchergebnis gebaute Modelle übernehmen den Seed des Laufs, nicht config.RANDOM_STATE."""
+    clf = make_classifier("randomforest", 7, {"clf__n_estimators": 10})
+    assert clf.random_state == 7 and clf.n_estimators == 10
+
+
+def test_grid_search_uses_cfg_seed(tmp_path):
+    """Die Suche baut base_params aus cfg.random_state; der Seed steht im Cache-Schlüssel."""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(24, 2)))
+    y = pd.Series(["a", "b"] * 12)
+    groups = np.repeat(np.arange(12), 2)
+    cfg = config.current().replace(random_state=7, cv_splits=2, n_jobs=1, search_strategy="grid", cache_dir=tmp_path)
+    run_grid_search(X, y, groups, "logreg", param_grid_override={"clf__C": [1.0]}, cfg=cfg)
+    (cache_file,) = (tmp_path / "search").iterdir()
+    assert [json.loads(k)["random_state"] for k in load_json(cache_file)] == [7]
+
+
+def test_save_json_concurrent_threads(tmp_path):
+    """Gleichzeitige Schreiber im selben Prozess überschreiben sich nicht gegenseitig die Temp-Datei."""
+    path = tmp_path / "x.json"
+    threads = [threading.Thread(target=save_json, args=(path, {"i": i})) for i in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert load_json(path)["i"] in range(32)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_search_writes_are_batched(tmp_path, monkeypatch):
+    """Zwischenstand und Cache werden alle FLUSH_EVERY Ergebnisse und am Ende geschrieben, nicht pro Aufgabe."""
+    writes = []
+    for mod in (optimize, cache):
+        monkeypatch.setattr(mod, "save_json", lambda path, data, _save=mod.save_json: writes.append(path.name) or _save(path, data))
+    monkeypatch.setattr(optimize, "FLUSH_EVERY", 3)
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(24, 2)))
+    y = pd.Series(["a", "b"] * 12)
+    groups = np.repeat(np.arange(12), 2)
+    cfg = config.current().replace(cv_splits=2, n_jobs=1, search_strategy="grid", cache_dir=tmp_path)
+    results_path = tmp_path / "optimize_results.json"
+    run_grid_search(X, y, groups, "logreg", param_grid_override={"clf__C": [0.1, 1.0, 10.0, 100.0]},
+                    results_path=results_path, cfg=cfg)
+    # 8 Aufgaben: Schreiben nach 3 und 6 Ergebnissen sowie am Ende
+    assert writes.count("optimize_results.json") == 3
+    assert len(writes) == 6
+    assert load_json(results_path)["logreg"]["status"] == "done"
+    (cache_file,) = (tmp_path / "search").iterdir()
+    assert sum(len(v) for v in load_json(cache_file).values()) == 8
+
+
+def test_training_search_results_stay_visible(recordings, tmp_path, monkeypatch):
+    """Der Zwischenstand der Suche liegt während des Trainings in artifacts_dir; am Ende kommt die Zusammenfassung hinzu."""
+    from lib.core import train as train_module
+
+    data_dir, labels = recordings
+    art = tmp_path / "artifacts"
+    seen = []
+    write = optimize._write_partial_results
+    monkeypatch.setattr(optimize, "_write_partial_results", lambda path, *a: seen.append(path.parent) or write(path, *a))
+    cfg = config.current().replace(cache_dir=tmp_path / "cache", feature_set="featuretools", cv_splits=2, n_jobs=1,
+                                   models=("logreg",), plots="off", profile="off", search_strategy="grid")
+    train_module.train(data_dir, labels, art, use_grid_search=True, cfg=cfg)
+    assert seen and set(seen) == {art}
+    res = load_json(art / "optimize_results.json")["logreg"]
+    assert res["status"] == "done" and len(res["results"]) == 2
+    assert res["best_params"] in [r["params"] for r in res["results"]] and res["n_evaluated"] == 2
+
+
+def _search_fixture(tmp_path):
+    rng = np.random.default_rng(0)
+    groups = np.repeat(np.arange(24), 2)
+    X = pd.DataFrame(rng.normal(size=(48, 2)))
+    y = pd.Series(np.where(groups % 2, "a", "b"))
+    cfg = config.current().replace(cv_splits=4, n_jobs=1, cache_dir=tmp_path / "cache", artifacts_dir=tmp_path)
+    return X, y, groups, cfg
+
+
+def test_halving_and_random_keep_best_candidates(tmp_path, monkeypatch):
+    """
+    Halving findet mit weniger Aufgaben denselben Besten wie grid; random liefert den Besten
+    seiner Stichprobe, und derselbe Seed ergibt dieselbe Stichprobe und dasselbe Ergebnis.
+    """
+    grid = {"clf__C": [0.001, 0.01, 0.1, 1.0, 10.0, 100.0, 1000.0, 10000.0]}
+    evaluated = []
+
+    def _score(ci, fi, params, state=None):
+        # Deterministischer Score: am besten bei C = 10, kleine Fold-Abhängigkeit
+        evaluated.append((params["clf__C"], fi))
+        return ci, fi, 1.0 / (1.0 + abs(np.log10(params["clf__C"]) - 1.0)) - 0.01 * fi
+
+    monkeypatch.setattr(optimize, "_score_task", _score)
+    X, y, groups, cfg = _search_fixture(tmp_path)
+
+    def _run(strategy, **kw):
+        evaluated.clear()
+        res = run_grid_search(X, y, groups, "logreg", param_grid_override=grid, search_strategy=strategy,
+                              use_cache=False, cfg=cfg, **kw)
+        return res, list(evaluated)
+
+    (best, score, _), n_grid = _run("grid")
+    assert best == {"clf__C": 10.0}
+    (h_best, h_score, h_results), n_halving = _run("halving")
+    assert (h_best, h_score) == (best, score)
+    assert len(n_halving) < len(n_grid) == len(grid["clf__C"]) * 4
+    assert [r["params"] for r in h_results if len(r["scores"]) == 4] == [best]
+
+    (r_best, r_score, r_results), sample = _run("random", n_iter=3, random_state=1)
+    assert len(r_results) == 3
+    assert r_score == max(r["mean_score"] for r in r_results) and r_best in [r["params"] for r in r_results]
+    assert _run("random", n_iter=3, random_state=1) == ((r_best, r_score, r_results), sample)
+    assert {c for c, _ in _run("random", n_iter=3, random_state=2)[1]} != {c for c, _ in sample}
+
+
+def test_extended_grid_fits_only_new_combinations(tmp_path, monkeypatch):
+    """Ein erweitertes Grid übernimmt bewertete (Kombination, Fold)-Paare aus dem Cache und trainiert nur die neuen."""
+    fitted = []
+    score = optimize._score_task
+    monkeypatch.setattr(optimize, "_score_task", lambda ci, fi, params, state=None: fitted.append(
+        (params["clf__C"], fi)) or score(ci, fi, params, state=state))
+    X, y, groups, cfg = _search_fixture(tmp_path)
+    cfg = cfg.replace(search_strategy="grid")
+
+    _, _, first = run_grid_search(X, y, groups, "logreg", param_grid_override={"clf__C": [0.1, 1.0]}, cfg=cfg)
+    assert len(fitted) == 8
+    fitted.clear()
+    _, _, second = run_grid_search(X, y, groups, "logreg", param_grid_override={"clf__C": [0.1, 1.0, 10.0]}, cfg=cfg)
+    assert sorted(fitted) == [(10.0, fi) for fi in range(4)]
+    assert second[:2] == first
@@ -0,0 +1,27 @@
+from lib.core import plots
+from lib.core.cache import load_json
+
+
+def test_unchanged_plot_is_not_rendered_again(tmp_path, monkeypatch):
+    """Gleicher Fingerprint: kein neues Rendern; geänderte Daten oder ein fehlendes PNG werden neu gezeichnet."""
+    rendered = []
+    render = plots.render_figure
+    monkeypatch.setattr(plots, "render_figure", lambda payload, *a, **kw: rendered.append(payload) or render(payload, *a, **kw))
+
+    path = plots.plot_accuracy({"logreg": 0.5, "randomforest": 0.75}, tmp_path, mode="sync")
+    stamp = path.stat().st_mtime_ns
+    assert len(rendered) == 1
+    index = load_json(tmp_path / "plots" / "index.json")
+    assert set(index) == {"accuracy/accuracy_models.png", "data/accuracy_models.json"}
+
+    for mode in ("sync", "deferred"):
+        assert plots.plot_accuracy({"logreg": 0.5, "randomforest": 0.75}, tmp_path, mode=mode) == path
+    assert plots.wait_for_plots(timeout=30, out_dir=tmp_path)
+    assert len(rendered) == 1 and path.stat().st_mtime_ns == stamp
+    assert load_json(tmp_path / "plots" / "index.json") == index
+
+    plots.plot_accuracy({"logreg": 0.5, "randomforest": 0.8}, tmp_path, mode="sync")
+    assert len(rendered) == 2
+    path.unlink()
+    plots.plot_accuracy({"logreg": 0.5, "randomforest": 0.8}, tmp_path, mode="sync")
+    assert len(rendered) == 3 and path.exists()
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from lib.core.predict import predict
+
+
+def _results(artifacts_dir, models):
+    return {mdl: pd.read_csv(artifacts_dir / f"test_ergebnis_{mdl}.csv")[["recording", "soll", "ist", "korrekt", "margin"]] for mdl in models}
+
+
+def test_early_exit_without_exit_matches_predict(trained):
+    """Early Exit mit unerreichbarer Margin liest alle Fenster und liefert exakt das Ergebnis von predict()."""
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    predict(test_labels_file=test_labels, use_cache=False, cfg=cfg.replace(early_exit=False))
+    full = _results(artifacts_dir, cfg.models)
+    predict(test_labels_file=test_labels, use_cache=False, cfg=cfg.replace(early_exit=True, early_exit_margin=float("inf")))
+    early = pd.read_csv(artifacts_dir / f"test_ergebnis_{cfg.models[0]}.csv")
+    assert (early["n_windows"] == early["n_windows_total"]).all()
+    for mdl, df in _results(artifacts_dir, cfg.models).items():
+        pd.testing.assert_frame_equal(df.drop(columns="margin"), full[mdl].drop(columns="margin"))
+        # Gemittelte Wahrscheinlichkeiten gleich (nicht nur das Label), auch für Recordings ohne Bremsung.
+        # Toleranz: window_features stimmt nur bis auf Rundung (~1e-7) mit extract_features überein,
+        # die Logistische Regression verstärkt das auf ~5e-5. Eine NaN-Kurtosis für die Recordings
+        # ohne Bremsung verschiebt die Margin um ~7e-4.
+        np.testing.assert_allclose(df["margin"], full[mdl]["margin"], atol=1e-4)
+
+
+def test_blockwise_early_exit_stops_at_first_confident_window(trained):
+    """Die blockweise Auswertung liest pro Modell genau die Fenster bis zum ersten, nach dem die Margin erreicht ist."""
+    from lib.core.aggregate import aggregate_recordings
+    from lib.core.data import find_windows, load_recording
+    from lib.core.predict import EARLY_EXIT_BLOCK, _predict_early_exit
+    from lib.core.registry import get_metadata, get_model
+    from lib.core.window_features import window_features
+
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    cfg = cfg.replace(window_sec=8, step_sec=2, min_points=300)  # Kurze Fenster: mehrere Blöcke pro Recording
+    paths = [data_dir / f for f in test_labels["File"]]
+    meta = get_metadata(artifacts_dir, cfg.models[0])
+    full = {}
+    for p in paths:
+        _, d = load_recording(p)
+        wins = find_windows(d["t"], cfg=cfg)
+        assert len(wins) > EARLY_EXIT_BLOCK
+        X = pd.DataFrame([[f[c] for c in meta["feat_cols"]] for f in
+                          (window_features(d, i0, i1, meta["feature_set"], cfg=cfg) for i0, i1, _, _ in wins)], columns=meta["feat_cols"])
+        full[p] = {m: get_model(artifacts_dir, m).pipe.predict_proba(X) for m in cfg.models}
+
+    exits = set()
+    for margin in (0.25, 0.31, 0.9, 0.95):
+        res = _predict_early_exit(paths, list(test_labels["Label"]), artifacts_dir, margin=margin, min_windows=2, cfg=cfg)
+        for mdl in cfg.models:
+            for p, row in zip(paths, res[mdl]):
+                proba = full[p][mdl]
+                margins = [aggregate_recordings(proba[:n], np.zeros(n), list(range(proba.shape[1]))).margin[0] for n in range(1, len(proba) + 1)]
+                expected = next((n for n in range(2, len(proba) + 1) if margins[n - 1] > margin), len(proba))
+                assert row["n_windows"] == expected
+                np.testing.assert_allclose(row["margin"], margins[expected - 1], atol=1e-6)
+                exits.add((expected, len(proba)))
+    # Abbruch im ersten Block, in einem späteren Block und ohne Abbruch
+    assert any(n < EARLY_EXIT_BLOCK for n, _ in exits) and any(EARLY_EXIT_BLOCK < n < total for n, total in exits)
+    assert any(n == total for n, total in exits)
+
+
+def test_prediction_cache_hit_and_invalidated_by_retraining(recordings, trained, tmp_path, monkeypatch):
+    """Ein zweiter Lauf auf unveränderten Dateien extrahiert keine Features; nach neuem Training wird neu gerechnet."""
+    import shutil
+
+    from lib.core import predict as predict_module
+    from lib.core.train import train
+
+    _, labels = recordings
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    art = tmp_path / "artifacts"
+    shutil.copytree(artifacts_dir, art)
+    cfg = cfg.replace(artifacts_dir=art, cache_dir=tmp_path / "cache")
+    extracted = []
+    extract = predict_module.extract_features
+    monkeypatch.setattr(predict_module, "extract_features", lambda recs, *a, **kw: extracted.append(len(recs)) or extract(recs, *a, **kw))
+
+    predict(test_labels_file=test_labels, cfg=cfg)
+    first = _results(art, cfg.models)
+    predict(test_labels_file=test_labels, cfg=cfg)
+    assert extracted == [len(test_labels)]
+    for mdl, df in _results(art, cfg.models).items():
+        pd.testing.assert_frame_equal(df, first[mdl])
+
+    rec = labels["File"].str.extract(r"_(\d)\.csv$")[0].astype(int)
+    train(labels=labels[rec != 2].reset_index(drop=True), cfg=cfg.replace(random_state=1))
+    predict(test_labels_file=test_labels, cfg=cfg)
+    assert extracted == [len(test_labels)] * 2
@@ -0,0 +1,34 @@
+from lib.core import progress
+from lib.core.cache import load_json
+from lib.core.progress import ProgressStage, write_progress
+
+
+def test_progress_bus_coalesces_and_delivers_phase_changes(tmp_path, monkeypatch):
+    """
+    Viele Meldungen einer Phase werden zum neuesten Stand zusammengefasst; Phasenwechsel
+    gehen sofort raus, und nach "done" liegt der Endstand atomar in der Datei.
+    """
+    monkeypatch.setattr(progress, "FILE_INTERVAL", 60.0)
+    monkeypatch.setattr(progress, "CALLBACK_INTERVAL", 60.0)
+    path = tmp_path / "pipeline_progress.json"
+    writes, calls = [], []
+    save = progress.save_json
+    monkeypatch.setattr(progress, "save_json", lambda p, data: (writes.append(data["phase"]) if p == path else None) or save(p, data))
+
+    def callback(phase, total, completed, in_progress, message, remaining, percent):
+        calls.append((phase, percent))
+
+    stage = ProgressStage(tmp_path, "extraction", 200, "Recordings", callback)
+    for i in range(200):
+        stage.advance(1, "Extraktion")
+    assert progress.flush_progress(timeout=10)
+    assert writes == ["extraction", "extraction"] and calls == [("extraction", 0.5), ("extraction", 100.0)]
+    assert load_json(path)["done"] == 200
+
+    write_progress(tmp_path, "training", total=2, completed=["logreg"], callback=callback)
+    write_progress(tmp_path, "training", total=2, completed=["logreg", "randomforest"], callback=callback)
+    write_progress(tmp_path, "done", total=2, completed=["logreg", "randomforest"], message="Fertig", callback=callback)
+    # Der zweite Trainings-Stand wird vom Endstand überholt und nie einzeln zugestellt
+    assert writes[2:] == ["training", "done"] and calls[2:] == [("training", 50.0), ("done", 100.0)]
+    assert load_json(path)["message"] == "Fertig"
+    assert [p.name for p in tmp_path.iterdir()] == ["pipeline_progress.json"]
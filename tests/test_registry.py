@@ -0,0 +1,69 @@
+import threading
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+
+from lib.core import registry
+from lib.core.preprocess import assemble_pipeline, fit_preprocessing
+from lib.core.compiled import compiled_path, save_compiled
+from lib.core.registry import ModelArtifact, get_compiled, get_model, save_model
+
+
+def _pipe(seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(40, 3))
+    y = np.array(["a", "b"] * 20)
+    pre, Xt = fit_preprocessing(X)
+    return assemble_pipeline(pre, LogisticRegression().fit(Xt, y)), X
+
+
+def _run_threads(target, n=8):
+    errors = []
+
+    def _run(i):
+        try:
+            target(i)
+        except Exception as e:  # pragma: no cover - nur bei Fehlern
+            errors.append(e)
+    threads = [threading.Thread(target=_run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_concurrent_saves_do_not_share_temp_files(tmp_path):
+    """Gleichzeitige save_model/save_compiled im selben Prozess: gültige Dateien, keine Temp-Reste."""
+    pipes = [_pipe(i) for i in range(8)]
+
+    def _save(i):
+        pipe, X = pipes[i]
+        save_model(tmp_path, "logreg", ModelArtifact(pipe, ["a", "b", "c"], "featuretools"), {"run": i})
+        assert save_compiled(compiled_path(tmp_path, "logreg"), pipe, ["a", "b", "c"], "featuretools", X_check=X)
+
+    assert _run_threads(_save) == []
+    registry.clear()
+    art = get_model(tmp_path, "logreg")
+    assert any(art.pipe.named_steps["clf"].coef_.tolist() == p.named_steps["clf"].coef_.tolist() for p, _ in pipes)
+    assert get_compiled(tmp_path, "logreg").predict_proba(pipes[0][1]).shape == (40, 2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["model_logreg.joblib", "model_logreg.json", "model_logreg_arrays"]
+
+
+def test_trained_models_registered_at_final_path(recordings, tmp_path, monkeypatch):
+    """Nach dem Training liefert get_model() das Modell ohne erneutes Laden; keine Einträge mit Staging-Pfad."""
+    from lib.core import config
+    from lib.core.train import train
+
+    data_dir, labels = recordings
+    cfg = config.current().replace(cache_dir=tmp_path / "cache", feature_set="featuretools", cv_splits=2,
+                                   models=("logreg",), plots="off", profile="off", use_grid_search=False)
+    registry.clear()
+    train(data_dir, labels, tmp_path / "art", cfg=cfg)
+
+    def _no_load(*args, **kwargs):
+        raise AssertionError("Modell erneut deserialisiert")
+
+    monkeypatch.setattr(registry.joblib, "load", _no_load)
+    assert get_model(tmp_path / "art", "logreg").feat_cols
+    assert list(registry._cache) == [str((tmp_path / "art" / "model_logreg.joblib").resolve())]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from lib.core import config, plots
+from lib.core.data import find_windows, load_recording
+from lib.core.server import PredictionService
+from lib.core.stream import StreamingPredictor
+
+
+def test_service_uses_its_run_config(recordings, trained):
+    """Zwei Dienste mit verschiedenen RunConfigs im selben Prozess: jeder nutzt seine Fensterparameter."""
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    path = str(data_dir / test_labels["File"][0])
+    default = PredictionService(cfg=cfg)
+    strict = PredictionService(cfg=cfg.replace(min_points=10 ** 6))  # kein Fenster erreicht die Mindestpunkte
+    assert all(len(default._process([([load_recording(path)], [""], None)])[0][m]) == 1 for m in cfg.models)
+    assert strict._process([([load_recording(path)], [""], None)]) == [{m: [] for m in cfg.models}]
+
+
+def test_stream_window_parameters_from_cfg(recordings, trained):
+    """StreamingPredictor übernimmt Fensterlänge und Schrittweite aus cfg statt aus den globalen Werten."""
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    run = cfg.replace(window_sec=cfg.window_sec * 2, step_sec=cfg.step_sec * 2)
+    sp = StreamingPredictor(cfg=run)
+    assert (sp.window_sec, sp.step_sec) == (run.window_sec, run.step_sec) != (config.WINDOW_SEC, config.STEP_SEC)
+    _, d = load_recording(data_dir / test_labels["File"][0])
+    sp.push_many(d)
+    assert sp.n_windows == len(find_windows(d["t"], cfg=run)) < len(find_windows(d["t"], cfg=cfg))
+
+
+def test_plot_mode_from_cfg(tmp_path):
+    """Ohne mode entscheidet cfg.plots, nicht config.PLOTS."""
+    cfg = config.current().replace(plots="data")
+    path = plots.plot_accuracy({"logreg": 0.5}, tmp_path, cfg=cfg)
+    assert path == tmp_path / "plots" / "data" / "accuracy_models.json" and path.exists()
+    assert plots.plot_accuracy({"logreg": 0.5}, tmp_path, cfg=cfg.replace(plots="off")) is None
+
+
+def test_service_fails_only_the_bad_request(recordings, trained):
+    """Ein fehlerhaftes Recording im Batch lässt nur seine Anfrage scheitern, die übrigen werden beantwortet."""
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    service = PredictionService(cfg=cfg)
+    good = load_recording(data_dir / test_labels["File"][0])
+    name, d = good
+    bad = ("kaputt", {**d, "speed": d["speed"][:100]})  # Fenster gültig, Feature-Extraktion scheitert
+    results = service._process([([good], ["anna"], None), ([bad], [""], None), ([good], ["anna"], None)])
+    assert isinstance(results[1], Exception)
+    assert results[0] == results[2] == service._process([([good], ["anna"], None)])[0]
+    assert all(len(results[0][m]) == 1 for m in cfg.models)
+
+    service = PredictionService(batch_window_ms=500, cfg=cfg).start()
+    try:
+        futs = [service.submit([r]) for r in (good, bad, good)]
+        assert futs[1].exception(timeout=60) is not None
+        assert futs[0].result(timeout=60) == futs[2].result(timeout=60) != {}
+    finally:
+        service.stop()
@@ -0,0 +1,56 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lib.core import config, evaluate
+from lib.core.evaluate import Split, evaluate_splits
+from lib.core.shared import SharedDataset
+
+from conftest import write_recording
+
+
+def _names(handle):
+    return [spec[0] for spec in (handle.X, handle.y, handle.groups)]
+
+
+def _assert_unlinked(names):
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_shared_dataset_unlinks_on_exit_and_error():
+    """Die Segmente werden beim Verlassen des Kontextmanagers entfernt, auch nach einer Exception."""
+    X = np.arange(12, dtype=float).reshape(4, 3)
+    y, groups = np.array(["a", "b", "a", "b"]), np.array(["r1", "r1", "r2", "r3"])
+    with SharedDataset.create(X, y, groups) as ds:
+        names = _names(ds.handle)
+        view = SharedDataset.attach(ds.handle)
+        assert np.array_equal(view.X, X) and list(view.y) == list(y) and list(view.groups) == list(groups)
+        view.close()
+    _assert_unlinked(names)
+
+    with pytest.raises(RuntimeError):
+        with SharedDataset.create(X, y, groups) as ds:
+            names = _names(ds.handle)
+            raise RuntimeError("Abbruch")
+    _assert_unlinked(names)
+
+
+def test_evaluate_splits_unlinks_after_worker_error(recordings, tmp_path, monkeypatch):
+    """Scheitert ein Split im Worker-Prozess, werden die Segmente trotzdem freigegeben."""
+    data_dir, labels = recordings
+    short = write_recording(tmp_path / "rec_kurz.csv", np.random.default_rng(0), 0, n=200)  # kein gültiges Fenster
+    created = []
+    create = SharedDataset.create
+    monkeypatch.setattr(evaluate.SharedDataset, "create", lambda *a: created.append(create(*a)) or created[-1])
+    cfg = config.current().replace(data_dir=data_dir, cache_dir=tmp_path / "cache", feature_set="featuretools",
+                                   n_jobs=2, plots="off", profile="off")
+    ok = Split(1, labels[labels["File"].str.endswith(("_0.csv", "_1.csv"))], labels[labels["File"].str.endswith("_2.csv")])
+    bad = Split(2, pd.DataFrame({"File": [str(short)], "Label": ["anna"]}), ok.test)
+    with pytest.raises(ValueError, match="keine Trainingsfenster"):
+        evaluate_splits([ok, bad], cfg=cfg)
+    assert len(created) == 1
+    _assert_unlinked(_names(created[0].handle))
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from lib.core import plots
+from lib.core import train as train_module
+from lib.core.backend_adapter import train as adapter_train
+from lib.core.cancel import CancelToken
+from lib.core.cache import load_json, save_json
+from lib.core.registry import save_model
+from lib.core.staging import STAGING_PREFIX, staged_output
+
+
+def _snapshot(d: Path) -> dict:
+    return {str(p.relative_to(d)): hashlib.sha256(p.read_bytes()).hexdigest() for p in d.rglob("*") if p.is_file()}
+
+
+def test_staged_output_moves_files_and_merges_plot_index(tmp_path):
+    """Neue Dateien landen erst am Ende im Ziel; unveränderte Grafiken und fremde Index-Einträge bleiben."""
+    (tmp_path / "plots" / "importance").mkdir(parents=True)
+    (tmp_path / "plots" / "importance" / "alt.png").write_bytes(b"alt")
+    save_json(tmp_path / "plots" / "index.json", {"importance/alt.png": "fp-alt"})
+    with staged_output(tmp_path) as out:
+        (out / "model_x.joblib").write_bytes(b"neu")
+        (out / "plots" / "confusion").mkdir()
+        (out / "plots" / "confusion" / "neu.png").write_bytes(b"png")
+        save_json(out / "plots" / "index.json", {**load_json(out / "plots" / "index.json"), "confusion/neu.png": "fp-neu"})
+        save_json(tmp_path / "plots" / "index.json", {"importance/alt.png": "fp-alt", "accuracy/parallel.png": "fp-p"})
+        assert not (tmp_path / "model_x.joblib").exists()
+    assert (tmp_path / "model_x.joblib").read_bytes() == b"neu"
+    assert (tmp_path / "plots" / "importance" / "alt.png").read_bytes() == b"alt"
+    assert load_json(tmp_path / "plots" / "index.json") == {
+        "importance/alt.png": "fp-alt", "accuracy/parallel.png": "fp-p", "confusion/neu.png": "fp-neu"}
+    assert not list(tmp_path.glob(f"{STAGING_PREFIX}*"))
+
+
+def test_staged_output_discards_on_error(tmp_path):
+    """Bei einer Exception bleibt das Ziel unverändert, der Staging-Ordner wird gelöscht."""
+    (tmp_path / "model_x.joblib").write_bytes(b"alt")
+    with pytest.raises(RuntimeError):
+        with staged_output(tmp_path) as out:
+            (out / "model_x.joblib").write_bytes(b"halb")
+            raise RuntimeError("Abbruch")
+    assert (tmp_path / "model_x.joblib").read_bytes() == b"alt"
+    assert not list(tmp_path.glob(f"{STAGING_PREFIX}*"))
+
+
+def test_discard_plots_keeps_other_runs(tmp_path):
+    """discard_plots(out_dir=...) verwirft nur die Render-Aufträge dieses Laufs."""
+    a, b = tmp_path / "a", tmp_path / "b"
+    with plots._lock:
+        plots._jobs.extend([({}, a / "plots" / "x" / "1.png", "fp"), ({}, b / "plots" / "x" / "2.png", "fp")])
+    try:
+        assert plots.discard_plots(timeout=0, out_dir=a)
+        assert [job[1] for job in plots._jobs] == [b / "plots" / "x" / "2.png"]
+    finally:
+        with plots._lock:
+            plots._jobs.clear()
+
+
+def test_cancelled_training_keeps_previous_models(recordings, trained, tmp_path, monkeypatch):
+    """Ein nach dem ersten gespeicherten Modell abgebrochenes Training lässt die vorhandenen Artefakte unverändert."""
+    _, labels = recordings
+    data_dir, artifacts_dir, _, cfg = trained
+    art = tmp_path / "artifacts"
+    shutil.copytree(artifacts_dir, art)
+    before = _snapshot(art)
+    token = CancelToken()
+    saved = []
+
+    def _save_then_cancel(out_dir, *args, **kwargs):
+        saved.append(Path(out_dir))
+        token.cancel()
+        return save_model(out_dir, *args, **kwargs)
+
+    monkeypatch.setattr(train_module, "save_model", _save_then_cancel)
+    ok, msg = adapter_train(data_dir, labels, art, cancel_token=token, cfg=cfg)
+    assert (ok, msg) == (False, "Abgebrochen")
+    assert [p.name.startswith(STAGING_PREFIX) for p in saved] == [True]
+    after = _snapshot(art)
+    for name in ("pipeline_progress.json", "profile.json"):
+        before.pop(name, None)
+        after.pop(name, None)
+    assert after == before
+    assert not [d for d in os.listdir(art) if d.startswith(STAGING_PREFIX)]
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lib.core import stream
+from lib.core.aggregate import align_proba
+from lib.core.data import find_windows, load_recording
+from lib.core.registry import get_metadata, get_model
+from lib.core.stream import StreamingPredictor
+from lib.core.window_features import window_features
+
+
+def _expected(d, artifacts_dir, models, run):
+    """Recording-Mittelwert der Fenster-Wahrscheinlichkeiten, jedes Fenster komplett neu berechnet."""
+    meta = get_metadata(artifacts_dir, models[0])
+    wins = find_windows(d["t"], cfg=run)
+    x = pd.DataFrame([[f.get(c, np.nan) for c in meta["feat_cols"]] for f in
+                      (window_features(d, i0, i1, meta["feature_set"], cfg=run) for i0, i1, _, _ in wins)],
+                     columns=meta["feat_cols"])
+    out = {}
+    for m in models:
+        pipe = get_model(artifacts_dir, m).pipe
+        classes = pipe.named_steps["clf"].classes_
+        out[m] = align_proba(pipe.predict_proba(x), classes, [str(c) for c in classes]).mean(axis=0)
+    return len(wins), out
+
+
+@pytest.mark.parametrize("max_rate_hz", [stream.MAX_RATE_HZ, 10])
+def test_ring_buffer_and_running_sums_match_full_recomputation(recordings, trained, monkeypatch, capsys, max_rate_hz):
+    """
+    Ring-Puffer und laufende Summen liefern dieselbe Schätzung wie die Neuberechnung jedes
+    Fensters – bei Blöcken beliebiger Größe, über Puffer-Umbrüche und Neu-Summierungen hinweg.
+    Der Puffer wird nur bei zu niedrig angesetzter Abtastrate (mit Warnung) vergrößert.
+    """
+    monkeypatch.setattr(stream, "RESYNC_WINDOWS", 5)
+    data_dir, artifacts_dir, test_labels, cfg = trained
+    run = cfg.replace(window_sec=8, step_sec=2)  # 400 Punkte pro Fenster: Featuretools-Teil ohne Resampling
+    sp = StreamingPredictor(cfg=run, max_rate_hz=max_rate_hz)
+    rng = np.random.default_rng(1)
+    for f in test_labels["File"]:
+        _, d = load_recording(data_dir / f)
+        sp.reset()
+        cuts = np.sort(rng.choice(np.arange(1, len(d["t"])), 40, replace=False))
+        for a, b in zip(np.concatenate(([0], cuts)), np.concatenate((cuts, [len(d["t"])]))):
+            sp.push_many({c: v[a:b] for c, v in d.items()})
+        n, expected = _expected(d, artifacts_dir, cfg.models, run)
+        est = sp.estimate()
+        assert n > 2 * stream.RESYNC_WINDOWS and all(e["n_windows"] == n for e in est.values())
+        for m in cfg.models:
+            np.testing.assert_allclose(list(est[m]["proba"].values()), expected[m], rtol=1e-7, atol=1e-9)
+    grown = "Ring-Puffer wird vergrößert" in capsys.readouterr().out
+    assert grown == (max_rate_hz < 50)
+    if not grown:
+        assert sp._buf.capacity == sp.capacity == int(np.ceil(run.window_sec * max_rate_hz)) + 1
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from lib.core import config
+from lib.core.data import find_windows, load_recording
+from lib.core.features import extract_features
+from lib.core.window_features import window_features
+
+
+@pytest.mark.parametrize("feature_set", ["featuretools", "tsfresh", "both"])
+def test_window_features_match_extract_features(recordings, feature_set):
+    """window_features reproduziert extract_features für jedes Fenster, auch bei konstantem Signal."""
+    data_dir, labels = recordings
+    paths = [data_dir / f for f in labels["File"]]
+    batch = extract_features(paths, list(labels["Label"]), feature_set)
+    feat_cols = [c for c in batch.columns if c not in ("driver_id", "recording")]
+
+    rows = []
+    for p in paths:
+        _, d = load_recording(p)
+        for i0, i1, _, _ in find_windows(d["t"]):
+            rows.append(window_features(d, i0, i1, feature_set, config.MAX_POINTS))
+    assert len(rows) == len(batch)
+    live = np.array([[r[c] for c in feat_cols] for r in rows], dtype=float)
+    expected = batch[feat_cols].to_numpy(dtype=float)
+
+    np.testing.assert_allclose(live, expected, rtol=1e-7, atol=1e-9)
+    # Recordings ohne Bremsung: konstantes Signal, Kurtosis wie im Batch 0.0 statt NaN
+    if feature_set != "tsfresh":
+        const = batch["recording"].str.endswith("_3.csv").to_numpy()
+        col = feat_cols.index("KURTOSIS_b_brake_")
+        assert const.any() and np.all(live[const, col] == 0.0)